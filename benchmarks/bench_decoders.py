@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import pyarrow as pa
+
+from onchain_platform.decoding.abi_registry import ABIRegistry
+from onchain_platform.decoding.decoders.erc20 import decode_transfers, decode_transfers_batch
+from onchain_platform.decoding.decoders.uniswap_v2 import decode_swaps, decode_swaps_batch
+from onchain_platform.ingestion.writers.schemas import LOGS_RAW
+
+
+ABI_DIR = os.path.join(os.path.dirname(__file__), "..", "onchain_platform", "decoding", "abis")
+
+
+def _word(rng: random.Random) -> str:
+    # Mix small, large and max-width values so both the DECIMAL(38) and _u256 paths run.
+    bits = rng.choice([8, 64, 128, 255, 256])
+    return "%064x" % rng.getrandbits(bits)
+
+
+def _topic_address(rng: random.Random) -> str:
+    return "0x" + "0" * 24 + "%040x" % rng.getrandbits(160)
+
+
+def synthetic_logs(count: int, transfer_topic: str, swap_topic: str, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    logs: List[Dict[str, Any]] = []
+    for index in range(count):
+        kind = rng.random()
+        if kind < 0.7:
+            topics = [transfer_topic, _topic_address(rng), _topic_address(rng)]
+            data = "0x" + _word(rng)
+        elif kind < 0.85:
+            topics = [swap_topic, _topic_address(rng), _topic_address(rng)]
+            data = "0x" + "".join(_word(rng) for _ in range(4))
+        else:
+            topics = ["0x%064x" % rng.getrandbits(256), _topic_address(rng)]
+            data = "0x" + _word(rng)
+
+        # Edge cases the decoders must treat identically.
+        edge = rng.random()
+        if edge < 0.01:
+            topics = []
+        elif edge < 0.02:
+            topics = topics[:2]
+        elif edge < 0.03:
+            data = data[:40]
+        elif edge < 0.04:
+            topics = [topics[0].upper().replace("0X", "0x")] + topics[1:]
+        elif edge < 0.05:
+            topics = [topics[0]] + [topic[2:] for topic in topics[1:]]
+        elif edge < 0.06:
+            data = data + _word(rng)
+
+        logs.append(
+            {
+                "chain_id": 1,
+                "block_number": 18_000_000 + index // 200,
+                "block_hash": "0x%064x" % (index // 200),
+                "tx_hash": "0x%064x" % rng.getrandbits(256),
+                "tx_index": index % 200,
+                "log_index": index % 200,
+                "address": "0x%040x" % rng.getrandbits(160),
+                "data": data,
+                "topics": topics,
+                "removed": False,
+            }
+        )
+    return logs
+
+
+def timed(fn: Callable[[], Any]) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark and cross-check the event decoders.")
+    parser.add_argument("--logs", type=int, default=200_000)
+    args = parser.parse_args()
+
+    registry = ABIRegistry(ABI_DIR)
+    transfer_topic = registry.event_topic(registry.get_event("erc20", "Transfer"))
+    swap_topic = registry.event_topic(registry.get_event("uniswap_v2", "Swap"))
+    rows = synthetic_logs(args.logs, transfer_topic, swap_topic)
+    table = pa.Table.from_pylist(rows, schema=LOGS_RAW)
+
+    for name, row_decoder, batch_decoder in [
+        ("erc20 Transfer", decode_transfers, decode_transfers_batch),
+        ("uniswap_v2 Swap", decode_swaps, decode_swaps_batch),
+    ]:
+        row_s, expected = timed(lambda: row_decoder(registry, rows))
+        batch_s, decoded = timed(lambda: batch_decoder(registry, table))
+        # Differential check: the batch decoder must reproduce the row decoder exactly.
+        if decoded.to_pylist() != expected:
+            raise AssertionError(f"{name}: batch decoder output differs from the row decoder")
+        print(
+            f"{name}: {len(expected)} events from {len(rows)} logs | "
+            f"rows {len(rows) / row_s:,.0f} logs/s | batch {len(rows) / batch_s:,.0f} logs/s | "
+            f"speedup {row_s / batch_s:.1f}x (outputs identical)"
+        )
+
+
+if __name__ == "__main__":
+    main()
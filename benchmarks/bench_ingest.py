@@ -0,0 +1,200 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List
+
+from benchmarks.mock_node import MockNode, add_node_arguments, node_options
+
+
+# End-to-end ingestion throughput against benchmarks/mock_node.py. The node runs in its
+# own process and every target (worker.py, tailer.py) runs as a child process on a fresh
+# warehouse, so peak RSS is the target's alone. Range latency (fetch start to commit) is
+# recorded in the child by wrapping run_range_pipeline.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_node(options: Any, port: int) -> None:
+    async def serve() -> None:
+        await MockNode(options).start("127.0.0.1", port)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def node_stats(url: str, reset: bool = False) -> Dict[str, Any]:
+    with urllib.request.urlopen(f"{url}stats{'?reset=1' if reset else ''}") as resp:
+        return json.loads(resp.read())
+
+
+def wait_for_node(url: str, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            node_stats(url)
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Mock node at {url} did not start")
+            time.sleep(0.05)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def timed_pipeline(original: Any, latencies: List[float]) -> Any:
+    async def run(ranges, fetch, process, commit, **kwargs):
+        started: Dict[Any, float] = {}
+
+        async def timed_fetch(start_block: int, end_block: int) -> Any:
+            started[(start_block, end_block)] = time.perf_counter()
+            return await fetch(start_block, end_block)
+
+        def timed_commit(start_block: int, end_block: int, result: Any) -> None:
+            commit(start_block, end_block, result)
+            latencies.append(time.perf_counter() - started.pop((start_block, end_block)))
+
+        await original(ranges, timed_fetch, process, timed_commit, **kwargs)
+
+    return run
+
+
+def run_child(target: str, latencies_path: str, argv: List[str]) -> None:
+    from onchain_platform.ingestion import tailer, worker
+
+    latencies: List[float] = []
+    worker.run_range_pipeline = timed_pipeline(worker.run_range_pipeline, latencies)
+    tailer.run_range_pipeline = timed_pipeline(tailer.run_range_pipeline, latencies)
+    sys.argv = [target] + argv
+    (worker if target == "worker" else tailer).main()
+    with open(latencies_path, "w", encoding="utf-8") as handle:
+        json.dump(latencies, handle)
+
+
+def target_args(target: str, args: argparse.Namespace, warehouse: str) -> List[str]:
+    state = os.path.join(warehouse, "state")
+    common = [
+        "--state", os.path.join(state, "canonical_state.json"),
+        "--chain-index", os.path.join(state, "chain_index"),
+        "--rpc-batch-size", str(args.rpc_batch_size),
+        "--rpc-concurrency", str(args.rpc_concurrency),
+        "--log-chunk", str(args.chunk),
+    ]
+    end_block = args.start + args.blocks - 1
+    if target == "tailer":
+        return common + ["--start", str(args.start), "--end", str(end_block), "--chunk", str(args.chunk)]
+    plan = os.path.join(warehouse, "plans", "ranges.jsonl")
+    os.makedirs(os.path.dirname(plan), exist_ok=True)
+    with open(plan, "w", encoding="utf-8") as handle:
+        for start_block in range(args.start, end_block + 1, args.chunk):
+            payload = {"start_block": start_block, "end_block": min(start_block + args.chunk - 1, end_block)}
+            handle.write(json.dumps(payload) + "\n")
+    return common + [
+        "--plan", plan,
+        "--checkpoints", os.path.join(state, "checkpoints.json"),
+        "--leases", os.path.join(state, "leases.sqlite"),
+    ]
+
+
+def bench_target(target: str, args: argparse.Namespace, url: str) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as warehouse:
+        latencies_path = os.path.join(warehouse, "latencies.json")
+        env = dict(
+            os.environ,
+            RPC_URL=url,
+            RPC_URLS="",
+            WAREHOUSE_DIR=warehouse,
+            FINALITY_DEPTH=str(args.finality_depth),
+            PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+        )
+        command = [
+            sys.executable, "-m", "benchmarks.bench_ingest", "--child", target, "--latencies", latencies_path, "--",
+        ] + target_args(target, args, warehouse)
+        node_stats(url, reset=True)
+        started = time.perf_counter()
+        process = subprocess.Popen(command, env=env, cwd=warehouse, stdout=subprocess.DEVNULL)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            raise RuntimeError(f"{target} exited with {process.returncode}")
+        stats = node_stats(url)
+        with open(latencies_path, "r", encoding="utf-8") as handle:
+            latencies = json.load(handle)
+    return {
+        "target": target,
+        "blocks": args.blocks,
+        "seconds": elapsed,
+        "blocks_per_second": args.blocks / elapsed,
+        "calls_per_block": stats.get("calls", 0) / args.blocks,
+        "posts_per_block": stats.get("posts", 0) / args.blocks,
+        "p50_range_seconds": percentile(latencies, 0.5),
+        "p99_range_seconds": percentile(latencies, 0.99),
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        "injected_errors": stats.get("server_errors", 0) + stats.get("rate_limited", 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark worker/tailer ingestion against a mock node.")
+    parser.add_argument("--child", choices=["worker", "tailer"], help=argparse.SUPPRESS)
+    parser.add_argument("--latencies", help=argparse.SUPPRESS)
+    parser.add_argument("--targets", default="worker,tailer")
+    parser.add_argument("--start", type=int, default=18_000_000)
+    parser.add_argument("--blocks", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=100, help="Blocks per plan range / tailer chunk.")
+    parser.add_argument("--finality-depth", type=int, default=64)
+    parser.add_argument("--rpc-batch-size", type=int, default=20)
+    parser.add_argument("--rpc-concurrency", type=int, default=6)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines.")
+    add_node_arguments(parser)
+    args, rest = parser.parse_known_args()
+    if args.child:
+        run_child(args.child, args.latencies, [item for item in rest if item != "--"])
+        return
+
+    # The head sits far enough past the range for all of it to be final.
+    args.head = max(args.head, args.start + args.blocks + args.finality_depth)
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    node = multiprocessing.Process(target=run_node, args=(node_options(args), port), daemon=True)
+    node.start()
+    try:
+        wait_for_node(url)
+        for target in args.targets.split(","):
+            result = bench_target(target, args, url)
+            if args.json:
+                print(json.dumps(result))
+                continue
+            print(
+                f"{target:<7} {result['blocks_per_second']:8.1f} blocks/s  "
+                f"{result['calls_per_block']:5.2f} calls/block ({result['posts_per_block']:.2f} POSTs)  "
+                f"range p50 {result['p50_range_seconds']:.3f}s p99 {result['p99_range_seconds']:.3f}s  "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB"
+                + (f"  ({result['injected_errors']} injected errors)" if result["injected_errors"] else "")
+            )
+    finally:
+        node.terminate()
+        node.join()
+
+
+if __name__ == "__main__":
+    main()
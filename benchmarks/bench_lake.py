@@ -0,0 +1,289 @@
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+
+from benchmarks.bench_decoders import ABI_DIR
+from benchmarks.bench_ingest import REPO_ROOT
+from benchmarks.synthetic_lake import add_lake_arguments, generate_lake, lake_options, load_options
+from onchain_platform.decoding.abi_registry import ABIRegistry
+from onchain_platform.decoding.decode_worker import LOG_COLUMNS, iter_log_batches, load_logs
+from onchain_platform.decoding.decoders.erc20 import decode_transfers
+from onchain_platform.decoding.decoders.uniswap_v2 import decode_swaps
+from onchain_platform.decoding.dispatch import DECODER_SPECS, TopicDispatcher
+from onchain_platform.ingestion.compactor import PRIMARY_KEYS, dedupe_bucket
+from onchain_platform.ingestion.writers.manifest import TableManifest
+from onchain_platform.ingestion.writers.parquet_writer import ParquetWriter, TableStream
+from onchain_platform.ingestion.writers.partitioning import bucket_dir
+from onchain_platform.ingestion.writers.schemas import SORT_KEYS, TABLE_SCHEMAS
+
+
+# Times each stage of the lake on a synthetic lake (benchmarks/synthetic_lake.py): the
+# row decoders, load_logs, the batch decode decode_worker runs, ParquetWriter.write_rows,
+# the compactor's dedupe_bucket and every serving query. Each stage runs in a child
+# process, so its peak RSS is its own. The dict-per-row stages (load_logs, the row
+# decoders, write_rows) work on the first --sample-logs logs; the others read the whole
+# lake. Results can be saved as a baseline and later runs compared against it, failing
+# when a stage loses more than --tolerance of its throughput or grows its peak RSS by
+# more than that.
+QUERY_DIR = os.path.join(REPO_ROOT, "serving", "queries")
+STAGES = ["load_logs", "decode_transfers", "decode_swaps", "decode_batch", "write_rows", "dedupe"]
+
+# The serving queries read the gold models; these views map them onto the lake.
+SERVING_VIEWS = {
+    "erc20_transfers": (
+        "silver/event_erc20_transfer",
+        "select chain_id, block_number, tx_hash, log_index, contract_address as token_address, "
+        "from_address, to_address, value_raw, value_raw_u256 from {source}",
+    ),
+    "dex_trades": ("silver/event_uniswap_v2_swap", "select * from {source}"),
+    "blocks_raw": ("bronze/blocks_raw", "select * from {source}"),
+}
+
+
+def query_stages() -> List[str]:
+    paths = sorted(glob.glob(os.path.join(QUERY_DIR, "*.sql")))
+    return [f"query:{os.path.splitext(os.path.basename(path))[0]}" for path in paths]
+
+
+def table_paths(table_dir: str) -> List[str]:
+    paths = TableManifest(table_dir).snapshot().paths()
+    # Tables left empty by the generator hold only the bootstrap file.
+    return paths or sorted(glob.glob(os.path.join(table_dir, "*", "*.parquet")))
+
+
+def sample_end(lake_dir: str, sample_logs: int) -> int:
+    options = load_options(lake_dir)
+    return options.start_block + max(1, sample_logs // options.logs_per_block) - 1
+
+
+def timed(fn: Any) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def run_query(lake_dir: str, name: str, repeat: int) -> Tuple[int, float]:
+    with open(os.path.join(QUERY_DIR, f"{name}.sql"), "r", encoding="utf-8") as handle:
+        sql = handle.read()
+    con = duckdb.connect()
+    rows = 0
+    for view, (table, select) in SERVING_VIEWS.items():
+        paths = table_paths(os.path.join(lake_dir, table))
+        sources = ", ".join("'" + path.replace("'", "''") + "'" for path in paths)
+        source = f"read_parquet([{sources}], hive_partitioning = false)"
+        con.execute(f"create view {view} as {select.format(source=source)}")
+        if view in sql:
+            rows += con.execute(f"select count(*) from {view}").fetchone()[0]
+    # Queries finish in milliseconds at small scales, so the best of several runs is kept.
+    seconds = min(timed(lambda: con.execute(sql).fetchall())[0] for _ in range(max(1, repeat)))
+    con.close()
+    return rows, seconds
+
+
+def run_stage(stage: str, lake_dir: str, args: argparse.Namespace) -> Tuple[int, float]:
+    # Returns (rows processed, seconds); setup such as loading the sample is not timed.
+    if stage.startswith("query:"):
+        return run_query(lake_dir, stage.split(":", 1)[1], args.repeat)
+    logs_dir = os.path.join(lake_dir, "bronze", "logs_raw")
+    start_block = load_options(lake_dir).start_block
+    registry = ABIRegistry(ABI_DIR)
+    if stage == "load_logs":
+        seconds, logs = timed(lambda: load_logs(logs_dir, start_block, sample_end(lake_dir, args.sample_logs)))
+        return len(logs), seconds
+    if stage == "decode_batch":
+        dispatcher = TopicDispatcher(registry, list(DECODER_SPECS.values()))
+
+        def decode_all() -> int:
+            scanned = 0
+            for batch in iter_log_batches(logs_dir, None, None, columns=LOG_COLUMNS):
+                scanned += batch.num_rows
+                for _ in dispatcher.decode(batch):
+                    pass
+            return scanned
+
+        seconds, scanned = timed(decode_all)
+        return scanned, seconds
+    if stage == "dedupe":
+        snapshot = TableManifest(logs_dir).snapshot()
+        rows = 0
+        seconds = 0.0
+        with tempfile.TemporaryDirectory() as output_dir:
+            target = TableManifest(os.path.join(output_dir, "logs_raw"))
+            for bucket in snapshot.buckets()[: args.dedupe_buckets]:
+                stream = TableStream(
+                    target,
+                    os.path.join(bucket_dir(target.table_dir, bucket), "compacted.parquet"),
+                    TABLE_SCHEMAS["logs_raw"],
+                    "logs_raw",
+                )
+                sources = [os.path.join(logs_dir, entry.path) for entry in snapshot.entries(bucket=bucket)]
+                elapsed, deduped = timed(
+                    lambda: dedupe_bucket(
+                        sources,
+                        stream,
+                        PRIMARY_KEYS["logs_raw"],
+                        SORT_KEYS["logs_raw"],
+                        memory_limit=args.memory_limit,
+                        temp_dir=os.path.join(output_dir, "tmp"),
+                    )
+                )
+                close_s, _ = timed(lambda: stream.close("compact"))
+                seconds += elapsed + close_s
+                rows += deduped
+        return rows, seconds
+
+    logs = load_logs(logs_dir, start_block, sample_end(lake_dir, args.sample_logs))
+    if stage == "decode_transfers":
+        seconds, _ = timed(lambda: decode_transfers(registry, logs))
+        return len(logs), seconds
+    if stage == "decode_swaps":
+        seconds, _ = timed(lambda: decode_swaps(registry, logs))
+        return len(logs), seconds
+    if stage == "write_rows":
+        transfers = decode_transfers(registry, logs)
+        del logs
+        with tempfile.TemporaryDirectory() as output_dir:
+            seconds, _ = timed(lambda: ParquetWriter(output_dir).write_rows("event_erc20_transfer", transfers))
+        return len(transfers), seconds
+    raise RuntimeError(f"Unknown stage: {stage}")
+
+
+def run_child(stage: str, lake_dir: str, result_path: str, args: argparse.Namespace) -> None:
+    rows, seconds = run_stage(stage, lake_dir, args)
+    with open(result_path, "w", encoding="utf-8") as handle:
+        json.dump({"rows": rows, "seconds": seconds}, handle)
+
+
+def bench_stage(stage: str, lake_dir: str, args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as scratch:
+        result_path = os.path.join(scratch, "result.json")
+        command = [
+            sys.executable, "-m", "benchmarks.bench_lake",
+            "--child", stage,
+            "--lake", lake_dir,
+            "--result", result_path,
+            "--sample-logs", str(args.sample_logs),
+            "--dedupe-buckets", str(args.dedupe_buckets),
+            "--memory-limit", args.memory_limit,
+            "--repeat", str(args.repeat),
+        ]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+        process = subprocess.Popen(command, env=env, cwd=REPO_ROOT)
+        _, status, usage = os.wait4(process.pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            raise RuntimeError(f"stage {stage} exited with {os.waitstatus_to_exitcode(status)}")
+        with open(result_path, "r", encoding="utf-8") as handle:
+            result = json.load(handle)
+    return {
+        "stage": stage,
+        "rows": result["rows"],
+        "seconds": result["seconds"],
+        "rows_per_second": result["rows"] / result["seconds"] if result["seconds"] else 0.0,
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+    }
+
+
+def regressions(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float) -> List[str]:
+    if baseline is None:
+        return []
+    found = []
+    if result["rows_per_second"] < baseline["rows_per_second"] * (1 - tolerance):
+        found.append("throughput")
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        found.append("memory")
+    return found
+
+
+def describe(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], regressed: List[str]) -> str:
+    line = (
+        f"{result['stage']:<28} {result['rows']:>12,} rows {result['seconds']:8.2f}s "
+        f"{result['rows_per_second']:>14,.0f} rows/s  peak RSS {result['peak_rss_mb']:7.0f} MB"
+    )
+    if baseline is not None:
+        speed = result["rows_per_second"] / baseline["rows_per_second"] - 1 if baseline["rows_per_second"] else 0.0
+        memory = result["peak_rss_mb"] / baseline["peak_rss_mb"] - 1 if baseline["peak_rss_mb"] else 0.0
+        line += f"  vs baseline {speed:+.0%} rows/s {memory:+.0%} RSS"
+    if regressed:
+        line += f"  REGRESSED ({', '.join(regressed)})"
+    return line
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark decode, write, compaction and serving stages.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--lake", help="Existing synthetic lake (<warehouse>/lake); otherwise one is generated in a temp dir."
+    )
+    parser.add_argument("--stages", help="Comma-separated stages (default: all, including query:<name>).")
+    parser.add_argument("--sample-logs", type=int, default=200_000, help="Logs read by the dict-per-row stages.")
+    parser.add_argument("--dedupe-buckets", type=int, default=1, help="logs_raw buckets the dedupe stage compacts.")
+    parser.add_argument("--memory-limit", default="2GB", help="DuckDB memory limit of the dedupe stage.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per serving query (best is kept).")
+    parser.add_argument("--baseline", help="Compare against results saved with --save-baseline.")
+    parser.add_argument("--save-baseline", help="Write this run's results to a JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput loss / RSS growth.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines.")
+    add_lake_arguments(parser)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child, args.lake, args.result, args)
+        return
+
+    stages = args.stages.split(",") if args.stages else STAGES + query_stages()
+    baseline: Dict[str, Any] = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    with tempfile.TemporaryDirectory() as warehouse:
+        lake_dir = args.lake
+        results: List[Dict[str, Any]] = []
+        if lake_dir is None:
+            lake_dir = os.path.join(warehouse, "lake")
+            options = lake_options(args)
+            seconds, rows = timed(lambda: generate_lake(lake_dir, options))
+            results.append(
+                {
+                    "stage": "generate",
+                    "rows": rows["logs_raw"],
+                    "seconds": seconds,
+                    "rows_per_second": rows["logs_raw"] / seconds,
+                    # The generator's pool processes are the only children reaped so far.
+                    "peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+                }
+            )
+        lake = asdict(load_options(lake_dir))
+        if baseline and baseline.get("lake") != lake:
+            print("warning: the baseline was recorded on a different synthetic lake; throughput may not compare")
+        results.extend(bench_stage(stage, lake_dir, args) for stage in stages)
+
+    failed = []
+    for result in results:
+        previous = baseline.get("stages", {}).get(result["stage"])
+        # Generation only prepares the lake; it is reported but never gates a run.
+        regressed = [] if result["stage"] == "generate" else regressions(result, previous, args.tolerance)
+        if regressed:
+            failed.append(result["stage"])
+        print(json.dumps(dict(result, regressed=regressed)) if args.json else describe(result, previous, regressed))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as handle:
+            json.dump({"lake": lake, "stages": {result["stage"]: result for result in results}}, handle, indent=2)
+    if failed:
+        raise RuntimeError(f"Regressed beyond {args.tolerance:.0%} of the baseline: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import pyarrow as pa
+
+from onchain_platform.ingestion import rpc_client
+from onchain_platform.ingestion.worker import build_range_rows, build_range_tables
+from onchain_platform.ingestion.writers.schemas import TABLE_SCHEMAS
+
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+TABLES = ["blocks_raw", "transactions_raw", "logs_raw", "canonical_blocks"]
+
+
+def _hash(rng: random.Random) -> str:
+    return "0x%064x" % rng.getrandbits(256)
+
+
+def _address(rng: random.Random) -> str:
+    return "0x%040x" % rng.getrandbits(160)
+
+
+def synthetic_range(
+    start_block: int, blocks: int, txs_per_block: int, logs_per_tx: int, seed: int = 7
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    raw_blocks: List[Dict[str, Any]] = []
+    raw_logs: List[Dict[str, Any]] = []
+    parent = _hash(rng)
+    for number in range(start_block, start_block + blocks):
+        block_hash = _hash(rng)
+        transactions = []
+        for tx_index in range(txs_per_block):
+            tx_hash = _hash(rng)
+            transactions.append(
+                {
+                    "hash": tx_hash,
+                    "transactionIndex": hex(tx_index),
+                    "from": _address(rng),
+                    "to": _address(rng) if tx_index % 10 else None,
+                    "value": hex(rng.getrandbits(64)),
+                    "gas": hex(21000 + rng.getrandbits(16)),
+                    "gasPrice": hex(rng.getrandbits(36)),
+                    "nonce": hex(rng.getrandbits(12)),
+                    "input": "0x" + "%0136x" % rng.getrandbits(544),
+                }
+            )
+            for log_offset in range(logs_per_tx):
+                raw_logs.append(
+                    {
+                        "blockNumber": hex(number),
+                        "blockHash": block_hash,
+                        "transactionHash": tx_hash,
+                        "transactionIndex": hex(tx_index),
+                        "logIndex": hex(tx_index * logs_per_tx + log_offset),
+                        "address": _address(rng),
+                        "data": "0x%064x" % rng.getrandbits(96),
+                        "topics": [
+                            TRANSFER_TOPIC,
+                            "0x" + "0" * 24 + _address(rng)[2:],
+                            "0x" + "0" * 24 + _address(rng)[2:],
+                        ],
+                        "removed": False,
+                    }
+                )
+        raw_blocks.append(
+            {
+                "number": hex(number),
+                "hash": block_hash,
+                "parentHash": parent,
+                "timestamp": hex(1_600_000_000 + number * 12),
+                "miner": _address(rng),
+                "gasUsed": hex(rng.getrandbits(24)),
+                "gasLimit": hex(30_000_000),
+                "baseFeePerGas": hex(rng.getrandbits(34)),
+                "transactions": transactions,
+            }
+        )
+        parent = block_hash
+    return raw_blocks, raw_logs
+
+
+def rows_path(
+    chain_id: int, raw_blocks: List[Dict[str, Any]], raw_logs: List[Dict[str, Any]]
+) -> List[pa.Table]:
+    return [
+        pa.Table.from_pylist(rows, schema=TABLE_SCHEMAS[name])
+        for name, rows in zip(TABLES, build_range_rows(chain_id, raw_blocks, raw_logs))
+    ]
+
+
+def columnar_path(
+    chain_id: int, raw_blocks: List[Dict[str, Any]], raw_logs: List[Dict[str, Any]]
+) -> List[pa.Table]:
+    return list(build_range_tables(chain_id, raw_blocks, raw_logs))
+
+
+def best_of(repeat: int, fn: Callable[[], Any]) -> Tuple[float, Any]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def check_identical(before: List[pa.Table], after: List[pa.Table]) -> None:
+    for name, old, new in zip(TABLES, before, after):
+        if not new.schema.equals(TABLE_SCHEMAS[name]):
+            raise AssertionError(f"{name}: schema drifted from the registry")
+        if old.column_names != new.column_names:
+            raise AssertionError(f"{name}: column mismatch {old.column_names} != {new.column_names}")
+        # observed_at is a wall-clock stamp, so it legitimately differs between runs.
+        columns = [column for column in new.column_names if column != "observed_at"]
+        if old.select(columns).to_pylist() != new.select(columns).to_pylist():
+            raise AssertionError(f"{name}: values differ")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark row vs columnar normalisation.")
+    parser.add_argument("--blocks", type=int, default=100)
+    parser.add_argument("--txs-per-block", type=int, default=150)
+    parser.add_argument("--logs-per-tx", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw_blocks, raw_logs = synthetic_range(18_000_000, args.blocks, args.txs_per_block, args.logs_per_tx)
+    total_rows = len(raw_blocks) * (2 + args.txs_per_block) + len(raw_logs)
+
+    before_s, before = best_of(args.repeat, lambda: rows_path(1, raw_blocks, raw_logs))
+    after_s, after = best_of(args.repeat, lambda: columnar_path(1, raw_blocks, raw_logs))
+    check_identical(before, after)
+
+    payload = json.dumps({"jsonrpc": "2.0", "id": 1, "result": raw_logs}).encode("utf-8")
+    json_s, _ = best_of(args.repeat, lambda: json.loads(payload))
+    fast_s, _ = best_of(args.repeat, lambda: rpc_client._loads(payload))
+
+    print(f"rows: {total_rows} ({len(raw_blocks)} blocks, {len(raw_logs)} logs)")
+    print(f"normalize dict-per-row + from_pylist: {total_rows / before_s:,.0f} rows/s ({before_s:.3f}s)")
+    print(f"normalize columnar:                   {total_rows / after_s:,.0f} rows/s ({after_s:.3f}s)")
+    print(f"speedup: {before_s / after_s:.2f}x (outputs identical)")
+    print(
+        f"decode {len(payload) / 1e6:.1f} MB response: json.loads {json_s:.3f}s, "
+        f"orjson {fast_s:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Tuple
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.bench_normalize import TABLES, synthetic_range
+from onchain_platform.ingestion.worker import build_range_tables
+from onchain_platform.ingestion.writers.binary_format import decode_table, encode_table
+
+
+# Same join in both layouts; the binary lake renders hashes back to hex the way the dbt
+# bronze models do, so both queries return identical rows.
+JOIN_QUERIES = {
+    "hex": """
+        select t.tx_hash, t.from_address, l.address, l.topics[1] as topic0
+        from read_parquet('{base}/transactions_raw/*.parquet') t
+        join read_parquet('{base}/logs_raw/*.parquet') l
+          on l.block_number = t.block_number and l.tx_hash = t.tx_hash
+    """,
+    "binary": """
+        select '0x' || lower(hex(t.tx_hash)) as tx_hash,
+               '0x' || lower(hex(t.from_address)) as from_address,
+               '0x' || lower(hex(l.address)) as address,
+               '0x' || lower(hex(l.topic0)) as topic0
+        from read_parquet('{base}/transactions_raw/*.parquet') t
+        join read_parquet('{base}/logs_raw/*.parquet') l
+          on l.block_number = t.block_number and l.tx_hash = t.tx_hash
+    """,
+}
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def write_lake(base: str, tables: Dict[str, pa.Table], storage_format: str) -> Dict[str, int]:
+    sizes: Dict[str, int] = {}
+    for name, table in tables.items():
+        if storage_format == "binary":
+            table = encode_table(name, table)
+        path = os.path.join(base, name, "part.parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path)
+        sizes[name] = os.path.getsize(path)
+    return sizes
+
+
+def scan_and_join(base: str, storage_format: str, repeat: int) -> Tuple[float, float, int]:
+    connection = duckdb.connect()
+    scan_sql = f"select count(distinct address) from read_parquet('{base}/logs_raw/*.parquet')"
+    join_sql = JOIN_QUERIES[storage_format].format(base=base)
+    scan_s = best_of(repeat, lambda: connection.execute(scan_sql).fetchall())
+    join_s = best_of(repeat, lambda: connection.execute(join_sql).fetchall())
+    rows = len(connection.execute(join_sql).fetchall())
+    return scan_s, join_s, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hex vs binary bronze storage.")
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--txs-per-block", type=int, default=150)
+    parser.add_argument("--logs-per-tx", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw_blocks, raw_logs = synthetic_range(18_000_000, args.blocks, args.txs_per_block, args.logs_per_tx)
+    tables = dict(zip(TABLES, build_range_tables(1, raw_blocks, raw_logs)))
+    for name, table in tables.items():
+        if decode_table(name, encode_table(name, table)).to_pylist() != table.to_pylist():
+            raise AssertionError(f"{name}: binary layout does not round-trip")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for storage_format in ("hex", "binary"):
+            base = os.path.join(tmp, storage_format)
+            sizes = write_lake(base, tables, storage_format)
+            results[storage_format] = (sizes, *scan_and_join(base, storage_format, args.repeat))
+
+    hex_sizes, hex_scan, hex_join, hex_rows = results["hex"]
+    bin_sizes, bin_scan, bin_join, bin_rows = results["binary"]
+    if hex_rows != bin_rows:
+        raise AssertionError("join row counts differ between layouts")
+
+    print(f"{len(raw_blocks)} blocks, {len(raw_logs)} logs (round-trip exact)")
+    for name in TABLES:
+        print(
+            f"{name:<18} hex {hex_sizes[name] / 1e6:7.2f} MB  binary {bin_sizes[name] / 1e6:7.2f} MB  "
+            f"({hex_sizes[name] / bin_sizes[name]:.2f}x smaller)"
+        )
+    print(f"logs scan (distinct address): hex {hex_scan:.3f}s, binary {bin_scan:.3f}s")
+    print(f"tx/log join ({hex_rows} rows):     hex {hex_join:.3f}s, binary {bin_join:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
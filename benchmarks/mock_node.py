@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import hashlib
+import random
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from benchmarks.bench_normalize import TRANSFER_TOPIC, _address, _hash
+
+
+# A JSON-RPC node serving a deterministic synthetic chain, for benchmarking and testing
+# ingestion without a provider. Block n is generated from (seed, n, fork) alone, so any
+# process asking for the same block gets the same payload; hashes chain through
+# parentHash. Latency, HTTP 503s, 429s, batch size limits and eth_getLogs result limits
+# are injected per request, and reorgs replace the newest blocks with a new fork, either
+# every --reorg-every blocks while the head advances or on GET /reorg?depth=N.
+# GET /stats returns request counters (?reset=1 clears them).
+
+
+@dataclass(frozen=True)
+class NodeOptions:
+    head: int = 18_010_000
+    seed: int = 7
+    txs_per_block: int = 50
+    logs_per_tx: int = 2
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    max_batch: int = 1000
+    max_logs: int = 10_000
+    block_time: float = 0.0
+    reorg_every: int = 0
+    reorg_depth: int = 3
+
+
+class MockNode:
+    def __init__(self, options: NodeOptions) -> None:
+        self.options = options
+        self.head = options.head
+        # (first block, fork id): blocks from `first` on belong to that fork.
+        self.forks: List[Tuple[int, int]] = []
+        self.stats: Counter = Counter()
+        self._faults = random.Random(options.seed)
+        self._advance: Optional[asyncio.Task] = None
+        self._blocks: "OrderedDict[Tuple[int, int], Tuple[Dict[str, Any], List[Dict[str, Any]]]]" = OrderedDict()
+
+    def fork_of(self, number: int) -> int:
+        fork = 0
+        for first, fork_id in self.forks:
+            if number >= first:
+                fork = fork_id
+        return fork
+
+    def block_hash(self, number: int) -> str:
+        if number < 0:
+            return "0x" + "0" * 64
+        key = f"{self.options.seed}:{number}:{self.fork_of(number)}"
+        return "0x" + hashlib.sha256(key.encode()).hexdigest()
+
+    def reorg(self, depth: int) -> int:
+        first = max(self.head - depth + 1, 0)
+        self.forks.append((first, len(self.forks) + 1))
+        self.stats["reorgs"] += 1
+        return first
+
+    def _generate(self, number: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        key = (number, self.fork_of(number))
+        cached = self._blocks.get(key)
+        if cached is not None:
+            self._blocks.move_to_end(key)
+            return cached
+        rng = random.Random(f"{self.options.seed}:{number}:{key[1]}")
+        block_hash = self.block_hash(number)
+        transactions = []
+        logs = []
+        for tx_index in range(self.options.txs_per_block):
+            tx_hash = _hash(rng)
+            transactions.append(
+                {
+                    "hash": tx_hash,
+                    "transactionIndex": hex(tx_index),
+                    "from": _address(rng),
+                    "to": _address(rng) if tx_index % 10 else None,
+                    "value": hex(rng.getrandbits(64)),
+                    "gas": hex(21000 + rng.getrandbits(16)),
+                    "gasPrice": hex(rng.getrandbits(36)),
+                    "nonce": hex(rng.getrandbits(12)),
+                    "input": "0x" + "%0136x" % rng.getrandbits(544),
+                }
+            )
+            for log_offset in range(self.options.logs_per_tx):
+                logs.append(
+                    {
+                        "blockNumber": hex(number),
+                        "blockHash": block_hash,
+                        "transactionHash": tx_hash,
+                        "transactionIndex": hex(tx_index),
+                        "logIndex": hex(tx_index * self.options.logs_per_tx + log_offset),
+                        "address": _address(rng),
+                        "data": "0x%064x" % rng.getrandbits(96),
+                        "topics": [
+                            TRANSFER_TOPIC,
+                            "0x" + "0" * 24 + _address(rng)[2:],
+                            "0x" + "0" * 24 + _address(rng)[2:],
+                        ],
+                        "removed": False,
+                    }
+                )
+        block = {
+            "number": hex(number),
+            "hash": block_hash,
+            "parentHash": self.block_hash(number - 1),
+            "timestamp": hex(1_600_000_000 + number * 12),
+            "miner": _address(rng),
+            "gasUsed": hex(rng.getrandbits(24)),
+            "gasLimit": hex(30_000_000),
+            "baseFeePerGas": hex(rng.getrandbits(34)),
+            "transactions": transactions,
+        }
+        self._blocks[key] = (block, logs)
+        if len(self._blocks) > 4096:
+            self._blocks.popitem(last=False)
+        return block, logs
+
+    def _error(self, request_id: Any, code: int, message: str) -> Dict[str, Any]:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+    def handle_call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request.get("method")
+        params = request.get("params") or []
+        self.stats["calls"] += 1
+        self.stats[f"calls:{method}"] += 1
+        if method == "eth_blockNumber":
+            result: Any = hex(self.head)
+        elif method == "eth_chainId":
+            result = "0x1"
+        elif method == "eth_getBlockByNumber":
+            number = int(params[0], 16)
+            if number > self.head:
+                result = None
+            else:
+                block, _ = self._generate(number)
+                if len(params) > 1 and not params[1]:
+                    block = dict(block, transactions=[tx["hash"] for tx in block["transactions"]])
+                result = block
+        elif method == "eth_getLogs":
+            start_block = int(params[0]["fromBlock"], 16)
+            end_block = min(int(params[0]["toBlock"], 16), self.head)
+            count = (end_block - start_block + 1) * self.options.txs_per_block * self.options.logs_per_tx
+            if count > self.options.max_logs:
+                self.stats["log_limit_errors"] += 1
+                return self._error(request.get("id"), -32005, f"query returned more than {self.options.max_logs} results")
+            result = [log for number in range(start_block, end_block + 1) for log in self._generate(number)[1]]
+        else:
+            return self._error(request.get("id"), -32601, f"method {method} not supported")
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.stats["posts"] += 1
+        body = await request.json()
+        if self.options.latency_ms:
+            await asyncio.sleep(self.options.latency_ms / 1000 * self._faults.uniform(0.5, 1.5))
+        roll = self._faults.random()
+        if roll < self.options.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return web.Response(status=429, text="Too Many Requests")
+        if roll < self.options.rate_limit_rate + self.options.error_rate:
+            self.stats["server_errors"] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        if isinstance(body, list):
+            if len(body) > self.options.max_batch:
+                self.stats["batch_limit_errors"] += 1
+                return web.json_response(
+                    self._error(None, -32600, f"batch of {len(body)} exceeds limit {self.options.max_batch}")
+                )
+            return web.json_response([self.handle_call(item) for item in body])
+        return web.json_response(self.handle_call(body))
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        payload = dict(self.stats, head=self.head)
+        if request.query.get("reset"):
+            self.stats.clear()
+        return web.json_response(payload)
+
+    async def handle_reorg(self, request: web.Request) -> web.Response:
+        return web.json_response({"first_block": self.reorg(int(request.query.get("depth", "3")))})
+
+    async def advance(self) -> None:
+        mined = 0
+        while True:
+            await asyncio.sleep(self.options.block_time)
+            self.head += 1
+            mined += 1
+            if self.options.reorg_every and mined % self.options.reorg_every == 0:
+                self.reorg(self.options.reorg_depth)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8545) -> web.AppRunner:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/", self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_get("/reorg", self.handle_reorg)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        if self.options.block_time > 0:
+            self._advance = asyncio.ensure_future(self.advance())
+        return runner
+
+
+def add_node_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = NodeOptions()
+    parser.add_argument("--head", type=int, default=defaults.head)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--txs-per-block", type=int, default=defaults.txs_per_block)
+    parser.add_argument("--logs-per-tx", type=int, default=defaults.logs_per_tx)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="Mean latency per HTTP request.")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Share of requests answered 503.")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="Share answered 429.")
+    parser.add_argument("--max-batch", type=int, default=defaults.max_batch)
+    parser.add_argument("--max-logs", type=int, default=defaults.max_logs, help="eth_getLogs result limit.")
+    parser.add_argument("--block-time", type=float, default=defaults.block_time, help="Seconds per new block (0: fixed head).")
+    parser.add_argument("--reorg-every", type=int, default=defaults.reorg_every, help="Blocks between injected reorgs.")
+    parser.add_argument("--reorg-depth", type=int, default=defaults.reorg_depth)
+
+
+def node_options(args: argparse.Namespace) -> NodeOptions:
+    return NodeOptions(
+        head=args.head,
+        seed=args.seed,
+        txs_per_block=args.txs_per_block,
+        logs_per_tx=args.logs_per_tx,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_batch=args.max_batch,
+        max_logs=args.max_logs,
+        block_time=args.block_time,
+        reorg_every=args.reorg_every,
+        reorg_depth=args.reorg_depth,
+    )
+
+
+async def serve(options: NodeOptions, host: str, port: int) -> None:
+    await MockNode(options).start(host, port)
+    print(f"Mock node listening on http://{host}:{port}/ (head {options.head})", flush=True)
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deterministic mock EVM JSON-RPC node.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    add_node_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(serve(node_options(args), args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
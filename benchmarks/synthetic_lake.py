@@ -0,0 +1,344 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+from benchmarks.bench_decoders import ABI_DIR
+from onchain_platform.decoding.abi_registry import ABIRegistry
+from onchain_platform.decoding.dispatch import DECODER_SPECS, TopicDispatcher
+from onchain_platform.ingestion.writers.manifest import TableManifest
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, ParquetWriter
+from onchain_platform.ingestion.writers.schemas import LAYERS, TABLE_SCHEMAS
+from scripts.bootstrap_empty_parquet import write_empty
+
+
+# Writes a synthetic lake (bronze and silver) at benchmark scale: warehouse/lake laid out
+# exactly as worker.py and decode_worker.py leave it, with the schemas
+# scripts/bootstrap_empty_parquet.py uses. Blocks are generated and written a chunk at a
+# time, so memory stays flat from a million logs to a billion. Token contracts, pairs and
+# wallets are drawn from Zipf distributions (a few hot contracts and wallets, a long
+# tail), which is what makes dictionary encoding, bloom filters and the serving group-bys
+# behave as they do on mainnet. Silver is decoded from the generated logs by the same
+# TopicDispatcher decode_worker runs. Chunks depend only on the seed and their first
+# block (block hashes are derived from the block number), so they are generated in
+# parallel across processes. The parameters are saved to <lake>/synthetic.json.
+CHAIN_ID = 1
+START_BLOCK = 18_000_000
+BLOCK_TIME = 12
+# Event mix of the generated logs; the rest carry topics no decoder handles.
+TRANSFER_SHARE = 0.70
+SWAP_SHARE = 0.15
+ZERO_WORD = "0" * 64
+
+
+@dataclass(frozen=True)
+class LakeOptions:
+    logs: int = 1_000_000
+    logs_per_block: int = 200
+    logs_per_tx: int = 2
+    chunk_blocks: int = 500
+    processes: int = 1
+    tokens: int = 20_000
+    pairs: int = 5_000
+    wallets: int = 1_000_000
+    zipf_s: float = 1.1
+    seed: int = 7
+    start_block: int = START_BLOCK
+
+    @property
+    def blocks(self) -> int:
+        return -(-self.logs // self.logs_per_block)
+
+    @property
+    def end_block(self) -> int:
+        return self.start_block + self.blocks - 1
+
+
+class Zipf:
+    # Draws items of a pool with probability proportional to 1 / rank**s.
+    def __init__(self, items: List[str], s: float) -> None:
+        self.items = items
+        self.cum_weights = list(itertools.accumulate(1.0 / rank**s for rank in range(1, len(items) + 1)))
+
+    def sample(self, rng: random.Random, count: int) -> List[str]:
+        return rng.choices(self.items, cum_weights=self.cum_weights, k=count)
+
+
+def random_hex(rng: random.Random, count: int, size: int) -> List[str]:
+    # One randbytes call per column is far cheaper than getrandbits per row.
+    blob = rng.randbytes(count * size).hex()
+    width = size * 2
+    return ["0x" + blob[offset : offset + width] for offset in range(0, len(blob), width)]
+
+
+def word(rng: random.Random) -> str:
+    # Amounts spread from dust to max-width uint256, so both amount columns get used.
+    return "%064x" % rng.getrandbits(rng.choice([16, 48, 64, 96, 128, 256]))
+
+
+def pad(address: str) -> str:
+    return "0x" + "0" * 24 + address[2:]
+
+
+class LakeGenerator:
+    def __init__(self, options: LakeOptions, registry: ABIRegistry) -> None:
+        self.options = options
+        rng = random.Random(options.seed)
+        self.tokens = Zipf(random_hex(rng, options.tokens, 20), options.zipf_s)
+        self.pairs = Zipf(random_hex(rng, options.pairs, 20), options.zipf_s)
+        self.wallets = Zipf(random_hex(rng, options.wallets, 20), options.zipf_s)
+        self.transfer_topic = registry.event_topic(registry.get_event("erc20", "Transfer"))
+        self.swap_topic = registry.event_topic(registry.get_event("uniswap_v2", "Swap"))
+        self.other_topics = random_hex(rng, 16, 32)
+
+    def block_hash(self, number: int) -> str:
+        return "0x" + hashlib.sha256(f"{self.options.seed}:{number}".encode()).hexdigest()
+
+    def chunk(self, start_block: int, end_block: int) -> Dict[str, pa.Table]:
+        options = self.options
+        # Seeded per chunk, so any chunk can be regenerated on its own.
+        rng = random.Random(f"{options.seed}:{start_block}")
+        numbers = list(range(start_block, end_block + 1))
+        block_hashes = [self.block_hash(number) for number in numbers]
+        observed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+        # The last block of the lake may be partly filled.
+        before = (start_block - options.start_block) * options.logs_per_block
+        log_count = min(options.logs - before, len(numbers) * options.logs_per_block)
+        log_blocks = [start_block + index // options.logs_per_block for index in range(log_count)]
+        log_indexes = [index % options.logs_per_block for index in range(log_count)]
+        tx_indexes = [log_index // options.logs_per_tx for log_index in log_indexes]
+        tx_keys = sorted(set(zip(log_blocks, tx_indexes)))
+        tx_hashes = dict(zip(tx_keys, random_hex(rng, len(tx_keys), 32)))
+        senders = dict(zip(tx_keys, self.wallets.sample(rng, len(tx_keys))))
+
+        addresses: List[str] = []
+        topics: List[List[str]] = []
+        data: List[str] = []
+        rolls = [rng.random() for _ in range(log_count)]
+        counterparties = self.wallets.sample(rng, log_count)
+        tokens = self.tokens.sample(rng, log_count)
+        pairs = self.pairs.sample(rng, log_count)
+        for index, roll in enumerate(rolls):
+            sender = senders[(log_blocks[index], tx_indexes[index])]
+            if roll < TRANSFER_SHARE:
+                addresses.append(tokens[index])
+                topics.append([self.transfer_topic, pad(sender), pad(counterparties[index])])
+                data.append("0x" + word(rng))
+            elif roll < TRANSFER_SHARE + SWAP_SHARE:
+                # Token0 in, token1 out or the other way round, as a real pair emits.
+                amount_in, amount_out = word(rng), word(rng)
+                amounts = [amount_in, ZERO_WORD, ZERO_WORD, amount_out]
+                if roll < TRANSFER_SHARE + SWAP_SHARE / 2:
+                    amounts = [ZERO_WORD, amount_in, amount_out, ZERO_WORD]
+                addresses.append(pairs[index])
+                topics.append([self.swap_topic, pad(sender), pad(counterparties[index])])
+                data.append("0x" + "".join(amounts))
+            else:
+                addresses.append(tokens[index])
+                topics.append([self.other_topics[int(roll * 1000) % len(self.other_topics)], pad(sender)])
+                data.append("0x" + word(rng))
+
+        block_hash_of = dict(zip(numbers, block_hashes))
+        logs = pa.table(
+            {
+                "chain_id": [CHAIN_ID] * log_count,
+                "block_number": log_blocks,
+                "block_hash": [block_hash_of[number] for number in log_blocks],
+                "tx_hash": [tx_hashes[key] for key in zip(log_blocks, tx_indexes)],
+                "tx_index": tx_indexes,
+                "log_index": log_indexes,
+                "address": addresses,
+                "data": data,
+                "topics": topics,
+                "removed": [False] * log_count,
+            },
+            schema=TABLE_SCHEMAS["logs_raw"],
+        )
+        transactions = pa.table(
+            {
+                "chain_id": [CHAIN_ID] * len(tx_keys),
+                "block_number": [number for number, _ in tx_keys],
+                "block_hash": [block_hash_of[number] for number, _ in tx_keys],
+                "tx_hash": [tx_hashes[key] for key in tx_keys],
+                "tx_index": [tx_index for _, tx_index in tx_keys],
+                "from_address": [senders[key] for key in tx_keys],
+                "to_address": [
+                    self.pairs.items[0] if tx_index % 3 else self.tokens.items[0] for _, tx_index in tx_keys
+                ],
+                "value": [rng.getrandbits(60) if tx_index % 4 == 0 else 0 for _, tx_index in tx_keys],
+                "gas": [21_000 + rng.getrandbits(17) for _ in tx_keys],
+                "gas_price": [rng.getrandbits(36) for _ in tx_keys],
+                "nonce": [rng.getrandbits(12) for _ in tx_keys],
+                "input": ["0x" + "%0136x" % rng.getrandbits(544) for _ in tx_keys],
+                "value_u256": [None] * len(tx_keys),
+                "gas_u256": [None] * len(tx_keys),
+                "gas_price_u256": [None] * len(tx_keys),
+            },
+            schema=TABLE_SCHEMAS["transactions_raw"],
+        )
+        tx_counts: Dict[int, int] = {}
+        for number, _ in tx_keys:
+            tx_counts[number] = tx_counts.get(number, 0) + 1
+        parents = [self.block_hash(start_block - 1)] + block_hashes[:-1]
+        blocks = pa.table(
+            {
+                "chain_id": [CHAIN_ID] * len(numbers),
+                "block_number": numbers,
+                "block_hash": block_hashes,
+                "parent_hash": parents,
+                "timestamp": [1_600_000_000 + number * BLOCK_TIME for number in numbers],
+                "miner": self.wallets.sample(rng, len(numbers)),
+                "gas_used": [rng.getrandbits(24) for _ in numbers],
+                "gas_limit": [30_000_000] * len(numbers),
+                "base_fee_per_gas": [rng.getrandbits(34) for _ in numbers],
+                "tx_count": [tx_counts.get(number, 0) for number in numbers],
+                "observed_at": [observed_at] * len(numbers),
+                "base_fee_per_gas_u256": [None] * len(numbers),
+            },
+            schema=TABLE_SCHEMAS["blocks_raw"],
+        )
+        canonical = pa.table(
+            {
+                "chain_id": [CHAIN_ID] * len(numbers),
+                "block_number": numbers,
+                "block_hash": block_hashes,
+                "parent_hash": parents,
+                "is_canonical": [True] * len(numbers),
+                "observed_at": [observed_at] * len(numbers),
+            },
+            schema=TABLE_SCHEMAS["canonical_blocks"],
+        )
+        return {
+            "blocks_raw": blocks,
+            "transactions_raw": transactions,
+            "logs_raw": logs,
+            "canonical_blocks": canonical,
+        }
+
+
+def load_options(lake_dir: str) -> LakeOptions:
+    with open(os.path.join(lake_dir, "synthetic.json"), "r", encoding="utf-8") as handle:
+        return LakeOptions(**json.load(handle))
+
+
+class ChunkWriter:
+    def __init__(self, lake_dir: str, options: LakeOptions) -> None:
+        registry = ABIRegistry(ABI_DIR)
+        self.generator = LakeGenerator(options, registry)
+        self.dispatcher = TopicDispatcher(registry, list(DECODER_SPECS.values()))
+        self.writers = {layer: ParquetWriter(os.path.join(lake_dir, layer), ParquetOptions()) for layer in LAYERS}
+
+    def write(self, start_block: int, end_block: int) -> Dict[str, int]:
+        tables = self.generator.chunk(start_block, end_block)
+        decoded: Dict[str, List[pa.Table]] = {spec.table_name: [] for spec in DECODER_SPECS.values()}
+        for batch in tables["logs_raw"].to_batches(max_chunksize=65536):
+            for spec, table in self.dispatcher.decode(batch):
+                decoded[spec.table_name].append(table)
+        for table_name, parts in decoded.items():
+            tables[table_name] = pa.concat_tables(parts) if parts else TABLE_SCHEMAS[table_name].empty_table()
+        for layer, table_names in LAYERS.items():
+            for table_name in table_names:
+                self.writers[layer].write_block_range(
+                    table_name, tables[table_name], "synthetic", start_block, end_block
+                )
+        return {table_name: table.num_rows for table_name, table in tables.items()}
+
+
+_chunk_writer: Optional[ChunkWriter] = None
+
+
+def _start_process(lake_dir: str, options: LakeOptions) -> None:
+    global _chunk_writer
+    _chunk_writer = ChunkWriter(lake_dir, options)
+
+
+def _write_chunk(bounds: Tuple[int, int]) -> Dict[str, int]:
+    assert _chunk_writer is not None
+    return _chunk_writer.write(*bounds)
+
+
+def generate_lake(lake_dir: str, options: LakeOptions, progress: bool = False) -> Dict[str, int]:
+    chunks = [
+        (start_block, min(start_block + options.chunk_blocks - 1, options.end_block))
+        for start_block in range(options.start_block, options.end_block + 1, options.chunk_blocks)
+    ]
+    rows = {table_name: 0 for table_names in LAYERS.values() for table_name in table_names}
+    with multiprocessing.Pool(options.processes, _start_process, (lake_dir, options)) as pool:
+        for done, counts in enumerate(pool.imap_unordered(_write_chunk, chunks), start=1):
+            for table_name, count in counts.items():
+                rows[table_name] += count
+            if progress:
+                print(f"{done}/{len(chunks)} chunks: {rows['logs_raw']} logs", flush=True)
+
+    # A scale small enough to produce no events still leaves every table readable.
+    for layer, table_names in LAYERS.items():
+        for table_name in table_names:
+            if not rows[table_name]:
+                write_empty(
+                    os.path.join(lake_dir, layer, table_name, "block_bucket=0", "part.parquet"),
+                    TABLE_SCHEMAS[table_name],
+                )
+    for layer, table_names in LAYERS.items():
+        for table_name in table_names:
+            TableManifest(os.path.join(lake_dir, layer, table_name)).export_file_list()
+    with open(os.path.join(lake_dir, "synthetic.json"), "w", encoding="utf-8") as handle:
+        json.dump(asdict(options), handle, indent=2)
+    return rows
+
+
+def add_lake_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = LakeOptions()
+    parser.add_argument("--logs", type=int, default=defaults.logs, help="Total bronze logs to generate.")
+    parser.add_argument("--logs-per-block", type=int, default=defaults.logs_per_block)
+    parser.add_argument("--logs-per-tx", type=int, default=defaults.logs_per_tx)
+    parser.add_argument("--chunk-blocks", type=int, default=defaults.chunk_blocks, help="Blocks generated per write.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Chunks generated in parallel.")
+    parser.add_argument("--tokens", type=int, default=defaults.tokens, help="Distinct token contracts.")
+    parser.add_argument("--pairs", type=int, default=defaults.pairs, help="Distinct swap pairs.")
+    parser.add_argument("--wallets", type=int, default=defaults.wallets, help="Distinct wallet addresses.")
+    parser.add_argument("--zipf-s", type=float, default=defaults.zipf_s, help="Zipf exponent of address popularity.")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def lake_options(args: argparse.Namespace) -> LakeOptions:
+    return LakeOptions(
+        logs=args.logs,
+        logs_per_block=args.logs_per_block,
+        logs_per_tx=args.logs_per_tx,
+        chunk_blocks=args.chunk_blocks,
+        processes=args.processes,
+        tokens=args.tokens,
+        pairs=args.pairs,
+        wallets=args.wallets,
+        zipf_s=args.zipf_s,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic bronze/silver lake.")
+    parser.add_argument("--warehouse", default="warehouse", help="Writes <warehouse>/lake.")
+    add_lake_arguments(parser)
+    args = parser.parse_args()
+
+    lake_dir = os.path.join(args.warehouse, "lake")
+    if os.path.exists(os.path.join(lake_dir, "synthetic.json")) or os.path.isdir(os.path.join(lake_dir, "bronze")):
+        raise RuntimeError(f"{lake_dir} already holds a lake; choose an empty --warehouse")
+    started = time.perf_counter()
+    rows = generate_lake(lake_dir, lake_options(args), progress=True)
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{name}={count}" for name, count in rows.items())
+    print(f"Generated {lake_dir} in {elapsed:.1f}s ({rows['logs_raw'] / elapsed:,.0f} logs/s; {summary})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+{#
+  Helpers for lakes written with STORAGE_FORMAT=binary. DuckDB reads fixed-width
+  Parquet binary as BLOB; these render it back to the 0x-hex strings the rest of the
+  project expects, so downstream models are identical for both storage formats.
+#}
+
+{% macro hex0x(column) -%}
+('0x' || lower(hex({{ column }})))
+{%- endmacro %}
+
+{% macro hex_topics(prefix='topic') -%}
+list_filter(
+    [{{ hex0x(prefix ~ '0') }}, {{ hex0x(prefix ~ '1') }}, {{ hex0x(prefix ~ '2') }}, {{ hex0x(prefix ~ '3') }}],
+    t -> t is not null
+  )
+{%- endmacro %}
+
+{% macro is_binary_lake() -%}
+{{ return(var('storage_format', 'hex') == 'binary') }}
+{%- endmacro %}
@@ -0,0 +1,67 @@
+{#
+  Lake tables are partitioned as <table>/block_bucket=<first block>/*.parquet. Reading
+  them with hive_partitioning exposes block_bucket as a column, so filters on it skip
+  whole directories instead of opening every file in the table.
+
+  Writers commit files to a manifest per table and export the current snapshot to
+  <table>/_manifest/files.csv. Models read exactly that file list: files that were
+  replaced but not yet vacuumed stay on disk, so a plain glob would read them twice.
+  The list is read when a view is queried, not when dbt compiles it, so views stay
+  valid across later commits and vacuums without a dbt run; DuckDB turns the filename
+  filter into a file filter, so unlisted files are never opened. A query can still fail
+  if vacuum deletes a file it listed, so the vacuum retention has to outlast the gap
+  between a commit and the next files.csv export plus the longest query. Lakes without
+  a manifest fall back to the glob.
+#}
+
+{% macro lake_has_manifest(table_dir) -%}
+  {%- set found = false -%}
+  {%- if execute -%}
+    {%- set listing = table_dir ~ '/_manifest/files.csv' -%}
+    {%- set found = run_query("select count(*) from glob('" ~ listing ~ "')").columns[0].values()[0] > 0 -%}
+  {%- endif -%}
+  {{ return(found) }}
+{%- endmacro %}
+
+{% macro lake_dir(table_dir) -%}
+{%- if lake_has_manifest(table_dir) -%}
+(
+  select * exclude (filename)
+  from read_parquet('{{ table_dir }}/*/*.parquet', hive_partitioning = true, filename = true)
+  where filename in (
+    select '{{ table_dir }}/' || path
+    from read_csv('{{ table_dir }}/_manifest/files.csv', header = true, all_varchar = true)
+  )
+)
+{%- else -%}
+read_parquet('{{ table_dir }}/*/*.parquet', hive_partitioning = true)
+{%- endif -%}
+{%- endmacro %}
+
+{% macro lake_table(layer, table) -%}
+{{ lake_dir('../warehouse/lake/' ~ layer ~ '/' ~ table) }}
+{%- endmacro %}
+
+{#
+  The tailer's --follow mode keeps blocks within the finality depth in
+  lake/unfinalized/<table>, with the same layout as bronze. This unions them onto the
+  bronze table. Blocks at or below the newest bronze block are dropped: they have
+  already been promoted, and their hot files are only removed after bronze is written.
+  The hot area changes every poll; like bronze, its file list is read at query time.
+  The tailer clears the hot area when it starts, so queries fail until its first poll
+  has written files again.
+#}
+{% macro lake_table_with_unfinalized(table) -%}
+{%- set hot_dir = '../warehouse/lake/unfinalized/' ~ table -%}
+{%- if lake_has_manifest(hot_dir) -%}
+(
+  select * from {{ lake_table('bronze', table) }}
+  union all by name
+  select *
+  from {{ lake_dir(hot_dir) }}
+  where block_number > (select coalesce(max(block_number), -1) from {{ lake_table('bronze', 'blocks_raw') }})
+)
+{%- else -%}
+{{ lake_table('bronze', table) }}
+{%- endif -%}
+{%- endmacro %}
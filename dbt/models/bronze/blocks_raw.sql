@@ -1,2 +1,20 @@
+{% if is_binary_lake() %}
+select
+  chain_id,
+  block_number,
+  {{ hex0x('block_hash') }} as block_hash,
+  {{ hex0x('parent_hash') }} as parent_hash,
+  timestamp,
+  {{ hex0x('miner') }} as miner,
+  gas_used,
+  gas_limit,
+  base_fee_per_gas,
+  tx_count,
+  observed_at,
+  base_fee_per_gas_u256,
+  block_bucket
+from {{ lake_table('bronze', 'blocks_raw') }}
+{% else %}
 select *
-from read_parquet('../warehouse/lake/bronze/blocks_raw/*.parquet')
+from {{ lake_table('bronze', 'blocks_raw') }}
+{% endif %}
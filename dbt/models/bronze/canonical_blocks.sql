@@ -1,2 +1,14 @@
+{% if is_binary_lake() %}
+select
+  chain_id,
+  block_number,
+  {{ hex0x('block_hash') }} as block_hash,
+  {{ hex0x('parent_hash') }} as parent_hash,
+  is_canonical,
+  observed_at,
+  block_bucket
+from {{ lake_table('bronze', 'canonical_blocks') }}
+{% else %}
 select *
-from read_parquet('../warehouse/lake/bronze/canonical_blocks/*.parquet')
+from {{ lake_table('bronze', 'canonical_blocks') }}
+{% endif %}
@@ -1,2 +1,18 @@
+{% if is_binary_lake() %}
+select
+  chain_id,
+  block_number,
+  {{ hex0x('block_hash') }} as block_hash,
+  {{ hex0x('tx_hash') }} as tx_hash,
+  tx_index,
+  log_index,
+  {{ hex0x('address') }} as address,
+  {{ hex0x('data') }} as data,
+  {{ hex_topics() }} as topics,
+  removed,
+  block_bucket
+from {{ lake_table('bronze', 'logs_raw') }}
+{% else %}
 select *
-from read_parquet('../warehouse/lake/bronze/logs_raw/*.parquet')
+from {{ lake_table('bronze', 'logs_raw') }}
+{% endif %}
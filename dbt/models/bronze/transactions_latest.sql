@@ -0,0 +1,23 @@
+{% if is_binary_lake() %}
+select
+  chain_id,
+  block_number,
+  {{ hex0x('block_hash') }} as block_hash,
+  {{ hex0x('tx_hash') }} as tx_hash,
+  tx_index,
+  {{ hex0x('from_address') }} as from_address,
+  {{ hex0x('to_address') }} as to_address,
+  value,
+  gas,
+  gas_price,
+  nonce,
+  {{ hex0x('input') }} as input,
+  value_u256,
+  gas_u256,
+  gas_price_u256,
+  block_bucket
+from {{ lake_table_with_unfinalized('transactions_raw') }}
+{% else %}
+select *
+from {{ lake_table_with_unfinalized('transactions_raw') }}
+{% endif %}
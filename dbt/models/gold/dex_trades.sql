@@ -9,5 +9,9 @@ select
   amount0_in,
   amount1_in,
   amount0_out,
-  amount1_out
+  amount1_out,
+  amount0_in_u256,
+  amount1_in_u256,
+  amount0_out_u256,
+  amount1_out_u256
 from {{ ref('event_uniswap_v2_swap') }}
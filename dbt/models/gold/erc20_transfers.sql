@@ -6,5 +6,6 @@ select
   contract_address as token_address,
   from_address,
   to_address,
-  value_raw
+  value_raw,
+  value_raw_u256
 from {{ ref('event_erc20_transfer') }}
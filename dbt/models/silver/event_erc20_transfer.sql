@@ -1,2 +1,2 @@
 select *
-from read_parquet('../warehouse/lake/silver/event_erc20_transfer/*.parquet')
+from {{ lake_table('silver', 'event_erc20_transfer') }}
@@ -1,2 +1,2 @@
 select *
-from read_parquet('../warehouse/lake/silver/event_uniswap_v2_swap/*.parquet')
+from {{ lake_table('silver', 'event_uniswap_v2_swap') }}
@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass
+from typing import Optional, Tuple
 
 try:
     from dotenv import load_dotenv
@@ -14,6 +15,14 @@ class Config:
     rpc_url: str
     finality_depth: int
     warehouse_dir: str
+    rpc_urls: Tuple[str, ...] = ()
+    rpc_weights: Tuple[float, ...] = ()
+    storage_format: str = "hex"
+    parquet_compression: str = "zstd"
+    parquet_compression_level: Optional[int] = None
+    parquet_row_group_size: int = 131072
+    parquet_target_file_mb: int = 256
+    parquet_data_page_size: int = 1048576
 
     @staticmethod
     def from_env() -> "Config":
@@ -23,8 +32,25 @@ class Config:
         chain = os.getenv("CHAIN", "ethereum")
         chain_id = int(os.getenv("CHAIN_ID", "1"))
         rpc_url = os.getenv("RPC_URL", "")
+        rpc_urls = tuple(url.strip() for url in os.getenv("RPC_URLS", "").split(",") if url.strip())
+        if not rpc_urls and rpc_url:
+            rpc_urls = (rpc_url,)
+        if not rpc_url and rpc_urls:
+            rpc_url = rpc_urls[0]
+        rpc_weights = tuple(
+            float(weight) for weight in os.getenv("RPC_WEIGHTS", "").split(",") if weight.strip()
+        )
         finality_depth = int(os.getenv("FINALITY_DEPTH", "64"))
         warehouse_dir = os.getenv("WAREHOUSE_DIR", "warehouse")
+        storage_format = os.getenv("STORAGE_FORMAT", "hex")
+        if storage_format not in ("hex", "binary"):
+            raise ValueError(f"STORAGE_FORMAT must be 'hex' or 'binary', got {storage_format!r}")
+        parquet_compression = os.getenv("PARQUET_COMPRESSION", "zstd")
+        compression_level = os.getenv("PARQUET_COMPRESSION_LEVEL", "").strip()
+        parquet_compression_level = int(compression_level) if compression_level else None
+        parquet_row_group_size = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "131072"))
+        parquet_target_file_mb = int(os.getenv("PARQUET_TARGET_FILE_MB", "256"))
+        parquet_data_page_size = int(os.getenv("PARQUET_DATA_PAGE_SIZE", "1048576"))
 
         return Config(
             chain=chain,
@@ -32,4 +58,12 @@ class Config:
             rpc_url=rpc_url,
             finality_depth=finality_depth,
             warehouse_dir=warehouse_dir,
+            rpc_urls=rpc_urls,
+            rpc_weights=rpc_weights,
+            storage_format=storage_format,
+            parquet_compression=parquet_compression,
+            parquet_compression_level=parquet_compression_level,
+            parquet_row_group_size=parquet_row_group_size,
+            parquet_target_file_mb=parquet_target_file_mb,
+            parquet_data_page_size=parquet_data_page_size,
         )
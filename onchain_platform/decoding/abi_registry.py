@@ -1,16 +1,81 @@
+import bisect
 import json
 import os
-from typing import Any, Dict, List, Optional
+import pickle
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from eth_utils import keccak
 
 
+CACHE_FORMAT = 1
+
+
+@lru_cache(maxsize=None)
+def signature_topic(signature: str) -> str:
+    return "0x" + keccak(text=signature).hex()
+
+
+def event_signature(event_abi: Dict[str, Any]) -> str:
+    inputs = ",".join(item["type"] for item in event_abi.get("inputs", []))
+    return f"{event_abi['name']}({inputs})"
+
+
+@dataclass(frozen=True)
+class EventLayout:
+    protocol: str
+    version: Optional[str]
+    start_block: int
+    name: str
+    topic0: str
+    event_abi: Dict[str, Any]
+    # (input name, ABI type, topic position) for indexed inputs, topic 0 being the signature.
+    indexed: Tuple[Tuple[str, str, int], ...]
+    data_names: Tuple[str, ...]
+    data_types: Tuple[str, ...]
+
+
+def compile_event(
+    protocol: str, version: Optional[str], start_block: int, event_abi: Dict[str, Any]
+) -> EventLayout:
+    indexed = []
+    data_names = []
+    data_types = []
+    for item in event_abi.get("inputs", []):
+        if item.get("indexed"):
+            indexed.append((item.get("name", ""), item["type"], len(indexed) + 1))
+        else:
+            data_names.append(item.get("name", ""))
+            data_types.append(item["type"])
+    return EventLayout(
+        protocol=protocol,
+        version=version,
+        start_block=start_block,
+        name=event_abi["name"],
+        topic0=signature_topic(event_signature(event_abi)),
+        event_abi=event_abi,
+        indexed=tuple(indexed),
+        data_names=tuple(data_names),
+        data_types=tuple(data_types),
+    )
+
+
 class ABIRegistry:
-    def __init__(self, abi_dir: str) -> None:
+    def __init__(self, abi_dir: str, cache_path: Optional[str] = None) -> None:
         self.abi_dir = abi_dir
+        self.cache_path = cache_path
         self._cache: Dict[str, Dict[str, Any]] = {}
         self._registry: Dict[str, List[Dict[str, Any]]] = {}
-        self._load_registry()
+        # Compiled views, built once at load time.
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._starts: Dict[str, List[int]] = {}
+        self._events: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._topics: Dict[str, List[EventLayout]] = {}
+        if not self._load_cache():
+            self._load_registry()
+            self._compile()
+            self._write_cache()
 
     def _load_registry(self) -> None:
         registry_path = os.path.join(self.abi_dir, "registry.json")
@@ -20,6 +85,66 @@ class ABIRegistry:
         with open(registry_path, "r", encoding="utf-8") as handle:
             self._registry = json.load(handle)
 
+    def _compile(self) -> None:
+        for protocol, entries in self._registry.items():
+            ordered = sorted(entries, key=lambda x: x.get("start_block", 0))
+            self._entries[protocol] = ordered
+            self._starts[protocol] = [entry.get("start_block", 0) for entry in ordered]
+            for entry in ordered:
+                self._index_events(entry["abi"])
+                for event in self.load(entry["abi"]).get("events", []):
+                    layout = compile_event(
+                        protocol, entry.get("version"), entry.get("start_block", 0), event
+                    )
+                    self._topics.setdefault(layout.topic0, []).append(layout)
+
+    def _fingerprint(self) -> Dict[str, Tuple[int, int]]:
+        fingerprint: Dict[str, Tuple[int, int]] = {}
+        if not os.path.isdir(self.abi_dir):
+            return fingerprint
+        for item in os.scandir(self.abi_dir):
+            if item.name.endswith(".json"):
+                stat = item.stat()
+                fingerprint[item.name] = (stat.st_mtime_ns, stat.st_size)
+        return fingerprint
+
+    def _load_cache(self) -> bool:
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "rb") as handle:
+                payload = pickle.load(handle)
+        except Exception:
+            return False
+        if payload.get("format") != CACHE_FORMAT or payload.get("fingerprint") != self._fingerprint():
+            return False
+        self._registry = payload["registry"]
+        self._cache = payload["abis"]
+        self._entries = payload["entries"]
+        self._starts = payload["starts"]
+        self._events = payload["events"]
+        self._topics = payload["topics"]
+        return True
+
+    def _write_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        payload = {
+            "format": CACHE_FORMAT,
+            "fingerprint": self._fingerprint(),
+            "registry": self._registry,
+            "abis": self._cache,
+            "entries": self._entries,
+            "starts": self._starts,
+            "events": self._events,
+            "topics": self._topics,
+        }
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            pickle.dump(payload, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
     def load(self, name: str) -> Dict[str, Any]:
         filename = name if name.endswith(".json") else f"{name}.json"
         if filename in self._cache:
@@ -30,11 +155,16 @@ class ABIRegistry:
         self._cache[filename] = data
         return data
 
+    def _index_events(self, abi_name: str) -> Dict[str, Dict[str, Any]]:
+        events: Dict[str, Dict[str, Any]] = {}
+        for event in self.load(abi_name).get("events", []):
+            events.setdefault(event.get("name"), event)
+        self._events[abi_name] = events
+        return events
+
     @staticmethod
     def event_topic(event_abi: Dict[str, Any]) -> str:
-        inputs = ",".join(item["type"] for item in event_abi.get("inputs", []))
-        signature = f"{event_abi['name']}({inputs})"
-        return "0x" + keccak(text=signature).hex()
+        return signature_topic(event_signature(event_abi))
 
     def get_event(
         self,
@@ -43,29 +173,64 @@ class ABIRegistry:
         block_number: Optional[int] = None,
         version: Optional[str] = None,
     ) -> Optional[Dict[str, Any]]:
-        abi = self._resolve_abi(protocol, block_number, version)
-        for event in abi.get("events", []):
-            if event.get("name") == event_name:
-                return event
-        return None
+        abi_name = self._resolve_abi_name(protocol, block_number, version)
+        events = self._events.get(abi_name)
+        if events is None:
+            events = self._index_events(abi_name)
+        return events.get(event_name)
 
-    def _resolve_abi(
+    def events_for_topic(self, topic0: str) -> List[EventLayout]:
+        return self._topics.get(topic0.lower(), [])
+
+    def event_layout(
+        self, protocol: str, event_name: str, block_number: Optional[int] = None
+    ) -> Optional[EventLayout]:
+        event_abi = self.get_event(protocol, event_name, block_number)
+        if event_abi is None:
+            return None
+        entry = self._resolve_entry(protocol, block_number, None)
+        start_block = entry.get("start_block", 0) if entry is not None else 0
+        for layout in self.events_for_topic(self.event_topic(event_abi)):
+            if layout.protocol == protocol and layout.start_block == start_block:
+                return layout
+        return compile_event(protocol, None, start_block, event_abi)
+
+    def protocol_addresses(self, protocol: str) -> List[str]:
+        addresses: List[str] = []
+        for entry in self._registry.get(protocol, []):
+            addresses.extend(entry.get("addresses", []))
+        return addresses
+
+    def _resolve_entry(
         self, protocol: str, block_number: Optional[int], version: Optional[str]
-    ) -> Dict[str, Any]:
-        entries = self._registry.get(protocol)
+    ) -> Optional[Dict[str, Any]]:
+        entries = self._entries.get(protocol)
         if not entries:
-            return self.load(protocol)
+            return None
 
         if version is not None:
-            for entry in entries:
+            for entry in self._registry[protocol]:
                 if entry.get("version") == version:
-                    return self.load(entry["abi"])
+                    return entry
 
         if block_number is not None:
-            candidates = [entry for entry in entries if entry.get("start_block", 0) <= block_number]
-            if candidates:
-                chosen = sorted(candidates, key=lambda x: x.get("start_block", 0))[-1]
-                return self.load(chosen["abi"])
+            # Entries are sorted by start_block at load, so the active version is the
+            # rightmost one starting at or before the block.
+            position = bisect.bisect_right(self._starts[protocol], block_number) - 1
+            if position >= 0:
+                return entries[position]
+
+        return entries[-1]
+
+    def _resolve_abi_name(
+        self, protocol: str, block_number: Optional[int], version: Optional[str]
+    ) -> str:
+        entry = self._resolve_entry(protocol, block_number, version)
+        if entry is None:
+            return protocol
+        return entry["abi"]
 
-        chosen = sorted(entries, key=lambda x: x.get("start_block", 0))[-1]
-        return self.load(chosen["abi"])
+    def _resolve_abi(
+        self, protocol: str, block_number: Optional[int], version: Optional[str]
+    ) -> Dict[str, Any]:
+        return self.load(self._resolve_abi_name(protocol, block_number, version))
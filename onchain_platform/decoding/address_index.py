@@ -0,0 +1,156 @@
+import argparse
+import os
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from onchain_platform.config import Config
+from onchain_platform.ingestion.writers.manifest import TableManifest
+from onchain_platform.ingestion.writers.schemas import ADDRESS_COLUMNS, LAYERS
+
+
+# Sidecar index over the silver lake: every address seen in a table's address columns
+# maps to the (file, row group) pairs that contain it. A wallet or token lookup then
+# reads only those row groups instead of scanning the table. Entries are kept per block
+# bucket and replaced whenever decode_worker rewrites that bucket.
+
+SCHEMA = """
+create table if not exists address_row_groups (
+    address text not null,
+    table_name text not null,
+    bucket integer not null,
+    path text not null,
+    row_group integer not null,
+    primary key (address, table_name, path, row_group)
+) without rowid;
+create index if not exists address_row_groups_bucket on address_row_groups (table_name, bucket);
+"""
+
+
+def row_group_addresses(path: str, columns: List[str]) -> Iterator[Tuple[int, List[str]]]:
+    parquet = pq.ParquetFile(path)
+    columns = [name for name in columns if name in parquet.schema_arrow.names]
+    if not columns:
+        return
+    for row_group in range(parquet.num_row_groups):
+        table = parquet.read_row_group(row_group, columns=columns)
+        values = pa.chunked_array(
+            [chunk for name in columns for chunk in table.column(name).chunks], type=pa.string()
+        )
+        addresses = pc.unique(pc.utf8_lower(values.drop_null()))
+        yield row_group, addresses.to_pylist()
+
+
+class AddressIndex:
+    def __init__(self, lake_dir: str, path: str) -> None:
+        self.lake_dir = lake_dir
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.executescript(SCHEMA)
+        self._manifests: Dict[str, TableManifest] = {}
+
+    @staticmethod
+    def for_config(config: Config) -> "AddressIndex":
+        return AddressIndex(
+            os.path.join(config.warehouse_dir, "lake"),
+            os.path.join(config.warehouse_dir, "state", "address_index.sqlite"),
+        )
+
+    def manifest(self, table_name: str, layer: str = "silver") -> TableManifest:
+        table_dir = os.path.join(self.lake_dir, layer, table_name)
+        if table_dir not in self._manifests:
+            self._manifests[table_dir] = TableManifest(table_dir)
+        return self._manifests[table_dir]
+
+    def index_bucket(self, table_name: str, bucket: int, layer: str = "silver") -> int:
+        columns = ADDRESS_COLUMNS.get(table_name, [])
+        manifest = self.manifest(table_name, layer)
+        entries = []
+        if columns:
+            for file_entry in manifest.snapshot().entries(bucket=bucket):
+                path = os.path.join(manifest.table_dir, file_entry.path)
+                relative = os.path.relpath(path, self.lake_dir)
+                for row_group, addresses in row_group_addresses(path, columns):
+                    entries.extend((address, table_name, bucket, relative, row_group) for address in addresses)
+        # The bucket's files were just replaced as a whole, so its entries are too.
+        with self._conn:
+            self._conn.execute(
+                "delete from address_row_groups where table_name = ? and bucket = ?", (table_name, bucket)
+            )
+            self._conn.executemany("insert into address_row_groups values (?, ?, ?, ?, ?)", entries)
+        return len(entries)
+
+    def lookup(self, table_name: str, address: str) -> Dict[str, List[int]]:
+        row_groups: Dict[str, List[int]] = defaultdict(list)
+        cursor = self._conn.execute(
+            "select path, row_group from address_row_groups"
+            " where address = ? and table_name = ? order by path, row_group",
+            (address.lower(), table_name),
+        )
+        for path, row_group in cursor:
+            row_groups[os.path.join(self.lake_dir, path)].append(row_group)
+        return dict(row_groups)
+
+    def read_rows(
+        self, table_name: str, address: str, columns: Optional[List[str]] = None
+    ) -> Optional[pa.Table]:
+        address = address.lower()
+        address_columns = ADDRESS_COLUMNS.get(table_name, [])
+        tables = []
+        for path, row_groups in self.lookup(table_name, address).items():
+            table = pq.ParquetFile(path).read_row_groups(row_groups)
+            match = None
+            for name in address_columns:
+                if name in table.column_names:
+                    hit = pc.equal(pc.utf8_lower(table.column(name)), address)
+                    match = hit if match is None else pc.or_(match, hit)
+            if match is not None:
+                table = table.filter(pc.fill_null(match, False))
+            tables.append(table.select(columns) if columns else table)
+        if not tables:
+            return None
+        return pa.concat_tables(tables)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Look up silver rows by address via the address index.")
+    parser.add_argument("--table", default="event_erc20_transfer", choices=LAYERS["silver"])
+    parser.add_argument("--address", help="Wallet, token or pair address (0x...).")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index every silver bucket first.")
+    parser.add_argument("--limit", type=int, default=20, help="Rows to print.")
+    args = parser.parse_args()
+
+    config = Config.from_env()
+    index = AddressIndex.for_config(config)
+    try:
+        if args.rebuild:
+            for table_name in LAYERS["silver"]:
+                buckets = index.manifest(table_name).snapshot().buckets()
+                entries = sum(index.index_bucket(table_name, bucket) for bucket in buckets)
+                print(f"{table_name}: {entries} index entries")
+        if args.address is None:
+            return
+        row_groups = index.lookup(args.table, args.address)
+        rows = index.read_rows(args.table, args.address)
+        if rows is None:
+            print(f"{args.address} not found in {args.table}")
+            return
+        scanned = sum(len(groups) for groups in row_groups.values())
+        print(f"{rows.num_rows} rows from {scanned} row groups in {len(row_groups)} files")
+        for row in rows.slice(0, args.limit).to_pylist():
+            print(row)
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,241 @@
 import argparse
 import os
-from typing import Any, Dict, List, Optional
+from contextlib import ExitStack
+from typing import Any, Dict, Iterator, List, Optional, Union
 
+import pyarrow as pa
 import pyarrow.dataset as ds
 
 from onchain_platform.config import Config
 from onchain_platform.decoding.abi_registry import ABIRegistry
-from onchain_platform.decoding.decoders.erc20 import decode_transfers
-from onchain_platform.decoding.decoders.uniswap_v2 import decode_swaps
-from onchain_platform.ingestion.writers.parquet_writer import ParquetWriter
+from onchain_platform.decoding.address_index import AddressIndex
+from onchain_platform.decoding.dispatch import DECODER_SPECS, DecoderSpec, TopicDispatcher
+from onchain_platform.ingestion.writers.binary_format import (
+    binary_column_names,
+    decode_table,
+    is_binary_layout,
+)
+from onchain_platform.ingestion.writers.manifest import TableManifest, logical_name
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, ParquetWriter, TableStream
+from onchain_platform.ingestion.writers.partitioning import (
+    BUCKET_SIZE,
+    PARTITION_KEY,
+    bucket_dir,
+    bucket_filter,
+    flat_files,
+    open_dataset,
+)
+from onchain_platform.ingestion.writers.schemas import TABLE_SCHEMAS
 
 
-def load_logs(path: str, start_block: Optional[int], end_block: Optional[int]) -> List[Dict[str, Any]]:
-    if not os.path.exists(path):
-        return []
-    dataset = ds.dataset(path, format="parquet")
-    table = dataset.to_table()
-    rows = table.to_pylist()
-    if start_block is None and end_block is None:
-        return rows
-
-    filtered = []
-    for row in rows:
-        block_number = row.get("block_number")
-        if start_block is not None and block_number < start_block:
-            continue
-        if end_block is not None and block_number > end_block:
+# Only the columns the decoders read are projected out of bronze/logs_raw.
+LOG_COLUMNS = ["chain_id", "block_number", "tx_hash", "log_index", "address", "data", "topics"]
+
+
+def block_range_filter(start_block: Optional[int], end_block: Optional[int]) -> Optional[ds.Expression]:
+    expression: Optional[ds.Expression] = None
+    if start_block is not None:
+        expression = ds.field("block_number") >= start_block
+    if end_block is not None:
+        upper = ds.field("block_number") <= end_block
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def scan_filter(start_block: Optional[int], end_block: Optional[int]) -> Optional[ds.Expression]:
+    expression = block_range_filter(start_block, end_block)
+    buckets = bucket_filter(start_block, end_block)
+    return expression if buckets is None else buckets & expression
+
+
+def iter_log_batches(
+    source: Union[str, List[str]],
+    start_block: Optional[int],
+    end_block: Optional[int],
+    columns: Optional[List[str]] = None,
+    batch_size: int = 65536,
+    base_dir: Optional[str] = None,
+) -> Iterator[pa.RecordBatch]:
+    # source is a logs_raw directory or a file list planned from its manifest (base_dir
+    # is then the table directory).
+    if isinstance(source, str) and not os.path.exists(source):
+        return
+    if not source:
+        return
+    dataset = open_dataset(source, base_dir)
+    binary = is_binary_layout(dataset.schema)
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != PARTITION_KEY]
+    elif binary:
+        columns = binary_column_names(columns)
+    # The block filter is pushed into the scan: bucket directories outside the window are
+    # pruned from their path, and row groups by their block_number statistics.
+    scanner = dataset.scanner(
+        columns=columns,
+        filter=scan_filter(start_block, end_block),
+        batch_size=batch_size,
+    )
+    for batch in scanner.to_batches():
+        if not batch.num_rows:
             continue
-        filtered.append(row)
-    return filtered
+        if binary:
+            # Decoders work on the hex layout; binary lakes are rendered back per batch.
+            yield from decode_table("logs_raw", batch).to_batches()
+        else:
+            yield batch
+
+
+def kept_silver_batches(
+    table_dir: str,
+    schema: pa.Schema,
+    paths: List[str],
+    start_block: Optional[int],
+    end_block: Optional[int],
+) -> Iterator[pa.RecordBatch]:
+    # Rows of existing silver files within [start_block, end_block] (open-ended when None).
+    if not paths:
+        return
+    scanner = open_dataset(paths, table_dir).scanner(
+        columns=schema.names, filter=block_range_filter(start_block, end_block)
+    )
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch
+
+
+def load_logs(path: str, start_block: Optional[int], end_block: Optional[int]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for batch in iter_log_batches(path, start_block, end_block):
+        rows.extend(batch.to_pylist())
+    return rows
+
+
+def select_specs(protocol_arg: str) -> List[DecoderSpec]:
+    if protocol_arg == "all":
+        return list(DECODER_SPECS.values())
+    specs = []
+    for protocol in protocol_arg.split(","):
+        protocol = protocol.strip()
+        if protocol not in DECODER_SPECS:
+            raise RuntimeError(f"Unsupported protocol: {protocol}")
+        specs.append(DECODER_SPECS[protocol])
+    return specs
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Decode logs into typed events.")
-    parser.add_argument("--protocol", default="erc20")
-    parser.add_argument("--start", type=int)
-    parser.add_argument("--end", type=int)
+    parser.add_argument(
+        "--protocol",
+        default="erc20",
+        help="Protocol to decode, a comma-separated list, or 'all' (one scan for every protocol).",
+    )
+    parser.add_argument("--start", type=int, help="First block to decode.")
+    parser.add_argument("--end", type=int, help="Last block to decode.")
+    parser.add_argument("--batch-size", type=int, default=65536, help="Log rows decoded per batch.")
+    parser.add_argument(
+        "--no-address-index",
+        action="store_true",
+        help="Skip updating the address -> row group index for the rewritten buckets.",
+    )
     args = parser.parse_args()
 
+    specs = select_specs(args.protocol)
+
     config = Config.from_env()
     bronze_logs_path = os.path.join(config.warehouse_dir, "lake", "bronze", "logs_raw")
     silver_dir = os.path.join(config.warehouse_dir, "lake", "silver")
+    if flat_files(bronze_logs_path):
+        raise RuntimeError(
+            f"{bronze_logs_path} has unpartitioned files; run scripts/migrate_lake_partitions.py first"
+        )
 
-    logs = load_logs(bronze_logs_path, args.start, args.end)
-    if not logs:
-        print("No logs found to decode. Run ingestion first.")
-        return
-    registry = ABIRegistry(os.path.join(os.path.dirname(__file__), "abis"))
+    registry = ABIRegistry(
+        os.path.join(os.path.dirname(__file__), "abis"),
+        cache_path=os.path.join(config.warehouse_dir, "state", "abi_registry.pkl"),
+    )
+    dispatcher = TopicDispatcher(registry, specs)
+    writer = ParquetWriter(silver_dir, ParquetOptions.from_config(config))
+    index = None if args.no_address_index else AddressIndex.for_config(config)
 
-    writer = ParquetWriter(silver_dir)
+    scanned = 0
+    written = {spec.protocol: 0 for spec in specs}
+    # The whole run reads one snapshot of bronze logs, so concurrent ingestion never
+    # shows up halfway through. Silver is rewritten one block bucket at a time so every
+    # bucket stays complete. In the edge buckets of --start/--end only the window is
+    # decoded; the bucket's existing silver rows outside it are copied into the rewrite.
+    snapshot = TableManifest(bronze_logs_path).snapshot()
+    for bucket in snapshot.buckets(args.start, args.end):
+        first = args.start if args.start is not None and args.start > bucket else None
+        last = args.end if args.end is not None and args.end < bucket + BUCKET_SIZE - 1 else None
+        kept: Dict[str, List[str]] = {}
+        if first is not None or last is not None:
+            for spec in specs:
+                silver = writer.manifest(spec.table_name)
+                stem = logical_name(os.path.join(bucket_dir("", bucket), spec.filename))
+                kept[spec.protocol] = [
+                    os.path.join(silver.table_dir, entry.path)
+                    for entry in silver.snapshot().entries(bucket=bucket)
+                    if logical_name(entry.path) == stem
+                ]
+        with ExitStack() as stack:
+            streams: Dict[str, TableStream] = {
+                spec.protocol: stack.enter_context(
+                    writer.open_stream(
+                        spec.table_name, spec.filename, TABLE_SCHEMAS[spec.table_name], bucket=bucket
+                    )
+                )
+                for spec in specs
+            }
+            if first is not None:
+                for spec in specs:
+                    for batch in kept_silver_batches(
+                        writer.manifest(spec.table_name).table_dir,
+                        TABLE_SCHEMAS[spec.table_name],
+                        kept[spec.protocol],
+                        None,
+                        first - 1,
+                    ):
+                        streams[spec.protocol].write_table(pa.Table.from_batches([batch]))
+            batches = iter_log_batches(
+                [
+                    os.path.join(bronze_logs_path, entry.path)
+                    for entry in snapshot.entries(first, last, bucket=bucket)
+                ],
+                first,
+                last,
+                columns=LOG_COLUMNS,
+                batch_size=args.batch_size,
+                base_dir=bronze_logs_path,
+            )
+            for batch in batches:
+                scanned += batch.num_rows
+                for spec, decoded in dispatcher.decode(batch):
+                    streams[spec.protocol].write_table(decoded)
+            if last is not None:
+                for spec in specs:
+                    for batch in kept_silver_batches(
+                        writer.manifest(spec.table_name).table_dir,
+                        TABLE_SCHEMAS[spec.table_name],
+                        kept[spec.protocol],
+                        last + 1,
+                        None,
+                    ):
+                        streams[spec.protocol].write_table(pa.Table.from_batches([batch]))
 
-    if args.protocol == "erc20":
-        decoded = decode_transfers(registry, logs)
-        writer.write_rows("event_erc20_transfer", decoded, filename="erc20_transfer.parquet")
-    elif args.protocol == "uniswap_v2":
-        decoded = decode_swaps(registry, logs)
-        writer.write_rows("event_uniswap_v2_swap", decoded, filename="uniswap_v2_swap.parquet")
-    else:
-        raise RuntimeError(f"Unsupported protocol: {args.protocol}")
+        for protocol, stream in streams.items():
+            written[protocol] += stream.rows_written
+        if index is not None:
+            for spec in specs:
+                index.index_bucket(spec.table_name, bucket)
 
-    print("Decoding complete")
+    writer.export_file_lists()
+    if index is not None:
+        index.close()
+    if scanned == 0:
+        print("No logs found to decode. Run ingestion first.")
+        return
+    summary = ", ".join(f"{name}={count}" for name, count in written.items())
+    print(f"Decoding complete ({scanned} logs scanned; {summary})")
 
 
 if __name__ == "__main__":
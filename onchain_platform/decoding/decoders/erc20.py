@@ -1,8 +1,16 @@
 from typing import Any, Dict, Iterable, List
 
+import pyarrow as pa
 from eth_abi import decode
 
 from onchain_platform.decoding.abi_registry import ABIRegistry
+from onchain_platform.decoding.decoders.vectorized import (
+    LogBatch,
+    select_event_logs,
+    topic_addresses,
+    uint256_words,
+)
+from onchain_platform.ingestion.writers.schemas import EVENT_ERC20_TRANSFER, amount_arrays, split_amount
 
 
 TRANSFER_SIGNATURE = "Transfer(address,address,uint256)"
@@ -14,14 +22,18 @@ def _topic_to_address(topic: str) -> str:
     return "0x" + topic[-40:]
 
 
+def _transfer_topic(registry: ABIRegistry) -> str:
+    event_abi = registry.get_event("erc20", "Transfer")
+    if not event_abi:
+        raise RuntimeError("ERC20 Transfer ABI not found")
+    return registry.event_topic(event_abi)
+
+
 def decode_transfers(
     registry: ABIRegistry,
     logs: Iterable[Dict[str, Any]],
 ) -> List[Dict[str, Any]]:
-    event_abi = registry.get_event("erc20", "Transfer")
-    if not event_abi:
-        raise RuntimeError("ERC20 Transfer ABI not found")
-    topic0 = registry.event_topic(event_abi)
+    topic0 = _transfer_topic(registry)
 
     decoded: List[Dict[str, Any]] = []
     for log in logs:
@@ -38,6 +50,7 @@ def decode_transfers(
         from_addr = _topic_to_address(topics[1])
         to_addr = _topic_to_address(topics[2])
         value = decode(["uint256"], bytes.fromhex(data[2:]))[0]
+        value_raw, value_raw_u256 = split_amount(int(value))
 
         decoded.append(
             {
@@ -48,8 +61,30 @@ def decode_transfers(
                 "contract_address": log.get("address"),
                 "from_address": from_addr,
                 "to_address": to_addr,
-                "value_raw": str(int(value)),
+                "value_raw": value_raw,
+                "value_raw_u256": value_raw_u256,
             }
         )
 
     return decoded
+
+
+def decode_transfers_batch(registry: ABIRegistry, batch: LogBatch) -> pa.Table:
+    logs = select_event_logs(batch, _transfer_topic(registry), min_topics=3, min_data_length=66)
+    if logs.num_rows == 0:
+        return EVENT_ERC20_TRANSFER.empty_table()
+    value_raw, value_raw_u256 = amount_arrays(uint256_words(logs, 0))
+    return pa.Table.from_arrays(
+        [
+            logs.column("chain_id"),
+            logs.column("block_number"),
+            logs.column("tx_hash"),
+            logs.column("log_index"),
+            logs.column("address"),
+            topic_addresses(logs, 1),
+            topic_addresses(logs, 2),
+            value_raw,
+            value_raw_u256,
+        ],
+        schema=EVENT_ERC20_TRANSFER,
+    )
@@ -1,8 +1,19 @@
 from typing import Any, Dict, Iterable, List
 
+import pyarrow as pa
 from eth_abi import decode
 
 from onchain_platform.decoding.abi_registry import ABIRegistry
+from onchain_platform.decoding.decoders.vectorized import (
+    LogBatch,
+    select_event_logs,
+    topic_addresses,
+    uint256_words,
+)
+from onchain_platform.ingestion.writers.schemas import EVENT_UNISWAP_V2_SWAP, amount_arrays, split_amount
+
+
+AMOUNT_COLUMNS = ("amount0_in", "amount1_in", "amount0_out", "amount1_out")
 
 
 def _topic_to_address(topic: str) -> str:
@@ -11,14 +22,18 @@ def _topic_to_address(topic: str) -> str:
     return "0x" + topic[-40:]
 
 
+def _swap_topic(registry: ABIRegistry) -> str:
+    event_abi = registry.get_event("uniswap_v2", "Swap")
+    if not event_abi:
+        raise RuntimeError("Uniswap V2 Swap ABI not found")
+    return registry.event_topic(event_abi)
+
+
 def decode_swaps(
     registry: ABIRegistry,
     logs: Iterable[Dict[str, Any]],
 ) -> List[Dict[str, Any]]:
-    event_abi = registry.get_event("uniswap_v2", "Swap")
-    if not event_abi:
-        raise RuntimeError("Uniswap V2 Swap ABI not found")
-    topic0 = registry.event_topic(event_abi)
+    topic0 = _swap_topic(registry)
 
     decoded: List[Dict[str, Any]] = []
     for log in logs:
@@ -34,24 +49,40 @@ def decode_swaps(
             continue
         sender = _topic_to_address(topics[1])
         to_addr = _topic_to_address(topics[2])
-        amount0_in, amount1_in, amount0_out, amount1_out = decode(
-            ["uint256", "uint256", "uint256", "uint256"], bytes.fromhex(data[2:])
-        )
-
-        decoded.append(
-            {
-                "chain_id": log.get("chain_id"),
-                "block_number": log.get("block_number"),
-                "tx_hash": log.get("tx_hash"),
-                "log_index": log.get("log_index"),
-                "pair_address": log.get("address"),
-                "sender": sender,
-                "to_address": to_addr,
-                "amount0_in": str(int(amount0_in)),
-                "amount1_in": str(int(amount1_in)),
-                "amount0_out": str(int(amount0_out)),
-                "amount1_out": str(int(amount1_out)),
-            }
-        )
+        amounts = decode(["uint256", "uint256", "uint256", "uint256"], bytes.fromhex(data[2:]))
+
+        row = {
+            "chain_id": log.get("chain_id"),
+            "block_number": log.get("block_number"),
+            "tx_hash": log.get("tx_hash"),
+            "log_index": log.get("log_index"),
+            "pair_address": log.get("address"),
+            "sender": sender,
+            "to_address": to_addr,
+        }
+        for column, amount in zip(AMOUNT_COLUMNS, amounts):
+            row[column], row[f"{column}_u256"] = split_amount(int(amount))
+        decoded.append(row)
 
     return decoded
+
+
+def decode_swaps_batch(registry: ABIRegistry, batch: LogBatch) -> pa.Table:
+    logs = select_event_logs(batch, _swap_topic(registry), min_topics=3, min_data_length=2 + 64 * 4)
+    if logs.num_rows == 0:
+        return EVENT_UNISWAP_V2_SWAP.empty_table()
+    amounts, overflows = zip(*(amount_arrays(uint256_words(logs, word)) for word in range(4)))
+    return pa.Table.from_arrays(
+        [
+            logs.column("chain_id"),
+            logs.column("block_number"),
+            logs.column("tx_hash"),
+            logs.column("log_index"),
+            logs.column("address"),
+            topic_addresses(logs, 1),
+            topic_addresses(logs, 2),
+        ]
+        + list(amounts)
+        + list(overflows),
+        schema=EVENT_UNISWAP_V2_SWAP,
+    )
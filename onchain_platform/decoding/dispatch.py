@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from onchain_platform.decoding.abi_registry import ABIRegistry
+from onchain_platform.decoding.decoders.erc20 import decode_transfers_batch
+from onchain_platform.decoding.decoders.uniswap_v2 import decode_swaps_batch
+from onchain_platform.decoding.decoders.vectorized import LogBatch
+
+
+@dataclass(frozen=True)
+class DecoderSpec:
+    protocol: str
+    event_name: str
+    decode_batch: Callable[[ABIRegistry, LogBatch], pa.Table]
+    table_name: str
+    filename: str
+
+
+DECODER_SPECS: Dict[str, DecoderSpec] = {
+    "erc20": DecoderSpec(
+        "erc20", "Transfer", decode_transfers_batch, "event_erc20_transfer", "erc20_transfer.parquet"
+    ),
+    "uniswap_v2": DecoderSpec(
+        "uniswap_v2", "Swap", decode_swaps_batch, "event_uniswap_v2_swap", "uniswap_v2_swap.parquet"
+    ),
+}
+
+
+# Routes every log of a batch to the decoders registered for its topic0 in one pass.
+# topic0 values are looked up in a hash set (pc.index_in), so the cost per batch does
+# not grow with the number of protocols; protocols pinned to emitting addresses in
+# registry.json are additionally filtered on `address`.
+class TopicDispatcher:
+    def __init__(self, registry: ABIRegistry, specs: Sequence[DecoderSpec]) -> None:
+        self.registry = registry
+        self._routes: List[Tuple[DecoderSpec, int, Optional[pa.Array]]] = []
+        slots: Dict[str, int] = {}
+        for spec in specs:
+            layout = registry.event_layout(spec.protocol, spec.event_name)
+            if layout is None:
+                raise RuntimeError(f"{spec.protocol} {spec.event_name} ABI not found")
+            addresses = registry.protocol_addresses(spec.protocol)
+            address_set = pa.array([item.lower() for item in addresses]) if addresses else None
+            # Events sharing a signature (e.g. ERC20/ERC721 Transfer) share one slot.
+            slot = slots.setdefault(layout.topic0, len(slots))
+            self._routes.append((spec, slot, address_set))
+        self._topics = pa.array(list(slots), type=pa.string())
+
+    @property
+    def specs(self) -> List[DecoderSpec]:
+        return [spec for spec, _, _ in self._routes]
+
+    def route(self, batch: LogBatch) -> Iterator[Tuple[DecoderSpec, pa.Table]]:
+        table = batch if isinstance(batch, pa.Table) else pa.Table.from_batches([batch])
+        has_topic = pc.fill_null(pc.greater(pc.list_value_length(table.column("topics")), 0), False)
+        table = table.filter(has_topic)
+        if table.num_rows == 0:
+            return
+        first_topic = pc.utf8_lower(pc.list_element(table.column("topics"), 0))
+        route_index = pc.index_in(first_topic, value_set=self._topics)
+        routed = pc.is_valid(route_index)
+        table = table.filter(routed)
+        route_index = route_index.filter(routed)
+        if table.num_rows == 0:
+            return
+
+        for spec, slot, address_set in self._routes:
+            mask = pc.fill_null(pc.equal(route_index, slot), False)
+            if address_set is not None:
+                in_set = pc.is_in(pc.utf8_lower(table.column("address")), value_set=address_set)
+                mask = pc.and_(mask, in_set)
+            subset = table.filter(mask)
+            if subset.num_rows:
+                yield spec, subset
+
+    def decode(self, batch: LogBatch) -> Iterator[Tuple[DecoderSpec, pa.Table]]:
+        for spec, subset in self.route(batch):
+            yield spec, spec.decode_batch(self.registry, subset)
@@ -0,0 +1,208 @@
+import argparse
+import mmap
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from onchain_platform.config import Config
+from onchain_platform.ingestion.writers.manifest import TableManifest
+from onchain_platform.planner.leases import file_lock
+
+
+# block_number -> (hash, parent hash) for every block ingested, as two flat files of
+# 32-byte records at offset block_number * 32 (hashes.bin, parents.bin). The files are
+# sparse, so unwritten blocks cost no disk and read back as zeros, which marks them
+# missing. Writes are one pwrite per range and file; reads go through a memory map that
+# is widened as the files grow, so lookups are O(1) and startup does not load anything.
+# Checking and recording a range happens under a lock file, so workers fetching
+# neighbouring ranges out of order (or in other processes) still see each other.
+HASH_SIZE = 32
+ZERO = bytes(HASH_SIZE)
+SCAN_CHUNK = 1 << 20
+
+
+def to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def to_number(value: Any) -> int:
+    return int(value, 16) if isinstance(value, str) else value
+
+
+def to_hex(value: bytes) -> str:
+    return "0x" + value.hex()
+
+
+class ChainIndex:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.lock_path = os.path.join(path, "index.lock")
+        self._lock = threading.Lock()
+        self._fds = {
+            name: os.open(os.path.join(path, f"{name}.bin"), os.O_RDWR | os.O_CREAT, 0o644)
+            for name in ("hashes", "parents")
+        }
+        self._maps: Dict[str, Optional[mmap.mmap]] = {"hashes": None, "parents": None}
+
+    def _read(self, name: str, block_number: int) -> Optional[bytes]:
+        offset = block_number * HASH_SIZE
+        current = self._maps[name]
+        if current is None or len(current) < offset + HASH_SIZE:
+            size = os.fstat(self._fds[name]).st_size
+            if size < offset + HASH_SIZE:
+                return None
+            # Remap to the current size; readers holding the old map keep it alive.
+            current = self._maps[name] = mmap.mmap(self._fds[name], size, access=mmap.ACCESS_READ)
+        value = current[offset : offset + HASH_SIZE]
+        return None if value == ZERO else value
+
+    def hash_of(self, block_number: int) -> Optional[str]:
+        if block_number < 0:
+            return None
+        value = self._read("hashes", block_number)
+        return None if value is None else to_hex(value)
+
+    def parent_of(self, block_number: int) -> Optional[str]:
+        value = self._read("parents", block_number)
+        return None if value is None or self._read("hashes", block_number) is None else to_hex(value)
+
+    def _write(self, first: int, hashes: List[bytes], parents: List[bytes]) -> None:
+        os.pwrite(self._fds["hashes"], b"".join(hashes), first * HASH_SIZE)
+        os.pwrite(self._fds["parents"], b"".join(parents), first * HASH_SIZE)
+
+    def record(self, blocks: Sequence[Dict[str, Any]]) -> Tuple[Optional[str], List[int]]:
+        # Stores raw RPC blocks (ascending, as fetched) and checks them against the blocks
+        # already stored on either side. Returns the stored hash of the block before the
+        # first one, for canonical flags, and the block numbers whose parent link is broken.
+        if not blocks:
+            return None, []
+        numbers = [to_number(block["number"]) for block in blocks]
+        with self._lock, file_lock(self.lock_path):
+            previous = self.hash_of(numbers[0] - 1)
+            broken: List[int] = []
+            if previous is not None and to_bytes(blocks[0]["parentHash"]) != to_bytes(previous):
+                broken.append(numbers[0])
+            following = self.parent_of(numbers[-1] + 1)
+            if following is not None and to_bytes(following) != to_bytes(blocks[-1]["hash"]):
+                broken.append(numbers[-1] + 1)
+            # One pwrite per run of consecutive block numbers.
+            first, hashes, parents = numbers[0], [], []
+            for number, block in zip(numbers, blocks):
+                if number != first + len(hashes):
+                    self._write(first, hashes, parents)
+                    first, hashes, parents = number, [], []
+                hashes.append(to_bytes(block["hash"]))
+                parents.append(to_bytes(block["parentHash"]))
+            self._write(first, hashes, parents)
+        return previous, broken
+
+    def scan(
+        self, start_block: Optional[int] = None, end_block: Optional[int] = None
+    ) -> Tuple[List[Tuple[int, int]], List[int]]:
+        # Missing block ranges and blocks whose parent hash differs from the stored hash of
+        # the block before them, compared a million blocks at a time with Arrow kernels.
+        # Without start_block the scan starts at the first stored block.
+        size = min(os.fstat(fd).st_size for fd in self._fds.values()) // HASH_SIZE
+        end_block = size - 1 if end_block is None else min(end_block, size - 1)
+        explicit_start = start_block is not None
+        start_block = start_block or 0
+        if end_block < start_block:
+            return ([(start_block, end_block)] if explicit_start else []), []
+        maps = {
+            name: pa.py_buffer(mmap.mmap(fd, size * HASH_SIZE, access=mmap.ACCESS_READ))
+            for name, fd in self._fds.items()
+        }
+        zero = pa.scalar(ZERO, pa.binary(HASH_SIZE))
+        gaps: List[Tuple[int, int]] = []
+        forks: List[int] = []
+        gap_start: Optional[int] = None
+        previous_missing = False
+        for chunk_start in range(start_block, end_block + 1, SCAN_CHUNK):
+            # Chunks overlap by one block so links across chunk edges are checked too.
+            first = max(chunk_start - 1, start_block)
+            count = min(chunk_start + SCAN_CHUNK, end_block + 1) - first
+            hashes, parents = (
+                pa.Array.from_buffers(
+                    pa.binary(HASH_SIZE), count, [None, maps[name].slice(first * HASH_SIZE, count * HASH_SIZE)]
+                )
+                for name in ("hashes", "parents")
+            )
+            missing = pc.equal(hashes, zero)
+            linked = pc.and_(pc.invert(missing[1:]), pc.invert(missing[:-1]))
+            mismatched = pc.and_(linked, pc.not_equal(parents[1:], hashes[:-1]))
+            forks.extend(first + 1 + index for index in pc.indices_nonzero(mismatched).to_pylist())
+
+            # Gaps come from the edges of missing runs, not from every missing block.
+            own = missing[chunk_start - first :]
+            edges = [index + 1 for index in pc.indices_nonzero(pc.not_equal(own[1:], own[:-1])).to_pylist()]
+            if own[0].as_py() != previous_missing:
+                edges.insert(0, 0)
+            for index in edges:
+                if own[index].as_py():
+                    gap_start = chunk_start + index
+                else:
+                    gaps.append((gap_start, chunk_start + index - 1))
+                    gap_start = None
+            previous_missing = own[-1].as_py()
+        if gap_start is not None:
+            gaps.append((gap_start, end_block))
+        if not explicit_start and gaps and gaps[0][0] == 0:
+            gaps.pop(0)
+        return gaps, forks
+
+    def close(self) -> None:
+        for fd in self._fds.values():
+            os.close(fd)
+
+
+def rebuild(index: ChainIndex, table_dir: str) -> int:
+    # Loads every block recorded in bronze canonical_blocks, e.g. for lakes ingested
+    # before the index existed.
+    count = 0
+    for path in TableManifest(table_dir).snapshot().paths():
+        table = pq.read_table(path, columns=["block_number", "block_hash", "parent_hash", "is_canonical"])
+        rows = sorted(
+            (row for row in table.to_pylist() if row["is_canonical"] and row["block_hash"]),
+            key=lambda row: row["block_number"],
+        )
+        index.record(
+            [
+                {"number": row["block_number"], "hash": row["block_hash"], "parentHash": row["parent_hash"]}
+                for row in rows
+            ]
+        )
+        count += len(rows)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect the canonical chain index.")
+    parser.add_argument("--index", default="warehouse/state/chain_index")
+    parser.add_argument("--rebuild", action="store_true", help="Load blocks from bronze canonical_blocks first.")
+    parser.add_argument("--start", type=int)
+    parser.add_argument("--end", type=int)
+    args = parser.parse_args()
+
+    index = ChainIndex(args.index)
+    if args.rebuild:
+        config = Config.from_env()
+        table_dir = os.path.join(config.warehouse_dir, "lake", "bronze", "canonical_blocks")
+        print(f"Indexed {rebuild(index, table_dir)} blocks from {table_dir}")
+    gaps, forks = index.scan(args.start, args.end)
+    for start_block, end_block in gaps:
+        print(f"gap {start_block}-{end_block}")
+    for block_number in forks:
+        print(f"fork at {block_number}: parent {index.parent_of(block_number)} != {index.hash_of(block_number - 1)}")
+    print(f"{len(gaps)} gaps, {len(forks)} forks")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
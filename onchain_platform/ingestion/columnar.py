@@ -0,0 +1,121 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import pyarrow as pa
+
+from onchain_platform.ingestion.writers.schemas import (
+    BLOCKS_RAW,
+    CANONICAL_BLOCKS,
+    LOGS_RAW,
+    TRANSACTIONS_RAW,
+    amount_arrays,
+)
+
+
+# Column-at-a-time counterparts of worker.normalize_*: each output column is built with
+# one comprehension over the raw RPC dicts and handed to Arrow with its explicit type,
+# instead of materialising a dict per row and letting from_pylist infer the schema.
+
+
+def _pluck(items: Sequence[Dict[str, Any]], key: str) -> List[Any]:
+    return [item.get(key) for item in items]
+
+
+def hex_ints(values: Sequence[Optional[str]]) -> List[Optional[int]]:
+    return [None if value is None else int(value, 16) for value in values]
+
+
+def _table(schema: pa.Schema, columns: Dict[str, Any]) -> pa.Table:
+    arrays = [pa.array(columns[field.name], type=field.type) for field in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _amounts(columns: Dict[str, Any], name: str, values: List[Optional[int]]) -> None:
+    # Sets <name> and its <name>_u256 overflow companion.
+    columns[name], columns[f"{name}_u256"] = amount_arrays(values)
+
+
+def _constant(value: Any, length: int) -> List[Any]:
+    return [value] * length
+
+
+def blocks_table(chain_id: int, blocks: Sequence[Dict[str, Any]], observed_at: str) -> pa.Table:
+    count = len(blocks)
+    columns: Dict[str, Any] = {
+        "chain_id": _constant(chain_id, count),
+        "block_number": hex_ints(_pluck(blocks, "number")),
+        "block_hash": _pluck(blocks, "hash"),
+        "parent_hash": _pluck(blocks, "parentHash"),
+        "timestamp": hex_ints(_pluck(blocks, "timestamp")),
+        "miner": _pluck(blocks, "miner"),
+        "gas_used": hex_ints(_pluck(blocks, "gasUsed")),
+        "gas_limit": hex_ints(_pluck(blocks, "gasLimit")),
+        "tx_count": [len(block.get("transactions", [])) for block in blocks],
+        "observed_at": _constant(observed_at, count),
+    }
+    _amounts(columns, "base_fee_per_gas", hex_ints(_pluck(blocks, "baseFeePerGas")))
+    return _table(BLOCKS_RAW, columns)
+
+
+def transactions_table(chain_id: int, blocks: Sequence[Dict[str, Any]]) -> pa.Table:
+    txs: List[Dict[str, Any]] = []
+    block_numbers: List[Optional[str]] = []
+    block_hashes: List[Optional[str]] = []
+    for block in blocks:
+        block_txs = block.get("transactions", [])
+        txs.extend(block_txs)
+        block_numbers.extend(_constant(block.get("number"), len(block_txs)))
+        block_hashes.extend(_constant(block.get("hash"), len(block_txs)))
+
+    columns: Dict[str, Any] = {
+        "chain_id": _constant(chain_id, len(txs)),
+        "block_number": hex_ints(block_numbers),
+        "block_hash": block_hashes,
+        "tx_hash": _pluck(txs, "hash"),
+        "tx_index": hex_ints(_pluck(txs, "transactionIndex")),
+        "from_address": _pluck(txs, "from"),
+        "to_address": _pluck(txs, "to"),
+        "nonce": hex_ints(_pluck(txs, "nonce")),
+        "input": _pluck(txs, "input"),
+    }
+    _amounts(columns, "value", hex_ints(_pluck(txs, "value")))
+    _amounts(columns, "gas", hex_ints(_pluck(txs, "gas")))
+    _amounts(columns, "gas_price", hex_ints(_pluck(txs, "gasPrice")))
+    return _table(TRANSACTIONS_RAW, columns)
+
+
+def logs_table(chain_id: int, logs: Sequence[Dict[str, Any]]) -> pa.Table:
+    return _table(
+        LOGS_RAW,
+        {
+            "chain_id": _constant(chain_id, len(logs)),
+            "block_number": hex_ints(_pluck(logs, "blockNumber")),
+            "block_hash": _pluck(logs, "blockHash"),
+            "tx_hash": _pluck(logs, "transactionHash"),
+            "tx_index": hex_ints(_pluck(logs, "transactionIndex")),
+            "log_index": hex_ints(_pluck(logs, "logIndex")),
+            "address": _pluck(logs, "address"),
+            "data": _pluck(logs, "data"),
+            "topics": _pluck(logs, "topics"),
+            "removed": _pluck(logs, "removed"),
+        },
+    )
+
+
+def canonical_table(
+    chain_id: int,
+    blocks: Sequence[Dict[str, Any]],
+    is_canonical: Sequence[bool],
+    observed_at: str,
+) -> pa.Table:
+    count = len(blocks)
+    return _table(
+        CANONICAL_BLOCKS,
+        {
+            "chain_id": _constant(chain_id, count),
+            "block_number": hex_ints(_pluck(blocks, "number")),
+            "block_hash": _pluck(blocks, "hash"),
+            "parent_hash": _pluck(blocks, "parentHash"),
+            "is_canonical": list(is_canonical),
+            "observed_at": _constant(observed_at, count),
+        },
+    )
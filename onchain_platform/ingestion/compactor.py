@@ -1,10 +1,18 @@
 import argparse
-import glob
 import os
 import shutil
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from onchain_platform.config import Config
+from onchain_platform.ingestion.writers.manifest import FileEntry, TableManifest, logical_name
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, TableStream, registry_schema
+from onchain_platform.ingestion.writers.partitioning import bucket_dir, flat_files
+from onchain_platform.ingestion.writers.schemas import SORT_KEYS
 
 
 PRIMARY_KEYS: Dict[str, List[str]] = {
@@ -15,59 +23,165 @@ PRIMARY_KEYS: Dict[str, List[str]] = {
 }
 
 
-def build_dedupe_sql(table: str, keys: List[str], order_by: Optional[str]) -> str:
+def build_dedupe_sql(
+    table: str, keys: List[str], order_by: Optional[str], sort_keys: Optional[List[str]] = None
+) -> str:
     partition = ", ".join(keys)
     order_clause = f"ORDER BY {order_by} DESC" if order_by else "ORDER BY (SELECT NULL)"
+    sort_clause = f" order by {', '.join(sort_keys)}" if sort_keys else ""
     return (
-        f"select * from ("
+        f"select * exclude (_rn) from ("
         f"select *, row_number() over (partition by {partition} {order_clause}) as _rn "
         f"from {table}"
-        f") where _rn = 1"
+        f") where _rn = 1{sort_clause}"
     )
 
 
-def dedupe_table(source_path: str, output_path: str, keys: List[str]) -> None:
-    if not glob.glob(source_path):
-        raise FileNotFoundError(f"Missing source path: {source_path}")
+# Compaction output is named compacted.<token>.parquet; a bucket holding only such files
+# has not changed since it was last compacted and is skipped.
+COMPACTED = "compacted"
+
+
+def needs_compaction(entries: List[FileEntry]) -> bool:
+    return any(os.path.basename(logical_name(entry.path)) != COMPACTED for entry in entries)
+
+
+def dedupe_bucket(
+    source_paths: List[str],
+    stream: TableStream,
+    keys: List[str],
+    sort_keys: Optional[List[str]] = None,
+    memory_limit: Optional[str] = None,
+    threads: Optional[int] = None,
+    temp_dir: Optional[str] = None,
+) -> int:
+    if not source_paths:
+        raise FileNotFoundError(f"No source files for {stream.output_path}")
 
     con = duckdb.connect()
-    safe_source = source_path.replace("'", "''")
-    con.execute(f"create or replace temp view src as select * from read_parquet('{safe_source}')")
+    if memory_limit:
+        con.execute(f"set memory_limit = '{memory_limit}'")
+    if threads:
+        con.execute(f"set threads = {threads}")
+    if temp_dir:
+        # The window spills here once it outgrows memory_limit.
+        os.makedirs(temp_dir, exist_ok=True)
+        safe_temp_dir = temp_dir.replace("'", "''")
+        con.execute(f"set temp_directory = '{safe_temp_dir}'")
+    sources = ", ".join("'" + path.replace("'", "''") + "'" for path in source_paths)
+    # The bucket directory name is not a column of the files; keep DuckDB from adding it.
+    con.execute(
+        f"create or replace temp view src as "
+        f"select * from read_parquet([{sources}], hive_partitioning = false)"
+    )
     columns = [row[1] for row in con.execute("pragma table_info('src')").fetchall()]
     order_by = "observed_at" if "observed_at" in columns else None
-    sql = build_dedupe_sql("src", keys, order_by)
-
-    os.makedirs(output_path, exist_ok=True)
-    safe_output = os.path.join(output_path, "part.parquet").replace("'", "''")
-    con.execute(f"copy ({sql}) to '{safe_output}' (format parquet)")
+    sql = build_dedupe_sql("src", keys, order_by, [key for key in sort_keys or [] if key in columns])
+
+    # Rows stream out in block order into the table's regular writer, which cuts
+    # row groups and rolls files over at the configured target size.
+    rows = 0
+    result = con.execute(sql)
+    # to_arrow_reader replaces fetch_record_batch in newer DuckDB releases.
+    fetch = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+    reader = fetch(stream.options.row_group_size)
+    for batch in reader:
+        stream.write_table(pa.Table.from_batches([batch]))
+        rows += batch.num_rows
     con.close()
+    return rows
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Deduplicate parquet tables by primary keys.")
     parser.add_argument("--table", required=True, choices=PRIMARY_KEYS.keys())
     parser.add_argument("--warehouse-dir", default="warehouse")
-    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Commit the deduped files to the table itself instead of <table>_compacted.",
+    )
+    parser.add_argument("--start", type=int, help="Only compact buckets from this block on.")
+    parser.add_argument("--end", type=int, help="Only compact buckets up to this block.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="With --overwrite, also rewrite buckets that have not changed since their last compaction.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Buckets compacted in parallel."
+    )
+    parser.add_argument(
+        "--memory-limit-mb", type=int, default=4096, help="DuckDB memory shared by all workers."
+    )
     args = parser.parse_args()
 
     table = args.table
     keys = PRIMARY_KEYS[table]
-    source = os.path.join(args.warehouse_dir, "lake", "bronze", table, "*.parquet")
-    compacted_root = os.path.join(args.warehouse_dir, "lake", "bronze", f"{table}_compacted")
-
-    dedupe_table(source, compacted_root, keys)
+    table_dir = os.path.join(args.warehouse_dir, "lake", "bronze", table)
+    if flat_files(table_dir):
+        raise RuntimeError(f"{table_dir} has unpartitioned files; run scripts/migrate_lake_partitions.py first")
+    snapshot = TableManifest(table_dir).snapshot()
+    buckets = snapshot.buckets(args.start, args.end)
+    if not buckets:
+        raise FileNotFoundError(f"Missing source path: {table_dir}")
 
     if args.overwrite:
-        original_dir = os.path.join(args.warehouse_dir, "lake", "bronze", table)
-        backup_dir = os.path.join(args.warehouse_dir, "lake", "bronze", f"{table}_backup")
-        if os.path.exists(backup_dir):
-            shutil.rmtree(backup_dir)
-        if os.path.exists(original_dir):
-            shutil.move(original_dir, backup_dir)
-        shutil.move(compacted_root, original_dir)
-        print(f"Replaced {table} with deduped parquet (backup at {backup_dir}).")
+        target = TableManifest(table_dir)
+        pending = [bucket for bucket in buckets if args.full or needs_compaction(snapshot.entries(bucket=bucket))]
+    else:
+        compacted_root = os.path.join(args.warehouse_dir, "lake", "bronze", f"{table}_compacted")
+        if os.path.exists(compacted_root):
+            shutil.rmtree(compacted_root)
+        target = TableManifest(compacted_root)
+        pending = buckets
+
+    options = ParquetOptions.from_config(Config.from_env())
+    first_file = os.path.join(table_dir, snapshot.entries()[0].path)
+    schema = registry_schema(table, pq.read_schema(first_file).empty_table())
+    workers = max(1, min(args.workers, len(pending) or 1))
+    memory_limit = f"{max(64, args.memory_limit_mb // workers)}MB"
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    temp_dir = os.path.join(args.warehouse_dir, "tmp", "compactor")
+
+    # Every copy of a block's rows lands in that block's bucket, so buckets are deduped
+    # and committed independently. Each commit removes exactly the files that were read,
+    # so rows ingested into the bucket meanwhile are kept, and readers see either the
+    # old files or the deduped ones, never both.
+    def compact(bucket: int) -> Tuple[int, int, int]:
+        sources = snapshot.entries(bucket=bucket)
+        output_path = os.path.join(bucket_dir(target.table_dir, bucket), f"{COMPACTED}.parquet")
+        stream = TableStream(target, output_path, schema, table, options)
+        try:
+            rows = dedupe_bucket(
+                [os.path.join(table_dir, entry.path) for entry in sources],
+                stream,
+                keys,
+                SORT_KEYS[table],
+                memory_limit=memory_limit,
+                threads=threads,
+                temp_dir=temp_dir,
+            )
+        except BaseException:
+            stream.abort()
+            raise
+        replaced = {entry.path for entry in sources} if args.overwrite else set()
+        stream.close("compact", remove=lambda entry: entry.path in replaced)
+        return bucket, len(sources), rows
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for bucket, files, rows in pool.map(compact, pending):
+            print(f"{table} bucket {bucket}: {files} files -> {rows} rows")
+    target.export_file_list()
+
+    skipped = len(buckets) - len(pending)
+    if args.overwrite:
+        print(
+            f"Compacted {len(pending)} buckets of {table} ({skipped} unchanged since their last "
+            f"compaction); the old files stay readable until vacuumed."
+        )
     else:
-        print(f"Wrote deduped parquet to {compacted_root}.")
+        print(f"Wrote deduped parquet to {target.table_dir}.")
 
 
 if __name__ == "__main__":
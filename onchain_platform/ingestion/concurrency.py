@@ -0,0 +1,78 @@
+import asyncio
+from typing import Dict, Hashable
+
+
+# AIMD concurrency limit: grows by roughly one slot per window of healthy responses,
+# shrinks multiplicatively on overload signals (429/503/timeouts) or when latency drifts
+# well above its baseline. Latency is tracked per request class (the caller passes e.g.
+# method and batch size), so a fast eth_blockNumber never makes eth_getLogs look slow.
+# The limit is cut at most once per window of `limit` completions, since the
+# requests already in flight all report the same overload; after a latency cut the
+# baseline moves up to the current latency, so only a further doubling cuts again.
+class AdaptiveConcurrencyLimiter:
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.1,
+    ) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.min_latency: Dict[Hashable, float] = {}
+        self.ewma_latency: Dict[Hashable, float] = {}
+        self._completions = 0
+        # Completion count before which the next decrease is ignored.
+        self._next_decrease = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self) -> "AdaptiveConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.release()
+
+    def on_success(self, latency: float, key: Hashable = None) -> None:
+        self._completions += 1
+        baseline = self.min_latency.get(key)
+        if baseline is None or latency < baseline:
+            baseline = self.min_latency[key] = latency
+        ewma = self.ewma_latency.get(key)
+        ewma = latency if ewma is None else ewma + self.smoothing * (latency - ewma)
+        self.ewma_latency[key] = ewma
+
+        if ewma > baseline * self.latency_tolerance:
+            if self._decrease():
+                self.min_latency[key] = ewma
+            return
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def on_overload(self) -> None:
+        self._completions += 1
+        self._decrease()
+
+    def _decrease(self) -> bool:
+        if self._completions < self._next_decrease:
+            return False
+        # The requests in flight at the cut were sent under the old limit.
+        self._next_decrease = self._completions + int(self.limit)
+        self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+        return True
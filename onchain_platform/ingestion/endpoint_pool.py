@@ -0,0 +1,101 @@
+import random
+import time
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Sequence
+
+
+class Endpoint:
+    def __init__(self, url: str, weight: float = 1.0, window: int = 200) -> None:
+        self.url = url
+        self.weight = max(weight, 0.01)
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def p95_latency(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def score(self) -> float:
+        latency = self.ewma_latency if self.ewma_latency is not None else 0.1
+        load = 1.0 + self.in_flight / self.weight
+        return self.weight * (1.0 - min(self.error_rate, 0.95)) / (max(latency, 0.001) * load)
+
+
+class EndpointPool:
+    def __init__(
+        self,
+        urls: Sequence[str],
+        weights: Optional[Sequence[float]] = None,
+        hedge: bool = False,
+        cooldown_seconds: float = 30.0,
+        failure_threshold: int = 3,
+        smoothing: float = 0.2,
+    ) -> None:
+        if not urls:
+            raise ValueError("EndpointPool needs at least one RPC URL")
+        if weights is None or len(weights) != len(urls):
+            weights = [1.0] * len(urls)
+        self.endpoints: List[Endpoint] = [Endpoint(url, weight) for url, weight in zip(urls, weights)]
+        self.hedge = hedge and len(self.endpoints) > 1
+        self.cooldown_seconds = cooldown_seconds
+        self.failure_threshold = failure_threshold
+        self.smoothing = smoothing
+
+    def choose(self, exclude: Iterable[Endpoint] = ()) -> Endpoint:
+        now = time.monotonic()
+        excluded = set(id(item) for item in exclude)
+        candidates = [item for item in self.endpoints if id(item) not in excluded]
+        if not candidates:
+            candidates = list(self.endpoints)
+        available = [item for item in candidates if item.is_available(now)]
+        if not available:
+            # Everything is cooling down: use whichever endpoint comes back first.
+            return min(candidates, key=lambda item: item.cooldown_until)
+        return random.choices(available, weights=[item.score() for item in available])[0]
+
+    def hedge_delay(self, endpoint: Endpoint) -> Optional[float]:
+        if not self.hedge:
+            return None
+        return endpoint.p95_latency()
+
+    def record_start(self, endpoint: Endpoint) -> None:
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+
+    def record_success(self, endpoint: Endpoint, latency: float) -> None:
+        endpoint.in_flight -= 1
+        endpoint.latencies.append(latency)
+        if endpoint.ewma_latency is None:
+            endpoint.ewma_latency = latency
+        else:
+            endpoint.ewma_latency += self.smoothing * (latency - endpoint.ewma_latency)
+        endpoint.error_rate *= 1.0 - self.smoothing
+        endpoint.consecutive_failures = 0
+
+    def record_failure(
+        self,
+        endpoint: Endpoint,
+        rate_limited: bool = False,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        endpoint.in_flight -= 1
+        endpoint.failures += 1
+        endpoint.error_rate += self.smoothing * (1.0 - endpoint.error_rate)
+        endpoint.consecutive_failures += 1
+        if rate_limited or endpoint.consecutive_failures >= self.failure_threshold:
+            cooldown = retry_after if retry_after is not None else self.cooldown_seconds
+            endpoint.cooldown_until = time.monotonic() + cooldown
+
+    def record_cancelled(self, endpoint: Endpoint) -> None:
+        endpoint.in_flight -= 1
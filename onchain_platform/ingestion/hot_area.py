@@ -0,0 +1,153 @@
+import os
+import shutil
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from onchain_platform.ingestion.chain_index import ChainIndex
+from onchain_platform.ingestion.worker import RangeTables, build_range_tables, hex_to_int, index_range, write_range
+from onchain_platform.ingestion.writers.manifest import FileEntry, logical_name
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, ParquetWriter
+from onchain_platform.ingestion.writers.schemas import LAYERS
+
+
+# Blocks within the finality depth live in lake/unfinalized/<table>, with the same schemas
+# and file layout as bronze, so they can be queried seconds after they are mined. Every
+# segment (one poll's worth of blocks) is kept in memory as raw RPC payloads too: a reorg
+# drops the segments from the fork point on and deletes their files, and once blocks are
+# final they are written to bronze in one range and removed from the hot area. The hot
+# area is only a cache of the chain tip and is rebuilt from the node after a restart.
+HOT_LAYER = "unfinalized"
+
+
+@dataclass(frozen=True)
+class HotSegment:
+    start_block: int
+    end_block: int
+    blocks: Tuple[Dict[str, Any], ...]
+    logs: Tuple[Dict[str, Any], ...]
+
+    def split(self, block_number: int) -> Tuple[Optional["HotSegment"], Optional["HotSegment"]]:
+        # Blocks up to and including block_number, and the blocks after it.
+        def part(keep: Callable[[int], bool]) -> Optional[HotSegment]:
+            blocks = tuple(block for block in self.blocks if keep(hex_to_int(block["number"])))
+            if not blocks:
+                return None
+            logs = tuple(log for log in self.logs if keep(hex_to_int(log["blockNumber"])))
+            return HotSegment(hex_to_int(blocks[0]["number"]), hex_to_int(blocks[-1]["number"]), blocks, logs)
+
+        return part(lambda number: number <= block_number), part(lambda number: number > block_number)
+
+
+def stem_range(entry: FileEntry) -> Tuple[int, int]:
+    # Hot files are named <prefix>_<first>_<last> by write_block_range.
+    first, last = os.path.basename(logical_name(entry.path)).rsplit("_", 2)[1:]
+    return int(first), int(last)
+
+
+class HotArea:
+    def __init__(
+        self,
+        chain_id: int,
+        warehouse_dir: str,
+        options: ParquetOptions,
+        storage_format: str,
+        chain_index: ChainIndex,
+        anchor_number: int,
+        anchor_hash: str,
+    ) -> None:
+        self.chain_id = chain_id
+        self.storage_format = storage_format
+        self.chain_index = chain_index
+        base_dir = os.path.join(warehouse_dir, "lake", HOT_LAYER)
+        # Whatever a previous run left behind may be from an abandoned fork.
+        shutil.rmtree(base_dir, ignore_errors=True)
+        self.writer = ParquetWriter(base_dir, options)
+        self.segments: List[HotSegment] = []
+        # The newest block already in bronze; hot blocks must build on it.
+        self.anchor_number = anchor_number
+        self.anchor_hash = anchor_hash
+
+    @property
+    def tip_number(self) -> int:
+        return self.segments[-1].end_block if self.segments else self.anchor_number
+
+    @property
+    def tip_hash(self) -> str:
+        return self.segments[-1].blocks[-1]["hash"] if self.segments else self.anchor_hash
+
+    def hash_of(self, block_number: int) -> Optional[str]:
+        if block_number == self.anchor_number:
+            return self.anchor_hash
+        for segment in self.segments:
+            if segment.start_block <= block_number <= segment.end_block:
+                return segment.blocks[block_number - segment.start_block]["hash"]
+        return None
+
+    def _write(self, segment: HotSegment) -> None:
+        tables = build_range_tables(self.chain_id, list(segment.blocks), list(segment.logs))
+        write_range(self.writer, segment.start_block, segment.end_block, tables, self.storage_format)
+
+    def _remove(self, predicate: Callable[[int, int], bool]) -> None:
+        for table_name in LAYERS["bronze"]:
+            self.writer.manifest(table_name).commit(
+                "remove", remove=lambda entry: predicate(*stem_range(entry))
+            )
+
+    def append(self, segment: HotSegment) -> None:
+        self._write(segment)
+        self.segments.append(segment)
+
+    def rollback(self, fork_block: int) -> None:
+        # Drops every block from fork_block on. The valid head of a split segment is
+        # written under its own name before the old files go.
+        kept = [segment for segment in self.segments if segment.end_block < fork_block]
+        dropped = self.segments[len(kept) :]
+        if not dropped:
+            return
+        first_dropped = dropped[0].start_block
+        head, _ = dropped[0].split(fork_block - 1)
+        if head is not None:
+            self._write(head)
+            kept.append(head)
+        keep = (head.start_block, head.end_block) if head is not None else None
+        self._remove(lambda first, last: first >= first_dropped and (first, last) != keep)
+        self.segments = kept
+
+    def promote(self, bronze: ParquetWriter, finalized_block: int, min_blocks: int) -> Optional[RangeTables]:
+        # Moves blocks up to finalized_block into bronze once at least min_blocks are final,
+        # so bronze gets one file per batch rather than one per poll.
+        if finalized_block - self.anchor_number < max(min_blocks, 1):
+            return None
+        final: List[HotSegment] = []
+        rest: List[HotSegment] = []
+        tail: Optional[HotSegment] = None
+        for segment in self.segments:
+            if segment.end_block <= finalized_block:
+                final.append(segment)
+            elif segment.start_block <= finalized_block:
+                head, tail = segment.split(finalized_block)
+                final.append(head)
+            else:
+                rest.append(segment)
+        if not final:
+            return None
+        start_block, end_block = final[0].start_block, final[-1].end_block
+        blocks = [block for segment in final for block in segment.blocks]
+        logs = [log for segment in final for log in segment.logs]
+        tables = build_range_tables(self.chain_id, blocks, logs, self.anchor_hash)
+        write_range(bronze, start_block, end_block, tables, self.storage_format)
+
+        # A segment straddling the finalized block leaves its unfinal tail behind.
+        if tail is not None:
+            self._write(tail)
+            rest.insert(0, tail)
+        self._remove(lambda first, last: first <= end_block)
+        self.segments = rest
+        index_range(self.chain_index, start_block, end_block, blocks)
+        self.anchor_number = end_block
+        self.anchor_hash = blocks[-1]["hash"]
+        return tables
+
+    def vacuum(self, retention_seconds: float) -> None:
+        for table_name in LAYERS["bronze"]:
+            self.writer.manifest(table_name).vacuum(retention_seconds)
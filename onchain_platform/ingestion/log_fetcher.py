@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+import aiohttp
+
+from onchain_platform.ingestion.rpc_client import RATE_LIMIT_MARKERS, RETRYABLE_STATUSES, AsyncRPCClient, RPCError
+
+
+# Substrings providers use when an eth_getLogs range is too dense or too wide.
+RANGE_ERROR_MARKERS = (
+    "more than 10000 results",
+    "query returned more than",
+    "response size exceeded",
+    "response size should not",
+    "log response size",
+    "block range",
+    "range is too large",
+    "too many results",
+    "timeout",
+    "timed out",
+)
+
+
+def is_range_error(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, aiohttp.ServerTimeoutError)):
+        return True
+    if isinstance(exc, RPCError):
+        message = str(exc).lower()
+        # Throttling and gateway errors are the provider's load, not the range's; the
+        # client retries them, and bisecting would only double the calls.
+        if exc.status in RETRYABLE_STATUSES or any(marker in message for marker in RATE_LIMIT_MARKERS):
+            return False
+        return any(marker in message for marker in RANGE_ERROR_MARKERS)
+    return False
+
+
+# Chunks that fail for being too dense or too slow are bisected and retried. The chunk
+# size follows AIMD (additive growth while calls stay under the log/latency targets,
+# halving otherwise) and lives on the instance, so a shared fetcher keeps what it
+# learned across ranges.
+class AdaptiveLogFetcher:
+    def __init__(
+        self,
+        client: AsyncRPCClient,
+        initial_chunk: int = 100,
+        min_chunk: int = 1,
+        max_chunk: int = 2000,
+        increase_step: int = 0,
+        target_logs_per_call: int = 5000,
+        target_latency_seconds: float = 5.0,
+    ) -> None:
+        self.client = client
+        self.min_chunk = max(1, min_chunk)
+        self.max_chunk = max(self.min_chunk, max_chunk)
+        if initial_chunk <= 0:
+            initial_chunk = self.max_chunk
+        self.chunk_size = min(max(initial_chunk, self.min_chunk), self.max_chunk)
+        self.increase_step = increase_step if increase_step > 0 else max(1, self.chunk_size // 4)
+        self.target_logs_per_call = target_logs_per_call
+        self.target_latency_seconds = target_latency_seconds
+
+    def _chunks(self, start_block: int, end_block: int) -> List[Tuple[int, int]]:
+        size = self.chunk_size
+        return [
+            (chunk_start, min(chunk_start + size - 1, end_block))
+            for chunk_start in range(start_block, end_block + 1, size)
+        ]
+
+    def _decrease(self) -> None:
+        self.chunk_size = max(self.min_chunk, self.chunk_size // 2)
+
+    def _increase(self) -> None:
+        self.chunk_size = min(self.max_chunk, self.chunk_size + self.increase_step)
+
+    async def fetch(self, start_block: int, end_block: int) -> List[Dict[str, Any]]:
+        results: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        pending = self._chunks(start_block, end_block)
+        while pending:
+            started = time.monotonic()
+            outcomes = await self.client.get_logs_batch(pending, return_exceptions=True)
+            elapsed = time.monotonic() - started
+
+            retry: List[Tuple[int, int]] = []
+            overshoot = False
+            for (chunk_start, chunk_end), outcome in zip(pending, outcomes):
+                if isinstance(outcome, BaseException):
+                    if not is_range_error(outcome) or chunk_start == chunk_end:
+                        raise outcome
+                    middle = (chunk_start + chunk_end) // 2
+                    retry.extend([(chunk_start, middle), (middle + 1, chunk_end)])
+                    overshoot = True
+                    continue
+                logs = outcome or []
+                results[(chunk_start, chunk_end)] = logs
+                if len(logs) > self.target_logs_per_call:
+                    overshoot = True
+
+            if overshoot or elapsed > self.target_latency_seconds:
+                self._decrease()
+            else:
+                self._increase()
+            pending = retry
+
+        ordered: List[Dict[str, Any]] = []
+        for key in sorted(results):
+            ordered.extend(results[key])
+        return ordered
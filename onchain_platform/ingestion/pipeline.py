@@ -0,0 +1,107 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+
+FetchFn = Callable[[int, int], Awaitable[Any]]
+RefillFn = Callable[[], Awaitable[List[Tuple[int, int]]]]
+ProcessFn = Callable[[int, int, Any], Any]
+CommitFn = Callable[[int, int, Any], None]
+
+
+# Three stages connected by bounded queues:
+#   fetch   - up to `fetch_ahead` ranges downloading at once on the event loop
+#   process - normalisation and Parquet encoding in `executor`, off the event loop
+#   commit  - checkpoint/state updates, applied strictly in range order
+# A range is only committed once it and every range before it has been written, so a
+# crash never records progress past a gap. With `refill`, the fetchers ask it for more
+# ranges whenever they run out (an empty list ends the run), so the stages stay busy
+# while the ranges already taken are processed and committed.
+async def run_range_pipeline(
+    ranges: List[Tuple[int, int]],
+    fetch: FetchFn,
+    process: ProcessFn,
+    commit: CommitFn,
+    fetch_ahead: int = 4,
+    process_workers: int = 2,
+    executor: Optional[Executor] = None,
+    refill: Optional[RefillFn] = None,
+) -> None:
+    if not ranges and refill is None:
+        return
+    ranges = list(ranges)
+    loop = asyncio.get_running_loop()
+    fetch_ahead = max(1, fetch_ahead)
+    process_workers = max(1, process_workers)
+
+    todo: "asyncio.Queue[int]" = asyncio.Queue()
+    for index in range(len(ranges)):
+        todo.put_nowait(index)
+    refill_lock = asyncio.Lock()
+    exhausted = refill is None
+    fetched: "asyncio.Queue[Optional[Tuple[int, Any]]]" = asyncio.Queue(maxsize=fetch_ahead)
+
+    results: Dict[int, Any] = {}
+    done: Set[int] = set()
+    next_commit = 0
+
+    async def next_index() -> Optional[int]:
+        nonlocal exhausted
+        while todo.empty():
+            if exhausted:
+                return None
+            async with refill_lock:
+                if not todo.empty() or exhausted:
+                    continue
+                assert refill is not None
+                extra = await refill()
+                if not extra:
+                    exhausted = True
+                for item in extra:
+                    ranges.append(item)
+                    todo.put_nowait(len(ranges) - 1)
+        return todo.get_nowait()
+
+    async def fetch_stage() -> None:
+        while True:
+            index = await next_index()
+            if index is None:
+                return
+            start_block, end_block = ranges[index]
+            raw = await fetch(start_block, end_block)
+            await fetched.put((index, raw))
+
+    async def process_stage() -> None:
+        nonlocal next_commit
+        while True:
+            item = await fetched.get()
+            if item is None:
+                return
+            index, raw = item
+            start_block, end_block = ranges[index]
+            results[index] = await loop.run_in_executor(
+                executor, process, start_block, end_block, raw
+            )
+            done.add(index)
+            while next_commit in done:
+                start_block, end_block = ranges[next_commit]
+                commit(start_block, end_block, results.pop(next_commit))
+                done.discard(next_commit)
+                next_commit += 1
+
+    fetchers = [asyncio.ensure_future(fetch_stage()) for _ in range(fetch_ahead)]
+    processors = [asyncio.ensure_future(process_stage()) for _ in range(process_workers)]
+
+    async def drain_fetchers() -> None:
+        await asyncio.gather(*fetchers)
+        for _ in processors:
+            await fetched.put(None)
+
+    try:
+        # gather() raises on the first failing stage, so a writer error cannot leave the
+        # fetchers blocked on a full queue.
+        await asyncio.gather(drain_fetchers(), *processors)
+    finally:
+        for task in fetchers + processors:
+            task.cancel()
+        await asyncio.gather(*fetchers, *processors, return_exceptions=True)
@@ -0,0 +1,309 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+import pyarrow as pa
+
+
+# Responses for finalized blocks never change, so AsyncRPCClient can answer them from
+# disk. Entries are keyed by sha256 of the method and params and stored zstd-compressed
+# in append-only segment files; a SQLite index (WAL, shared by every process using the
+# directory) maps keys to (segment, offset, length). Each process appends to a segment of
+# its own, so writers never interleave. When the cache outgrows max_bytes the least
+# recently used entries are dropped from the index, and segments left mostly dead are
+# rewritten or deleted.
+#
+# eth_getLogs results are also indexed by block range, so a range is served from any
+# cached ranges that tile it: the adaptive log fetcher does not split ranges the same way
+# on every run.
+#
+# AsyncRPCClient only consults the cache for calls it could store (covers()), and goes
+# through the *_async methods, which run every SQLite and segment access on the cache's
+# own single thread so lookups never block the event loop.
+MISS = object()
+SEGMENT_BYTES = 64 * 1024 * 1024
+SCHEMA = """
+create table if not exists entries (
+    key blob primary key,
+    segment text not null,
+    offset integer not null,
+    length integer not null,
+    raw_length integer not null,
+    last_used real not null
+) without rowid;
+create index if not exists entries_last_used on entries (last_used);
+create table if not exists log_ranges (
+    start_block integer not null,
+    end_block integer not null,
+    key blob not null,
+    primary key (start_block, end_block)
+) without rowid;
+"""
+
+
+def _dumps(value: Any) -> bytes:
+    return orjson.dumps(value)
+
+
+def _loads(body: bytes) -> Any:
+    return orjson.loads(body)
+
+
+def cache_key(method: str, params: Sequence[Any]) -> bytes:
+    return hashlib.sha256(json.dumps([method, params], sort_keys=True).encode()).digest()
+
+
+def _block(value: Any) -> Optional[int]:
+    # Only explicit block numbers are cacheable, never tags such as "latest".
+    if isinstance(value, str) and value.startswith("0x"):
+        return int(value, 16)
+    return None
+
+
+def log_range(method: str, params: Sequence[Any]) -> Optional[Tuple[int, int]]:
+    # Block range of an unfiltered eth_getLogs call.
+    if method != "eth_getLogs" or len(params) != 1 or not isinstance(params[0], dict):
+        return None
+    if set(params[0]) != {"fromBlock", "toBlock"}:
+        return None
+    start_block, end_block = _block(params[0]["fromBlock"]), _block(params[0]["toBlock"])
+    if start_block is None or end_block is None or start_block > end_block:
+        return None
+    return start_block, end_block
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_bytes: int = 10 * 1024**3) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        # Set by the caller once the finality boundary is known; nothing newer is stored.
+        self.finalized_block: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(path, "segments"), exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rpc-cache")
+        self._conn = sqlite3.connect(os.path.join(path, "index.sqlite"), timeout=60, check_same_thread=False)
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.execute("pragma synchronous = normal")
+        self._conn.executescript(SCHEMA)
+        self._segment: Optional[str] = None
+        self._handle: Any = None
+        self._readers: Dict[str, int] = {}
+        self._touched: Dict[bytes, float] = {}
+        self._written = 0
+
+    # Reads
+
+    def _read(self, key: bytes) -> Any:
+        row = self._conn.execute(
+            "select segment, offset, length, raw_length from entries where key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return MISS
+        segment, offset, length, raw_length = row
+        try:
+            fd = self._readers.get(segment)
+            if fd is None:
+                fd = self._readers[segment] = os.open(self._segment_path(segment), os.O_RDONLY)
+            data = os.pread(fd, length, offset)
+        except FileNotFoundError:
+            # Evicted by another process since the lookup.
+            return MISS
+        if len(data) != length:
+            return MISS
+        self._touched[key] = time.time()
+        return _loads(pa.decompress(data, decompressed_size=raw_length, codec="zstd", asbytes=True))
+
+    def _read_logs(self, start_block: int, end_block: int) -> Any:
+        rows = self._conn.execute(
+            "select start_block, end_block, key from log_ranges "
+            "where end_block >= ? and start_block <= ? order by start_block, end_block desc",
+            (start_block, end_block),
+        ).fetchall()
+        # Greedily tile [start_block, end_block] with the cached ranges.
+        logs: List[Any] = []
+        cursor = start_block
+        for first, last, key in rows:
+            if cursor > end_block:
+                break
+            if first > cursor:
+                return MISS
+            if last < cursor:
+                continue
+            value = self._read(key)
+            if value is MISS:
+                return MISS
+            logs.extend(
+                log for log in value if cursor <= int(log["blockNumber"], 16) <= min(last, end_block)
+            )
+            cursor = last + 1
+        return logs if cursor > end_block else MISS
+
+    def get(self, method: str, params: Sequence[Any]) -> Any:
+        value = self._read(cache_key(method, params))
+        if value is MISS:
+            bounds = log_range(method, params)
+            if bounds is not None:
+                value = self._read_logs(*bounds)
+        if value is MISS:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if len(self._touched) >= 1024:
+            self._flush_touched()
+        return value
+
+    def get_many(self, calls: Sequence[Tuple[str, Sequence[Any]]]) -> List[Any]:
+        return [self.get(method, params) for method, params in calls]
+
+    async def get_many_async(self, calls: Sequence[Tuple[str, Sequence[Any]]]) -> List[Any]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.get_many, calls)
+
+    # Writes
+
+    def covers(self, method: str, params: Sequence[Any]) -> bool:
+        # Whether a call's result would be stored, judged from the call alone.
+        if self.finalized_block is None:
+            return False
+        if method == "eth_getBlockByNumber" and params:
+            block_number = _block(params[0])
+            return block_number is not None and block_number <= self.finalized_block
+        bounds = log_range(method, params)
+        return bounds is not None and bounds[1] <= self.finalized_block
+
+    def cacheable(self, method: str, params: Sequence[Any], result: Any) -> bool:
+        if result is None or isinstance(result, BaseException):
+            return False
+        return self.covers(method, params)
+
+    def _segment_path(self, segment: str) -> str:
+        return os.path.join(self.path, "segments", segment)
+
+    def _append(self, data: bytes) -> Tuple[str, int]:
+        if self._handle is None or self._handle.tell() >= SEGMENT_BYTES:
+            if self._handle is not None:
+                self._handle.close()
+            self._segment = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:6]}.seg"
+            self._handle = open(self._segment_path(self._segment), "ab")
+        offset = self._handle.tell()
+        self._handle.write(data)
+        return self._segment, offset
+
+    def put_many(self, items: Sequence[Tuple[str, Sequence[Any], Any]]) -> None:
+        rows = []
+        ranges = []
+        now = time.time()
+        for method, params, result in items:
+            if not self.cacheable(method, params, result):
+                continue
+            raw = _dumps(result)
+            data = pa.compress(raw, codec="zstd", asbytes=True)
+            segment, offset = self._append(data)
+            key = cache_key(method, params)
+            rows.append((key, segment, offset, len(data), len(raw), now))
+            bounds = log_range(method, params)
+            if bounds is not None:
+                ranges.append((bounds[0], bounds[1], key))
+            self._written += len(data)
+        if not rows:
+            return
+        # Segment bytes reach the OS before the index points at them.
+        self._handle.flush()
+        with self._conn:
+            self._conn.executemany("insert or replace into entries values (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany("insert or replace into log_ranges values (?, ?, ?)", ranges)
+        if self._written >= SEGMENT_BYTES:
+            self._written = 0
+            self.evict()
+
+    def put(self, method: str, params: Sequence[Any], result: Any) -> None:
+        self.put_many([(method, params, result)])
+
+    async def put_many_async(self, items: Sequence[Tuple[str, Sequence[Any], Any]]) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.put_many, items)
+
+    # Eviction
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            with self._conn:
+                self._conn.executemany(
+                    "update entries set last_used = ? where key = ?",
+                    [(used, key) for key, used in self._touched.items()],
+                )
+            self._touched.clear()
+
+    def size(self) -> int:
+        return self._conn.execute("select coalesce(sum(length), 0) from entries").fetchone()[0]
+
+    def evict(self, idle_seconds: float = 60.0) -> int:
+        # Drops least recently used entries until the cache is back under 90% of
+        # max_bytes, then deletes segments with no live entries and rewrites those less
+        # than half live. Segments written to in the last idle_seconds are left alone,
+        # since another process may still be appending to them.
+        self._flush_touched()
+        size = self.size()
+        if size <= self.max_bytes:
+            return 0
+        excess = size - int(self.max_bytes * 0.9)
+        dropped = 0
+        while dropped < excess:
+            batch = self._conn.execute(
+                "select key, length from entries order by last_used limit 10000"
+            ).fetchall()
+            if not batch:
+                break
+            with self._conn:
+                for key, length in batch:
+                    if dropped >= excess:
+                        break
+                    self._conn.execute("delete from entries where key = ?", (key,))
+                    self._conn.execute("delete from log_ranges where key = ?", (key,))
+                    dropped += length
+        live = dict(self._conn.execute("select segment, sum(length) from entries group by segment").fetchall())
+        now = time.time()
+        for segment in os.listdir(os.path.join(self.path, "segments")):
+            path = self._segment_path(segment)
+            if segment == self._segment or now - os.path.getmtime(path) < idle_seconds:
+                continue
+            if live.get(segment, 0) * 2 >= os.path.getsize(path):
+                continue
+            if segment in live:
+                self._rewrite(segment)
+            fd = self._readers.pop(segment, None)
+            if fd is not None:
+                os.close(fd)
+            os.remove(path)
+        return dropped
+
+    def _rewrite(self, segment: str) -> None:
+        moved = []
+        with open(self._segment_path(segment), "rb") as source:
+            for key, offset, length in self._conn.execute(
+                "select key, offset, length from entries where segment = ?", (segment,)
+            ).fetchall():
+                source.seek(offset)
+                new_segment, new_offset = self._append(source.read(length))
+                moved.append((new_segment, new_offset, key))
+        self._handle.flush()
+        with self._conn:
+            self._conn.executemany(
+                "update entries set segment = ?, offset = ? where key = ? and segment = ?",
+                [item + (segment,) for item in moved],
+            )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._flush_touched()
+        if self._handle is not None:
+            self._handle.close()
+        for fd in self._readers.values():
+            os.close(fd)
+        self._conn.close()
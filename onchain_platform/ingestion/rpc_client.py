@@ -1,17 +1,119 @@
 import asyncio
-import json
-from typing import Any, Dict, List, Optional
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import aiohttp
+import orjson
+
+from onchain_platform.ingestion.concurrency import AdaptiveConcurrencyLimiter
+from onchain_platform.ingestion.endpoint_pool import Endpoint, EndpointPool
+from onchain_platform.ingestion.response_cache import MISS, ResponseCache
+
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# JSON-RPC error messages some providers return (with HTTP 200) when throttling.
+RATE_LIMIT_MARKERS = ("rate limit", "too many requests", "exceeded its compute units", "capacity exceeded")
+
+
+class RPCError(RuntimeError):
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.retry_after = retry_after
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, RPCError):
+        return exc.status in RETRYABLE_STATUSES
+    return isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+def is_overload(exc: BaseException) -> bool:
+    if isinstance(exc, RPCError):
+        return exc.status in (429, 503)
+    return isinstance(exc, asyncio.TimeoutError)
+
+
+def request_class(payload: Any) -> Tuple[str, int]:
+    # Latency baselines are kept per method and batch size.
+    if isinstance(payload, list):
+        methods = {item.get("method") for item in payload}
+        return (methods.pop() if len(methods) == 1 else "batch", len(payload))
+    return (payload.get("method"), 1)
+
+
+def parse_retry_after(header: Optional[str]) -> Optional[float]:
+    # Retry-After is either delay seconds (some providers send fractions) or an HTTP date.
+    if not header:
+        return None
+    try:
+        return max(float(header), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _loads(body: bytes) -> Any:
+    return orjson.loads(body)
+
+
+def _rate_limit_error(data: Any) -> Optional[str]:
+    if not isinstance(data, dict) or "error" not in data:
+        return None
+    message = str(data["error"]).lower()
+    if any(marker in message for marker in RATE_LIMIT_MARKERS):
+        return str(data["error"])
+    return None
 
 
 class AsyncRPCClient:
-    def __init__(self, rpc_url: str, max_concurrency: int = 8, timeout_seconds: int = 30) -> None:
-        self.rpc_url = rpc_url
-        self._semaphore = asyncio.Semaphore(max_concurrency)
+    def __init__(
+        self,
+        rpc_url: Union[str, Sequence[str], EndpointPool],
+        max_concurrency: int = 8,
+        timeout_seconds: int = 30,
+        max_batch_size: int = 1,
+        max_concurrency_limit: int = 64,
+        max_retries: int = 5,
+        backoff_base_seconds: float = 0.5,
+        backoff_cap_seconds: float = 30.0,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        if isinstance(rpc_url, EndpointPool):
+            self.pool = rpc_url
+        elif isinstance(rpc_url, str):
+            self.pool = EndpointPool([rpc_url])
+        else:
+            self.pool = EndpointPool(list(rpc_url))
+        self.rpc_url = self.pool.endpoints[0].url
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_cap_seconds = backoff_cap_seconds
+        self._limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=max_concurrency,
+            max_limit=max(max_concurrency, max_concurrency_limit),
+        )
         self._timeout = aiohttp.ClientTimeout(total=timeout_seconds)
         self._session: Optional[aiohttp.ClientSession] = None
         self._request_id = 0
+        self.cache = cache
 
     async def __aenter__(self) -> "AsyncRPCClient":
         self._session = aiohttp.ClientSession(timeout=self._timeout)
@@ -21,25 +123,239 @@ class AsyncRPCClient:
         if self._session is not None:
             await self._session.close()
 
-    async def _post(self, payload: Dict[str, Any]) -> Any:
+    async def _post(self, payload: Any) -> Any:
         if self._session is None:
             raise RuntimeError("RPC client not started")
-        async with self._semaphore:
-            async with self._session.post(self.rpc_url, json=payload) as resp:
-                text = await resp.text()
+        attempt = 0
+        while True:
+            try:
+                return await self._post_once(payload)
+            except Exception as exc:
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt, exc))
+                attempt += 1
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        retry_after = getattr(exc, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap_seconds)
+        # Full jitter keeps retrying workers from stampeding the provider in lockstep.
+        ceiling = min(self.backoff_cap_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    async def _post_once(self, payload: Any) -> Any:
+        async with self._limiter:
+            started = time.monotonic()
+            try:
+                endpoint = self.pool.choose()
+                delay = self.pool.hedge_delay(endpoint)
+                if delay is None:
+                    data = await self._post_to(endpoint, payload)
+                else:
+                    data = await self._post_hedged(endpoint, payload, delay)
+            except Exception as exc:
+                if is_overload(exc):
+                    self._limiter.on_overload()
+                raise
+            self._limiter.on_success(time.monotonic() - started, request_class(payload))
+            return data
+
+    async def _post_hedged(self, endpoint: Endpoint, payload: Any, delay: float) -> Any:
+        primary = asyncio.ensure_future(self._post_to(endpoint, payload))
+        tasks = [primary]
+        # Whatever ends the race (a result, an error or our own cancellation), the
+        # requests still in flight are cancelled and awaited so their endpoint
+        # bookkeeping is settled before this returns.
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            # The primary is slower than its own p95: race a duplicate on another endpoint.
+            backup_endpoint = self.pool.choose(exclude=[endpoint])
+            backup = asyncio.ensure_future(self._post_to(backup_endpoint, payload))
+            tasks.append(backup)
+            pending = {primary, backup}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _post_to(self, endpoint: Endpoint, payload: Any) -> Any:
+        assert self._session is not None
+        self.pool.record_start(endpoint)
+        started = time.monotonic()
+        try:
+            async with self._session.post(endpoint.url, json=payload) as resp:
+                body = await resp.read()
                 if resp.status != 200:
-                    raise RuntimeError(f"RPC error {resp.status}: {text}")
-                data = json.loads(text)
-                if "error" in data:
-                    raise RuntimeError(f"RPC error: {data['error']}")
-                return data.get("result")
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    self.pool.record_failure(
+                        endpoint, rate_limited=resp.status == 429, retry_after=retry_after
+                    )
+                    text = body.decode("utf-8", errors="replace")
+                    raise RPCError(
+                        f"RPC error {resp.status}: {text}", status=resp.status, retry_after=retry_after
+                    )
+                data = _loads(body)
+                if isinstance(data, list):
+                    if any(_rate_limit_error(item) is not None for item in data):
+                        # _post_batch re-issues just the throttled items.
+                        self.pool.record_failure(endpoint, rate_limited=True)
+                        return data
+                else:
+                    throttled = _rate_limit_error(data)
+                    if throttled is not None:
+                        self.pool.record_failure(endpoint, rate_limited=True)
+                        raise RPCError(f"RPC error: {throttled}", status=429)
+        except asyncio.CancelledError:
+            self.pool.record_cancelled(endpoint)
+            raise
+        except RPCError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            self.pool.record_failure(endpoint)
+            raise
+        self.pool.record_success(endpoint, time.monotonic() - started)
+        return data
+
+    def _next_id(self) -> int:
+        self._request_id += 1
+        return self._request_id
+
+    @staticmethod
+    def _unwrap(data: Dict[str, Any]) -> Any:
+        if "error" in data:
+            error = data["error"]
+            code = error.get("code") if isinstance(error, dict) else None
+            raise RPCError(f"RPC error: {error}", code=code)
+        return data.get("result")
 
     async def call(self, method: str, params: Optional[List[Any]] = None) -> Any:
         if params is None:
             params = []
-        self._request_id += 1
-        payload = {"jsonrpc": "2.0", "id": self._request_id, "method": method, "params": params}
-        return await self._post(payload)
+        if self.cache is None or not self.cache.covers(method, params):
+            return await self._call(method, params)
+        result = (await self.cache.get_many_async([(method, params)]))[0]
+        if result is MISS:
+            result = await self._call(method, params)
+            await self.cache.put_many_async([(method, params, result)])
+        return result
+
+    async def _call(self, method: str, params: List[Any]) -> Any:
+        payload = {"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": params}
+        return self._unwrap(await self._post(payload))
+
+    async def _post_batch(self, calls: Sequence[Tuple[str, List[Any]]]) -> List[Any]:
+        # Items a provider throttles inside an otherwise good batch response are sent
+        # again, alone, with the same backoff as a throttled request.
+        results: List[Any] = [None] * len(calls)
+        todo = list(range(len(calls)))
+        attempt = 0
+        while True:
+            payload = [
+                {"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": params}
+                for method, params in (calls[index] for index in todo)
+            ]
+            data = await self._post(payload)
+            if not isinstance(data, list):
+                # Providers that reject batches answer with a single error object.
+                if isinstance(data, dict) and "error" in data:
+                    self._unwrap(data)
+                raise RPCError(f"Unexpected batch response: {data!r}")
+
+            by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+            throttled: List[int] = []
+            for index, request in zip(todo, payload):
+                item = by_id.get(request["id"])
+                if item is None:
+                    results[index] = RPCError(f"RPC error: no response for {request['method']}")
+                    continue
+                message = _rate_limit_error(item)
+                if message is not None:
+                    results[index] = RPCError(f"RPC error: {message}", status=429)
+                    throttled.append(index)
+                    continue
+                try:
+                    results[index] = self._unwrap(item)
+                except RPCError as exc:
+                    results[index] = exc
+            if not throttled or attempt >= self.max_retries:
+                return results
+            self._limiter.on_overload()
+            await asyncio.sleep(self._backoff(attempt, results[throttled[0]]))
+            attempt += 1
+            todo = throttled
+
+    async def call_batch(
+        self,
+        calls: Sequence[Tuple[str, Optional[List[Any]]]],
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        normalized = [(method, params if params is not None else []) for method, params in calls]
+        cache = self.cache
+        if cache is None:
+            return await self._call_batch(normalized, return_exceptions)
+        # Only the calls the cache cannot answer go to the provider; calls it would never
+        # store are not looked up at all.
+        covered = [index for index, (method, params) in enumerate(normalized) if cache.covers(method, params)]
+        results: List[Any] = [MISS] * len(normalized)
+        if covered:
+            found = await cache.get_many_async([normalized[index] for index in covered])
+            for index, result in zip(covered, found):
+                results[index] = result
+        missing = [index for index, result in enumerate(results) if result is MISS]
+        fetched = await self._call_batch([normalized[index] for index in missing], return_exceptions)
+        for index, result in zip(missing, fetched):
+            results[index] = result
+        stored = [normalized[index] + (results[index],) for index in missing if cache.covers(*normalized[index])]
+        if stored:
+            await cache.put_many_async(stored)
+        return results
+
+    async def _call_batch(
+        self, normalized: List[Tuple[str, List[Any]]], return_exceptions: bool
+    ) -> List[Any]:
+        if not normalized:
+            return []
+
+        if self.max_batch_size <= 1:
+            outcomes = await asyncio.gather(
+                *(self._call(method, params) for method, params in normalized),
+                return_exceptions=return_exceptions,
+            )
+            return list(outcomes)
+
+        chunks = [
+            normalized[offset : offset + self.max_batch_size]
+            for offset in range(0, len(normalized), self.max_batch_size)
+        ]
+        chunk_results = await asyncio.gather(
+            *(self._post_batch(chunk) for chunk in chunks),
+            return_exceptions=return_exceptions,
+        )
+        results: List[Any] = []
+        for chunk, outcome in zip(chunks, chunk_results):
+            if isinstance(outcome, BaseException):
+                results.extend(outcome for _ in chunk)
+            else:
+                results.extend(outcome)
+        if not return_exceptions:
+            for item in results:
+                if isinstance(item, RPCError):
+                    raise item
+        return results
 
     async def get_block_by_number(self, block_number: int, full_transactions: bool = True) -> Any:
         return await self.call(
@@ -47,6 +363,13 @@ class AsyncRPCClient:
             [hex(block_number), full_transactions],
         )
 
+    async def get_blocks_by_number(
+        self, block_numbers: Sequence[int], full_transactions: bool = True
+    ) -> List[Any]:
+        return await self.call_batch(
+            [("eth_getBlockByNumber", [hex(number), full_transactions]) for number in block_numbers]
+        )
+
     async def get_block_number(self) -> int:
         result = await self.call("eth_blockNumber")
         return int(result, 16)
@@ -54,3 +377,14 @@ class AsyncRPCClient:
     async def get_logs(self, start_block: int, end_block: int) -> Any:
         params = [{"fromBlock": hex(start_block), "toBlock": hex(end_block)}]
         return await self.call("eth_getLogs", params)
+
+    async def get_logs_batch(
+        self, ranges: Sequence[Tuple[int, int]], return_exceptions: bool = False
+    ) -> List[Any]:
+        return await self.call_batch(
+            [
+                ("eth_getLogs", [{"fromBlock": hex(start_block), "toBlock": hex(end_block)}])
+                for start_block, end_block in ranges
+            ],
+            return_exceptions=return_exceptions,
+        )
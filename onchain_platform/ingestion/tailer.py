@@ -1,13 +1,31 @@
 import argparse
 import asyncio
 import os
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from onchain_platform.config import Config
+from onchain_platform.ingestion.chain_index import ChainIndex
+from onchain_platform.ingestion.endpoint_pool import EndpointPool
+from onchain_platform.ingestion.hot_area import HotArea, HotSegment
+from onchain_platform.ingestion.log_fetcher import AdaptiveLogFetcher
+from onchain_platform.ingestion.pipeline import run_range_pipeline
 from onchain_platform.ingestion.rpc_client import AsyncRPCClient
-from onchain_platform.ingestion.writers.parquet_writer import ParquetWriter
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, ParquetWriter
 from onchain_platform.planner.plan_ranges import build_ranges
-from onchain_platform.ingestion.worker import fetch_range, load_state, save_state
+from onchain_platform.ingestion.worker import (
+    RangeTables,
+    advance_state,
+    build_range_tables,
+    close_response_cache,
+    fetch_range_raw,
+    hex_to_int,
+    index_range,
+    last_value,
+    load_state,
+    mark_breaks,
+    open_response_cache,
+    write_range,
+)
 
 
 def get_start_block(state_path: str, chain_id: int, explicit_start: Optional[int]) -> int:
@@ -21,62 +39,324 @@ def get_start_block(state_path: str, chain_id: int, explicit_start: Optional[int
     return last_block + 1
 
 
-async def run_tailer(args: argparse.Namespace) -> None:
-    config = Config.from_env()
-    if not config.rpc_url:
-        raise RuntimeError("RPC_URL is required for ingestion. Set it in .env.")
+def linked_prefix(
+    raw_blocks: List[Dict[str, Any]], raw_logs: List[Dict[str, Any]], start_block: int
+) -> HotSegment:
+    # The longest run of consecutive blocks from start_block that chain by parent hash and
+    # whose logs came from the same blocks. A node can return a mix of two forks while a
+    # reorg is in flight; the rest is fetched again on the next poll.
+    hashes: Dict[int, str] = {}
+    previous: Optional[str] = None
+    for offset, block in enumerate(raw_blocks):
+        if hex_to_int(block.get("number")) != start_block + offset:
+            break
+        if previous is not None and block.get("parentHash") != previous:
+            break
+        hashes[start_block + offset] = previous = block["hash"]
+    for log in raw_logs:
+        number = hex_to_int(log.get("blockNumber"))
+        if number in hashes and log.get("blockHash") != hashes[number]:
+            for stale in [item for item in hashes if item >= number]:
+                del hashes[stale]
+    blocks = tuple(raw_blocks[: len(hashes)])
+    logs = tuple(log for log in raw_logs if hex_to_int(log.get("blockNumber")) in hashes)
+    return HotSegment(start_block, start_block + len(blocks) - 1, blocks, logs)
+
+
+async def find_fork(client: AsyncRPCClient, hot: HotArea, batch: int = 32) -> int:
+    # Walks back from the hot tip to the newest block whose hash the node still agrees
+    # with; everything after it was orphaned.
+    high = hot.tip_number
+    while high > hot.anchor_number:
+        low = max(high - batch + 1, hot.anchor_number)
+        headers = await client.get_blocks_by_number(range(low, high + 1), full_transactions=False)
+        for number, header in zip(range(high, low - 1, -1), reversed(headers)):
+            if header is not None and header.get("hash") == hot.hash_of(number):
+                return number + 1
+        high = low - 1
+    header = await client.get_block_by_number(hot.anchor_number, full_transactions=False)
+    if header is not None and header.get("hash") == hot.anchor_hash:
+        return hot.anchor_number + 1
+    raise RuntimeError(
+        f"Reorg reaches finalized block {hot.anchor_number}, which is already in bronze. "
+        "Increase FINALITY_DEPTH and re-ingest the affected range."
+    )
+
+
+async def roll_back_to_fork(client: AsyncRPCClient, hot: HotArea) -> None:
+    fork_block = await find_fork(client, hot)
+    print(f"Reorg: dropping blocks {fork_block}-{hot.tip_number} and fetching them again.")
+    hot.rollback(fork_block)
+    hot.writer.export_file_lists()
 
-    writer = ParquetWriter(os.path.join(config.warehouse_dir, "lake", "bronze"))
-    start_block = get_start_block(args.state, config.chain_id, args.start)
 
-    async with AsyncRPCClient(config.rpc_url, max_concurrency=args.rpc_concurrency) as client:
-        latest = await client.get_block_number()
-        finalized_end = max(latest - config.finality_depth, 0)
-        effective_end = finalized_end
+async def ingest_finalized(
+    args: argparse.Namespace,
+    config: Config,
+    client: AsyncRPCClient,
+    log_fetcher: AdaptiveLogFetcher,
+    writer: ParquetWriter,
+    chain_index: ChainIndex,
+    start_block: int,
+    end_block: int,
+) -> None:
+    async def fetch(start: int, end: int) -> Any:
+        return await fetch_range_raw(client, start, end, args.log_chunk, log_fetcher)
+
+    def process(start: int, end: int, raw: Any) -> RangeTables:
+        raw_blocks, raw_logs = raw
+        previous_hash, later = index_range(chain_index, start, end, raw_blocks)
+        tables = build_range_tables(config.chain_id, raw_blocks, raw_logs, previous_hash)
+        write_range(writer, start, end, tables, config.storage_format)
+        mark_breaks(writer, chain_index, raw_blocks, previous_hash, later)
+        return tables
+
+    def commit(start: int, end: int, tables: RangeTables) -> None:
+        advance_state(
+            args.state,
+            config.chain_id,
+            {
+                "last_block_number": end,
+                "last_block_hash": last_value(tables[3], "block_hash"),
+                "updated_at": last_value(tables[0], "observed_at"),
+            },
+        )
+
+    await run_range_pipeline(
+        build_ranges(start_block, end_block, args.chunk),
+        fetch,
+        process,
+        commit,
+        fetch_ahead=args.fetch_ahead,
+        process_workers=args.write_workers,
+    )
+
+
+async def follow_head(
+    args: argparse.Namespace,
+    config: Config,
+    client: AsyncRPCClient,
+    log_fetcher: AdaptiveLogFetcher,
+    writer: ParquetWriter,
+    chain_index: ChainIndex,
+) -> None:
+    # Polls the node forever: blocks older than the finality depth go straight to bronze,
+    # newer ones into the hot area (see hot_area.py), which is checked against the node's
+    # parent hashes (or, with no new blocks, the tip's hash) on every poll and promoted to
+    # bronze as blocks become final.
+    hot: Optional[HotArea] = None
+    promotions = 0
+    while True:
+        head = await client.get_block_number()
+        finalized_end = max(head - config.finality_depth, 0)
         if args.end is not None:
-            effective_end = min(args.end, finalized_end)
-        if start_block > effective_end:
-            print("No finalized blocks available to tail.")
-            return
+            head = min(head, args.end)
+            finalized_end = min(finalized_end, args.end)
+        if client.cache is not None:
+            client.cache.finalized_block = finalized_end
 
-        ranges = build_ranges(start_block, effective_end, args.chunk)
-        state = load_state(args.state)
-        for start, end in ranges:
-            blocks, txs, logs, canon = await fetch_range(
-                client,
+        if hot is None or not hot.segments:
+            start_block = get_start_block(args.state, config.chain_id, args.start)
+            if start_block <= finalized_end - args.promote_blocks:
+                # Far behind: catch up through the range pipeline without the hot area.
+                await ingest_finalized(
+                    args, config, client, log_fetcher, writer, chain_index, start_block, finalized_end
+                )
+                writer.export_file_lists()
+                args.start = None
+                hot = None
+                continue
+            if hot is None:
+                anchor_hash = chain_index.hash_of(start_block - 1)
+                if anchor_hash is None:
+                    anchor = await client.get_block_by_number(max(start_block - 1, 0), full_transactions=False)
+                    anchor_hash = anchor["hash"] if start_block > 0 else anchor["parentHash"]
+                hot = HotArea(
+                    config.chain_id,
+                    config.warehouse_dir,
+                    writer.options,
+                    config.storage_format,
+                    chain_index,
+                    start_block - 1,
+                    anchor_hash,
+                )
+
+        if hot.tip_number < head:
+            start_block = hot.tip_number + 1
+            end_block = min(head, start_block + args.max_poll_blocks - 1)
+            raw_blocks, raw_logs = await fetch_range_raw(
+                client, start_block, end_block, args.log_chunk, log_fetcher
+            )
+            if raw_blocks and raw_blocks[0].get("parentHash") != hot.tip_hash:
+                await roll_back_to_fork(client, hot)
+                continue
+            segment = linked_prefix(raw_blocks, raw_logs, start_block)
+            if segment.blocks:
+                hot.append(segment)
+                hot.writer.export_file_lists()
+        elif hot.segments:
+            # No new blocks to check parent hashes against: a reorg at the same height
+            # only shows up as a different hash for the tip.
+            header = await client.get_block_by_number(hot.tip_number, full_transactions=False)
+            if header is not None and header.get("hash") != hot.tip_hash:
+                await roll_back_to_fork(client, hot)
+                continue
+
+        # With --end the last blocks are promoted even if fewer than --promote-blocks.
+        min_blocks = 1 if args.end is not None and finalized_end >= args.end else args.promote_blocks
+        tables = hot.promote(writer, finalized_end, min_blocks)
+        if tables is not None:
+            advance_state(
+                args.state,
                 config.chain_id,
-                start,
-                end,
-                args.log_chunk,
+                {
+                    "last_block_number": hot.anchor_number,
+                    "last_block_hash": hot.anchor_hash,
+                    "updated_at": last_value(tables[0], "observed_at"),
+                },
             )
-            range_tag = f"{start}_{end}.parquet"
-            writer.write_rows("blocks_raw", blocks, filename=f"blocks_{range_tag}")
-            writer.write_rows("transactions_raw", txs, filename=f"transactions_{range_tag}")
-            writer.write_rows("logs_raw", logs, filename=f"logs_{range_tag}")
-            writer.write_rows("canonical_blocks", canon, filename=f"canonical_{range_tag}")
+            writer.export_file_lists()
+            hot.writer.export_file_lists()
+            promotions += 1
+            if promotions % 16 == 0:
+                hot.vacuum(args.hot_retention)
+
+        if args.end is not None and hot.anchor_number >= args.end:
+            return
+        if hot.tip_number >= head:
+            await asyncio.sleep(args.poll_interval)
 
-            state[str(config.chain_id)] = {
-                "last_block_number": end,
-                "last_block_hash": canon[-1]["block_hash"] if canon else None,
-                "updated_at": blocks[-1]["observed_at"] if blocks else None,
-            }
-            save_state(args.state, state)
 
+async def run_tailer(args: argparse.Namespace) -> None:
+    config = Config.from_env()
+    if not config.rpc_urls:
+        raise RuntimeError("RPC_URL or RPC_URLS is required for ingestion. Set it in .env.")
+
+    writer = ParquetWriter(
+        os.path.join(config.warehouse_dir, "lake", "bronze"), ParquetOptions.from_config(config)
+    )
+    start_block = get_start_block(args.state, config.chain_id, args.start)
+    chain_index = ChainIndex(args.chain_index)
+
+    pool = EndpointPool(config.rpc_urls, weights=config.rpc_weights, hedge=args.hedge)
+    cache = open_response_cache(args)
+    try:
+        async with AsyncRPCClient(
+            pool,
+            max_concurrency=args.rpc_concurrency,
+            max_batch_size=args.rpc_batch_size,
+            max_concurrency_limit=args.max_rpc_concurrency,
+            max_retries=args.rpc_retries,
+            cache=cache,
+        ) as client:
+            log_fetcher = AdaptiveLogFetcher(
+                client, initial_chunk=args.log_chunk, max_chunk=args.max_log_chunk
+            )
+            if args.follow:
+                await follow_head(args, config, client, log_fetcher, writer, chain_index)
+                print("Tailer complete")
+                return
+
+            latest = await client.get_block_number()
+            finalized_end = max(latest - config.finality_depth, 0)
+            if cache is not None:
+                cache.finalized_block = finalized_end
+            effective_end = finalized_end
+            if args.end is not None:
+                effective_end = min(args.end, finalized_end)
+            if start_block > effective_end:
+                print("No finalized blocks available to tail.")
+                return
+            await ingest_finalized(
+                args, config, client, log_fetcher, writer, chain_index, start_block, effective_end
+            )
+    finally:
+        chain_index.close()
+        close_response_cache(cache)
+
+    # dbt reads the tables through these snapshot file lists.
+    writer.export_file_lists()
     print("Tailer complete")
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Incremental tailer for finalized blocks.")
+    parser = argparse.ArgumentParser(description="Incremental tailer for finalized blocks; --follow also tails the unfinalized head.")
     parser.add_argument("--state", default="warehouse/state/canonical_state.json")
     parser.add_argument("--start", type=int, help="Start block (overrides state).")
+    parser.add_argument("--chain-index", default="warehouse/state/chain_index")
     parser.add_argument("--end", type=int, help="End block (for testing).")
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep polling the head and ingest unfinalized blocks into lake/unfinalized.",
+    )
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between head polls.")
+    parser.add_argument("--max-poll-blocks", type=int, default=32, help="Blocks fetched per poll at most.")
+    parser.add_argument(
+        "--promote-blocks",
+        type=int,
+        default=32,
+        help="Final blocks gathered before they are moved from the hot area to bronze.",
+    )
+    parser.add_argument(
+        "--hot-retention",
+        type=float,
+        default=600.0,
+        help="Seconds replaced hot-area files are kept for readers before vacuum.",
+    )
     parser.add_argument("--chunk", type=int, default=20)
-    parser.add_argument("--rpc-concurrency", type=int, default=6)
+    parser.add_argument(
+        "--rpc-concurrency",
+        type=int,
+        default=6,
+        help="Starting number of in-flight RPC requests; adapts to the endpoint from there.",
+    )
+    parser.add_argument("--max-rpc-concurrency", type=int, default=64)
+    parser.add_argument(
+        "--rpc-retries",
+        type=int,
+        default=5,
+        help="Retries (exponential backoff with jitter) for 429/5xx/timeouts.",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate request to another endpoint when one exceeds its p95 latency.",
+    )
+    parser.add_argument(
+        "--rpc-cache",
+        help="Directory of an on-disk cache of finalized block and log responses (off by default).",
+    )
+    parser.add_argument("--rpc-cache-mb", type=int, default=10240, help="Size cap of --rpc-cache.")
+    parser.add_argument(
+        "--rpc-batch-size",
+        type=int,
+        default=20,
+        help="JSON-RPC calls packed per HTTP request (1 disables batching).",
+    )
     parser.add_argument(
         "--log-chunk",
         type=int,
         default=100,
-        help="Block range size per eth_getLogs call (lower for free-tier RPCs).",
+        help="Initial block range size per eth_getLogs call (lower for free-tier RPCs).",
+    )
+    parser.add_argument(
+        "--max-log-chunk",
+        type=int,
+        default=2000,
+        help="Upper bound for the self-tuned eth_getLogs block range.",
+    )
+    parser.add_argument(
+        "--fetch-ahead",
+        type=int,
+        default=4,
+        help="Ranges fetched concurrently ahead of the Parquet writers.",
+    )
+    parser.add_argument(
+        "--write-workers",
+        type=int,
+        default=2,
+        help="Threads normalising and writing fetched ranges.",
     )
     args = parser.parse_args()
 
@@ -1,14 +1,31 @@
 import argparse
 import asyncio
 import json
+import multiprocessing
 import os
+import socket
+import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 from onchain_platform.config import Config
+from onchain_platform.ingestion import columnar
+from onchain_platform.ingestion.chain_index import ChainIndex, to_bytes
+from onchain_platform.ingestion.endpoint_pool import EndpointPool
+from onchain_platform.ingestion.log_fetcher import AdaptiveLogFetcher
+from onchain_platform.ingestion.pipeline import run_range_pipeline
+from onchain_platform.ingestion.response_cache import ResponseCache
 from onchain_platform.ingestion.rpc_client import AsyncRPCClient
-from onchain_platform.ingestion.writers.parquet_writer import ParquetWriter
+from onchain_platform.ingestion.writers.binary_format import encode_table
+from onchain_platform.ingestion.writers.manifest import describe_file, logical_name, unique_name
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, ParquetWriter, write_parquet
+from onchain_platform.ingestion.writers.schemas import split_amount
 from onchain_platform.planner.checkpoint_store import CheckpointStore, RangeCheckpoint
+from onchain_platform.planner.leases import LeaseStore, file_lock
 
 
 def hex_to_int(value: Optional[str]) -> Optional[int]:
@@ -17,12 +34,6 @@ def hex_to_int(value: Optional[str]) -> Optional[int]:
     return int(value, 16)
 
 
-def hex_to_str(value: Optional[str]) -> Optional[str]:
-    if value is None:
-        return None
-    return str(int(value, 16))
-
-
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
@@ -45,8 +56,25 @@ def load_state(path: str) -> Dict[str, Any]:
 
 def save_state(path: str, state: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as handle:
+    with open(f"{path}.tmp", "w", encoding="utf-8") as handle:
         json.dump(state, handle, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def advance_state(path: str, chain_id: int, entry: Dict[str, Any]) -> None:
+    # Several workers update the state file; it never moves backwards.
+    with file_lock(f"{path}.lock"):
+        state = load_state(path)
+        current = state.get(str(chain_id)) or {}
+        if (current.get("last_block_number") or -1) <= entry["last_block_number"]:
+            state[str(chain_id)] = entry
+            save_state(path, state)
+
+
+def amount_fields(name: str, value: Optional[str]) -> Dict[str, Any]:
+    # <name> and its <name>_u256 overflow companion for a hex RPC quantity.
+    fits, overflow = split_amount(hex_to_int(value))
+    return {name: fits, f"{name}_u256": overflow}
 
 
 def normalize_block(chain_id: int, block: Dict[str, Any]) -> Dict[str, Any]:
@@ -59,9 +87,9 @@ def normalize_block(chain_id: int, block: Dict[str, Any]) -> Dict[str, Any]:
         "miner": block.get("miner"),
         "gas_used": hex_to_int(block.get("gasUsed")),
         "gas_limit": hex_to_int(block.get("gasLimit")),
-        "base_fee_per_gas": hex_to_str(block.get("baseFeePerGas")),
         "tx_count": len(block.get("transactions", [])),
         "observed_at": now_iso(),
+        **amount_fields("base_fee_per_gas", block.get("baseFeePerGas")),
     }
 
 
@@ -77,11 +105,11 @@ def normalize_transactions(chain_id: int, block: Dict[str, Any]) -> Iterable[Dic
             "tx_index": hex_to_int(tx.get("transactionIndex")),
             "from_address": tx.get("from"),
             "to_address": tx.get("to"),
-            "value": hex_to_str(tx.get("value")),
-            "gas": hex_to_str(tx.get("gas")),
-            "gas_price": hex_to_str(tx.get("gasPrice")),
             "nonce": hex_to_int(tx.get("nonce")),
             "input": tx.get("input"),
+            **amount_fields("value", tx.get("value")),
+            **amount_fields("gas", tx.get("gas")),
+            **amount_fields("gas_price", tx.get("gasPrice")),
         }
 
 
@@ -112,113 +140,428 @@ def canonical_row(chain_id: int, block: Dict[str, Any], is_canonical: bool) -> D
     }
 
 
-async def fetch_range(
+RangeRows = Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]
+RangeTables = Tuple[pa.Table, pa.Table, pa.Table, pa.Table]
+
+
+async def fetch_range_raw(
     client: AsyncRPCClient,
-    chain_id: int,
     start_block: int,
     end_block: int,
     log_chunk: int,
-) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    log_fetcher: Optional[AdaptiveLogFetcher] = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    if log_fetcher is None:
+        if log_chunk <= 0:
+            log_chunk = end_block - start_block + 1
+        log_fetcher = AdaptiveLogFetcher(client, initial_chunk=log_chunk, max_chunk=log_chunk)
+
+    # All requests are issued up front (packed into JSON-RPC batches when the client has
+    # a batch size); the client's concurrency limit bounds how many POSTs are in flight
+    # and results come back in request (block number) order.
+    block_results, logs_raw = await asyncio.gather(
+        client.get_blocks_by_number(range(start_block, end_block + 1), full_transactions=True),
+        log_fetcher.fetch(start_block, end_block),
+    )
+    return [block for block in block_results if block is not None], logs_raw
+
+
+def canonical_flags(raw_blocks: List[Dict[str, Any]], previous_hash: Optional[str] = None) -> List[bool]:
+    # previous_hash is the stored hash of the block before the range, when known.
+    flags: List[bool] = []
+    for block in raw_blocks:
+        flags.append(previous_hash is None or block.get("parentHash") == previous_hash)
+        previous_hash = block.get("hash")
+    return flags
+
+
+def build_range_rows(
+    chain_id: int,
+    raw_blocks: List[Dict[str, Any]],
+    raw_logs: List[Dict[str, Any]],
+    previous_hash: Optional[str] = None,
+) -> RangeRows:
     blocks: List[Dict[str, Any]] = []
     txs: List[Dict[str, Any]] = []
-    logs: List[Dict[str, Any]] = []
     canon: List[Dict[str, Any]] = []
 
-    previous_hash: Optional[str] = None
-    for block_number in range(start_block, end_block + 1):
-        block = await client.get_block_by_number(block_number, full_transactions=True)
-        if block is None:
-            continue
-        block_row = normalize_block(chain_id, block)
-        blocks.append(block_row)
+    for block, is_canonical in zip(raw_blocks, canonical_flags(raw_blocks, previous_hash)):
+        blocks.append(normalize_block(chain_id, block))
         txs.extend(list(normalize_transactions(chain_id, block)))
-
-        if previous_hash is None:
-            is_canonical = True
-        else:
-            is_canonical = block.get("parentHash") == previous_hash
         canon.append(canonical_row(chain_id, block, is_canonical))
-        previous_hash = block.get("hash")
 
-    if log_chunk <= 0:
-        log_chunk = end_block - start_block + 1
-    for chunk_start in range(start_block, end_block + 1, log_chunk):
-        chunk_end = min(chunk_start + log_chunk - 1, end_block)
-        logs_raw = await client.get_logs(chunk_start, chunk_end)
-        logs.extend(list(normalize_logs(chain_id, logs_raw)))
+    logs = list(normalize_logs(chain_id, raw_logs))
     return blocks, txs, logs, canon
 
 
+def build_range_tables(
+    chain_id: int,
+    raw_blocks: List[Dict[str, Any]],
+    raw_logs: List[Dict[str, Any]],
+    previous_hash: Optional[str] = None,
+) -> RangeTables:
+    observed_at = now_iso()
+    return (
+        columnar.blocks_table(chain_id, raw_blocks, observed_at),
+        columnar.transactions_table(chain_id, raw_blocks),
+        columnar.logs_table(chain_id, raw_logs),
+        columnar.canonical_table(
+            chain_id, raw_blocks, canonical_flags(raw_blocks, previous_hash), observed_at
+        ),
+    )
+
+
+async def fetch_range(
+    client: AsyncRPCClient,
+    chain_id: int,
+    start_block: int,
+    end_block: int,
+    log_chunk: int,
+    log_fetcher: Optional[AdaptiveLogFetcher] = None,
+) -> RangeRows:
+    raw_blocks, raw_logs = await fetch_range_raw(client, start_block, end_block, log_chunk, log_fetcher)
+    return build_range_rows(chain_id, raw_blocks, raw_logs)
+
+
+def index_range(
+    chain_index: ChainIndex, start_block: int, end_block: int, raw_blocks: List[Dict[str, Any]]
+) -> Tuple[Optional[str], List[int]]:
+    # Records the range in the chain index and returns the hash its first block must
+    # build on, plus the blocks after the range whose parent link it breaks (ingested
+    # earlier, out of order; see mark_breaks). Every break is reported here and listed by
+    # `python -m onchain_platform.ingestion.chain_index`.
+    previous_hash, broken = chain_index.record(raw_blocks)
+    for block_number in broken:
+        print(
+            f"Chain break at block {block_number} (range {start_block}-{end_block}): "
+            "its parent hash does not match the stored block before it."
+        )
+    return previous_hash, [block_number for block_number in broken if block_number > end_block]
+
+
+def mark_noncanonical(writer: ParquetWriter, block_numbers: Iterable[int]) -> None:
+    # Rewrites the canonical_blocks files holding these blocks with is_canonical false;
+    # each new file replaces the old one under the same range name in one version.
+    manifest = writer.manifest("canonical_blocks")
+    for block_number in sorted(set(block_numbers)):
+        for entry in manifest.snapshot().entries(block_number, block_number):
+            table = pq.read_table(os.path.join(manifest.table_dir, entry.path), partitioning=None)
+            hit = pc.equal(table["block_number"], block_number)
+            if not pc.any(pc.and_(hit, table["is_canonical"])).as_py():
+                continue
+            table = table.set_column(
+                table.schema.get_field_index("is_canonical"),
+                "is_canonical",
+                pc.and_(table["is_canonical"], pc.invert(hit)),
+            )
+            stem = logical_name(entry.path)
+            path = unique_name(stem)
+            write_parquet("canonical_blocks", table, os.path.join(manifest.table_dir, path), writer.options)
+            manifest.commit(
+                "write",
+                [describe_file(manifest.table_dir, path)],
+                remove=lambda other, stem=stem: logical_name(other.path) == stem,
+            )
+
+
+def mark_breaks(
+    writer: ParquetWriter,
+    chain_index: ChainIndex,
+    raw_blocks: List[Dict[str, Any]],
+    previous_hash: Optional[str],
+    later: List[int],
+) -> None:
+    # Called once a range is written. A range whose predecessor was not indexed yet was
+    # written with its first block canonical; whichever of the two is written last marks
+    # that block non-canonical, so the break is persisted whatever the order.
+    blocks = list(later)
+    if previous_hash is None and raw_blocks:
+        first = hex_to_int(raw_blocks[0]["number"])
+        stored = chain_index.hash_of(first - 1)
+        if stored is not None and to_bytes(stored) != to_bytes(raw_blocks[0]["parentHash"]):
+            blocks.append(first)
+    if blocks:
+        mark_noncanonical(writer, blocks)
+
+
+def write_range(
+    writer: ParquetWriter,
+    start_block: int,
+    end_block: int,
+    tables: RangeTables,
+    storage_format: str = "hex",
+) -> None:
+    blocks, txs, logs, canon = tables
+    if storage_format == "binary":
+        blocks = encode_table("blocks_raw", blocks)
+        txs = encode_table("transactions_raw", txs)
+        logs = encode_table("logs_raw", logs)
+        canon = encode_table("canonical_blocks", canon)
+    writer.write_block_range("blocks_raw", blocks, "blocks", start_block, end_block)
+    writer.write_block_range("transactions_raw", txs, "transactions", start_block, end_block)
+    writer.write_block_range("logs_raw", logs, "logs", start_block, end_block)
+    writer.write_block_range("canonical_blocks", canon, "canonical", start_block, end_block)
+
+
+def open_response_cache(args: argparse.Namespace) -> Optional[ResponseCache]:
+    if not args.rpc_cache:
+        return None
+    return ResponseCache(args.rpc_cache, max_bytes=args.rpc_cache_mb * 1024 * 1024)
+
+
+def close_response_cache(cache: Optional[ResponseCache]) -> None:
+    if cache is not None:
+        print(f"RPC cache: {cache.hits} hits, {cache.misses} misses")
+        cache.close()
+
+
+def last_value(table: pa.Table, column: str) -> Any:
+    if table.num_rows == 0:
+        return None
+    return table.column(column)[-1].as_py()
+
+
 async def run_worker(args: argparse.Namespace) -> None:
     config = Config.from_env()
-    if not config.rpc_url:
-        raise RuntimeError("RPC_URL is required for ingestion. Set it in .env.")
+    if not config.rpc_urls:
+        raise RuntimeError("RPC_URL or RPC_URLS is required for ingestion. Set it in .env.")
     plans = read_plans(args.plan)
     checkpoint = CheckpointStore(args.checkpoints)
-    state = load_state(args.state)
-
-    writer = ParquetWriter(os.path.join(config.warehouse_dir, "lake", "bronze"))
-
-    async with AsyncRPCClient(config.rpc_url, max_concurrency=args.rpc_concurrency) as client:
-        latest_block = None
-        finalized_end = None
-        if not args.ignore_finality:
-            latest_block = await client.get_block_number()
-            finalized_end = max(latest_block - config.finality_depth, 0)
-        for plan in plans:
-            if checkpoint.is_done(plan):
-                continue
-            if finalized_end is not None and plan.end_block > finalized_end:
-                print(
-                    f"Skipping range {plan.start_block}-{plan.end_block} "
-                    f"(finalized_end={finalized_end})."
-                )
-                continue
-            blocks, txs, logs, canon = await fetch_range(
-                client,
-                config.chain_id,
-                plan.start_block,
-                plan.end_block,
-                args.log_chunk,
-            )
-
-            range_tag = f"{plan.start_block}_{plan.end_block}.parquet"
-            writer.write_rows("blocks_raw", blocks, filename=f"blocks_{range_tag}")
-            writer.write_rows("transactions_raw", txs, filename=f"transactions_{range_tag}")
-            writer.write_rows("logs_raw", logs, filename=f"logs_{range_tag}")
-            writer.write_rows("canonical_blocks", canon, filename=f"canonical_{range_tag}")
+    leases = LeaseStore(args.leases)
+    chain_index = ChainIndex(args.chain_index)
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
 
-            state[str(config.chain_id)] = {
-                "last_block_number": plan.end_block,
-                "last_block_hash": canon[-1]["block_hash"] if canon else None,
-                "updated_at": now_iso(),
-            }
-            save_state(args.state, state)
-            checkpoint.mark_done([plan])
+    writer = ParquetWriter(
+        os.path.join(config.warehouse_dir, "lake", "bronze"), ParquetOptions.from_config(config)
+    )
 
+    pool = EndpointPool(config.rpc_urls, weights=config.rpc_weights, hedge=args.hedge)
+    cache = open_response_cache(args)
+    try:
+        async with AsyncRPCClient(
+            pool,
+            max_concurrency=args.rpc_concurrency,
+            max_batch_size=args.rpc_batch_size,
+            max_concurrency_limit=args.max_rpc_concurrency,
+            max_retries=args.rpc_retries,
+            cache=cache,
+        ) as client:
+            log_fetcher = AdaptiveLogFetcher(
+                client, initial_chunk=args.log_chunk, max_chunk=args.max_log_chunk
+            )
+            latest_block = None
+            finalized_end = None
+            if not args.ignore_finality:
+                latest_block = await client.get_block_number()
+                finalized_end = max(latest_block - config.finality_depth, 0)
+                if cache is not None:
+                    cache.finalized_block = finalized_end
+
+            pending: List[Tuple[int, int]] = []
+            for plan in plans:
+                if checkpoint.is_done(plan):
+                    continue
+                if finalized_end is not None and plan.end_block > finalized_end:
+                    print(
+                        f"Skipping range {plan.start_block}-{plan.end_block} "
+                        f"(finalized_end={finalized_end})."
+                    )
+                    continue
+                pending.append((plan.start_block, plan.end_block))
+
+            async def fetch(start_block: int, end_block: int) -> Any:
+                return await fetch_range_raw(client, start_block, end_block, args.log_chunk, log_fetcher)
+
+            def process(start_block: int, end_block: int, raw: Any) -> RangeTables:
+                raw_blocks, raw_logs = raw
+                previous_hash, later = index_range(chain_index, start_block, end_block, raw_blocks)
+                tables = build_range_tables(config.chain_id, raw_blocks, raw_logs, previous_hash)
+                write_range(writer, start_block, end_block, tables, config.storage_format)
+                mark_breaks(writer, chain_index, raw_blocks, previous_hash, later)
+                return tables
+
+            # The state file records how far ingestion has got without holes: the end of the
+            # checkpointed interval covering the plan's first block. Ranges committed ahead
+            # of an unfinished one (here or in another worker) do not move it.
+            origin = min((plan.start_block for plan in plans), default=None)
+
+            def commit(start_block: int, end_block: int, tables: RangeTables) -> None:
+                checkpoint.mark_done([RangeCheckpoint(start_block, end_block)])
+                frontier = None if origin is None else checkpoint.covered_through(origin)
+                if frontier is not None:
+                    advance_state(
+                        args.state,
+                        config.chain_id,
+                        {
+                            "last_block_number": frontier,
+                            "last_block_hash": chain_index.hash_of(frontier),
+                            "updated_at": now_iso(),
+                        },
+                    )
+                leases.complete(owner, start_block, end_block)
+                held.discard((start_block, end_block))
+
+            # Leased ranges not committed yet; only these are heartbeated.
+            held: Set[Tuple[int, int]] = set()
+
+            async def heartbeat() -> None:
+                while True:
+                    await asyncio.sleep(args.lease_ttl / 3)
+                    lost = leases.heartbeat(owner, list(held), args.lease_ttl)
+                    if lost:
+                        print(f"Lost leases on {len(lost)} ranges (expired and taken over); finishing them anyway.")
+
+            # Ranges are leased a batch at a time from the shared lease table, so any number
+            # of workers can run off the same plan. Ranges leased by live workers are retried
+            # later and picked up if their lease expires; done ranges are dropped for good.
+            # The pipeline asks for the next batch as soon as it has started fetching the
+            # last one, so it never drains at a batch boundary.
+            cursor = 0
+            deferred: List[Tuple[int, int]] = []
+
+            async def lease_next() -> List[Tuple[int, int]]:
+                nonlocal cursor, deferred
+                while cursor < len(pending) or deferred:
+                    window = deferred + pending[cursor : cursor + args.lease_batch]
+                    cursor += args.lease_batch
+                    acquired, finished = leases.acquire(owner, window, args.lease_ttl, args.lease_batch)
+                    if finished:
+                        # A done lease is only trusted if the checkpoints (written before it)
+                        # agree; otherwise the checkpoints were reset and the range is
+                        # ingested again.
+                        checkpoint.refresh()
+                        stale = [item for item in finished if not checkpoint.is_range_done(*item)]
+                        leases.reopen(stale)
+                        finished.difference_update(stale)
+                    taken = set(acquired) | finished
+                    deferred = [item for item in window if item not in taken]
+                    if acquired:
+                        held.update(acquired)
+                        return acquired
+                    if cursor >= len(pending) and deferred:
+                        await asyncio.sleep(min(args.lease_ttl / 4, 5.0))
+                return []
+
+            beat = asyncio.ensure_future(heartbeat())
+            try:
+                await run_range_pipeline(
+                    [],
+                    fetch,
+                    process,
+                    commit,
+                    fetch_ahead=args.fetch_ahead,
+                    process_workers=args.write_workers,
+                    refill=lease_next,
+                )
+            except BaseException:
+                leases.release(owner, list(held))
+                raise
+            finally:
+                beat.cancel()
+                held.clear()
+    finally:
+        leases.close()
+        close_response_cache(cache)
+        chain_index.close()
+
+    # dbt reads the tables through these snapshot file lists.
+    writer.export_file_lists()
     print("Ingestion complete")
 
 
+def run_worker_process(args: argparse.Namespace) -> None:
+    asyncio.run(run_worker(args))
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Async ingestion worker.")
     parser.add_argument("--plan", default="warehouse/plans/ranges.jsonl")
     parser.add_argument("--checkpoints", default="warehouse/state/checkpoints.json")
     parser.add_argument("--state", default="warehouse/state/canonical_state.json")
-    parser.add_argument("--rpc-concurrency", type=int, default=6)
+    parser.add_argument(
+        "--rpc-concurrency",
+        type=int,
+        default=6,
+        help="Starting number of in-flight RPC requests; adapts to the endpoint from there.",
+    )
+    parser.add_argument("--max-rpc-concurrency", type=int, default=64)
+    parser.add_argument(
+        "--rpc-retries",
+        type=int,
+        default=5,
+        help="Retries (exponential backoff with jitter) for 429/5xx/timeouts.",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate request to another endpoint when one exceeds its p95 latency.",
+    )
+    parser.add_argument(
+        "--rpc-cache",
+        help="Directory of an on-disk cache of finalized block and log responses (off by default).",
+    )
+    parser.add_argument("--rpc-cache-mb", type=int, default=10240, help="Size cap of --rpc-cache.")
+    parser.add_argument(
+        "--rpc-batch-size",
+        type=int,
+        default=20,
+        help="JSON-RPC calls packed per HTTP request (1 disables batching).",
+    )
     parser.add_argument(
         "--log-chunk",
         type=int,
         default=100,
-        help="Block range size per eth_getLogs call (lower for free-tier RPCs).",
+        help="Initial block range size per eth_getLogs call (lower for free-tier RPCs).",
+    )
+    parser.add_argument(
+        "--max-log-chunk",
+        type=int,
+        default=2000,
+        help="Upper bound for the self-tuned eth_getLogs block range.",
+    )
+    parser.add_argument(
+        "--fetch-ahead",
+        type=int,
+        default=4,
+        help="Ranges fetched concurrently ahead of the Parquet writers.",
+    )
+    parser.add_argument(
+        "--write-workers",
+        type=int,
+        default=2,
+        help="Threads normalising and writing fetched ranges.",
     )
     parser.add_argument(
         "--ignore-finality",
         action="store_true",
         help="Ingest ranges even if they are within the finality depth.",
     )
+    parser.add_argument("--leases", default="warehouse/state/leases.sqlite")
+    parser.add_argument("--chain-index", default="warehouse/state/chain_index")
+    parser.add_argument("--lease-ttl", type=float, default=120.0, help="Seconds before an unrenewed lease expires.")
+    parser.add_argument("--lease-batch", type=int, default=16, help="Ranges leased at a time.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes to launch on this host; they share the plan through the lease table.",
+    )
     args = parser.parse_args()
 
-    asyncio.run(run_worker(args))
+    if args.workers <= 1:
+        asyncio.run(run_worker(args))
+        return
+    processes = [
+        multiprocessing.Process(target=run_worker_process, args=(args,), name=f"worker-{index}")
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    failed = [process.name for process in processes if process.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(processes)} worker processes failed: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+from typing import Dict, List, Optional, Union
+
+import pyarrow as pa
+
+from onchain_platform.ingestion.writers.schemas import (
+    BINARY_COLUMNS,
+    BINARY_TABLE_SCHEMAS,
+    HASH,
+    MAX_TOPICS,
+    TABLE_SCHEMAS,
+)
+
+
+# Converts bronze tables between the 0x-hex layout the RPC returns and the compact binary
+# layout described in schemas.BINARY_TABLE_SCHEMAS.
+
+ArrowData = Union[pa.Array, pa.ChunkedArray]
+TOPIC_COLUMNS = [f"topic{index}" for index in range(MAX_TOPICS)]
+
+
+def _unhex(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+
+def _hex(value: Optional[bytes]) -> Optional[str]:
+    if value is None:
+        return None
+    return "0x" + value.hex()
+
+
+def hex_to_binary(values: ArrowData, type: pa.DataType) -> pa.Array:
+    return pa.array([_unhex(value) for value in values.to_pylist()], type=type)
+
+
+def binary_to_hex(values: ArrowData) -> pa.Array:
+    return pa.array([_hex(value) for value in values.to_pylist()], type=pa.string())
+
+
+# Every bronze table carries at least one of these; silver tables do not, even though
+# their *_u256 amount columns are fixed-size binary too.
+LAYOUT_COLUMNS = ["block_hash", "tx_hash"]
+
+
+def is_binary_layout(schema: pa.Schema) -> bool:
+    if "topic0" in schema.names:
+        return True
+    return any(
+        name in schema.names and pa.types.is_fixed_size_binary(schema.field(name).type) for name in LAYOUT_COLUMNS
+    )
+
+
+def binary_column_names(columns: List[str]) -> List[str]:
+    names: List[str] = []
+    for column in columns:
+        if column == "topics":
+            names.extend(TOPIC_COLUMNS)
+        else:
+            names.append(column)
+    return names
+
+
+def encode_table(table_name: str, table: pa.Table) -> pa.Table:
+    binary_columns = BINARY_COLUMNS[table_name]
+    arrays: Dict[str, ArrowData] = {}
+    for name in table.column_names:
+        if name == "topics":
+            topics = table.column("topics").to_pylist()
+            for index, topic_column in enumerate(TOPIC_COLUMNS):
+                arrays[topic_column] = pa.array(
+                    [
+                        _unhex(items[index]) if items is not None and len(items) > index else None
+                        for items in topics
+                    ],
+                    type=HASH,
+                )
+        elif name in binary_columns:
+            arrays[name] = hex_to_binary(table.column(name), binary_columns[name])
+        else:
+            arrays[name] = table.column(name)
+    schema = BINARY_TABLE_SCHEMAS[table_name]
+    fields = [field for field in schema if field.name in arrays]
+    return pa.Table.from_arrays([arrays[field.name] for field in fields], schema=pa.schema(fields))
+
+
+def decode_table(table_name: str, table: Union[pa.Table, pa.RecordBatch]) -> pa.Table:
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    binary_columns = BINARY_COLUMNS[table_name]
+    arrays: Dict[str, ArrowData] = {}
+    for name in table.column_names:
+        if name in TOPIC_COLUMNS:
+            continue
+        if name in binary_columns:
+            arrays[name] = binary_to_hex(table.column(name))
+        else:
+            arrays[name] = table.column(name)
+
+    present = [column for column in TOPIC_COLUMNS if column in table.column_names]
+    if present:
+        columns = [table.column(column).to_pylist() for column in present]
+        topics: List[List[str]] = []
+        for values in zip(*columns):
+            row: List[str] = []
+            for value in values:
+                if value is None:
+                    break
+                row.append("0x" + value.hex())
+            topics.append(row)
+        arrays["topics"] = pa.array(topics, type=pa.list_(pa.string()))
+
+    schema = TABLE_SCHEMAS[table_name]
+    fields = [field for field in schema if field.name in arrays]
+    return pa.Table.from_arrays([arrays[field.name] for field in fields], schema=pa.schema(fields))
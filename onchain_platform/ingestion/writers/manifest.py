@@ -0,0 +1,312 @@
+import csv
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pyarrow.parquet as pq
+
+from onchain_platform.ingestion.writers.partitioning import bucket_dir, flat_files, list_buckets, path_bucket
+
+
+# Every lake table carries a commit log in <table>/_manifest/: one JSON file per version
+# listing the data files it adds and removes, with row counts and block ranges. Commits
+# are published with os.link, which fails if the version already exists, so concurrent
+# writers never overwrite each other; the loser re-reads the log and retries. Readers
+# replay the log (from the latest checkpoint) into a Snapshot and read exactly its files.
+# Data files are written under unique names and never modified in place, so a snapshot
+# stays readable until vacuum() deletes files removed longer than the retention ago.
+# The leading underscore keeps pyarrow and the dbt globs from treating the log as data.
+
+MANIFEST_DIR = "_manifest"
+FILE_LIST = "files.csv"
+CHECKPOINT_INTERVAL = 50
+
+_PART_SUFFIX = re.compile(r"-\d+$")
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    path: str  # relative to the table directory
+    rows: int
+    bytes: int
+    bucket: Optional[int] = None
+    min_block: Optional[int] = None
+    max_block: Optional[int] = None
+
+    def overlaps(self, start_block: Optional[int], end_block: Optional[int]) -> bool:
+        if self.min_block is None or self.max_block is None:
+            return True
+        if start_block is not None and self.max_block < start_block:
+            return False
+        if end_block is not None and self.min_block > end_block:
+            return False
+        return True
+
+
+def unique_name(stem: str, ext: str = ".parquet") -> str:
+    return f"{stem}.{uuid.uuid4().hex[:12]}{ext}"
+
+
+def logical_name(path: str) -> str:
+    # blocks_100_199.<token>.parquet, streamed parts <stem>-<n>.parquet and files written
+    # before manifests (<stem>.parquet) all map back to the name their writer replaces.
+    name = os.path.basename(path).split(".", 1)[0]
+    return os.path.join(os.path.dirname(path), _PART_SUFFIX.sub("", name))
+
+
+def describe_file(table_dir: str, path: str) -> FileEntry:
+    full_path = os.path.join(table_dir, path)
+    metadata = pq.read_metadata(full_path)
+    min_block: Optional[int] = None
+    max_block: Optional[int] = None
+    column = next(
+        (i for i in range(metadata.num_columns) if metadata.schema.column(i).path == "block_number"), None
+    )
+    if column is not None:
+        for index in range(metadata.num_row_groups):
+            stats = metadata.row_group(index).column(column).statistics
+            if stats is None or not stats.has_min_max:
+                continue
+            min_block = stats.min if min_block is None else min(min_block, stats.min)
+            max_block = stats.max if max_block is None else max(max_block, stats.max)
+    return FileEntry(
+        path=path,
+        rows=metadata.num_rows,
+        bytes=os.path.getsize(full_path),
+        bucket=path_bucket(path),
+        min_block=min_block,
+        max_block=max_block,
+    )
+
+
+def write_json(path: str, payload: Any) -> None:
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle)
+    os.replace(tmp_path, path)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    table_dir: str
+    version: int
+    files: Dict[str, FileEntry]
+
+    def entries(
+        self,
+        start_block: Optional[int] = None,
+        end_block: Optional[int] = None,
+        bucket: Optional[int] = None,
+    ) -> List[FileEntry]:
+        return [
+            entry
+            for path, entry in sorted(self.files.items())
+            if (bucket is None or entry.bucket == bucket) and entry.overlaps(start_block, end_block)
+        ]
+
+    def paths(self, start_block: Optional[int] = None, end_block: Optional[int] = None) -> List[str]:
+        return [os.path.join(self.table_dir, entry.path) for entry in self.entries(start_block, end_block)]
+
+    def buckets(self, start_block: Optional[int] = None, end_block: Optional[int] = None) -> List[int]:
+        return sorted(
+            {entry.bucket for entry in self.entries(start_block, end_block) if entry.bucket is not None}
+        )
+
+    @property
+    def rows(self) -> int:
+        return sum(entry.rows for entry in self.files.values())
+
+
+class TableManifest:
+    def __init__(self, table_dir: str) -> None:
+        self.table_dir = table_dir
+        self.log_dir = os.path.join(table_dir, MANIFEST_DIR)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = -1
+        self._files: Dict[str, FileEntry] = {}
+        # Removed files and when they were removed, until vacuum deletes them.
+        self._tombstones: Dict[str, float] = {}
+
+    def _log_path(self, version: int) -> str:
+        return os.path.join(self.log_dir, f"{version:020d}.json")
+
+    def _checkpoint_path(self, version: int) -> str:
+        return os.path.join(self.log_dir, f"{version:020d}.checkpoint.json")
+
+    def _refresh(self) -> None:
+        if not self._loaded:
+            pointer = os.path.join(self.log_dir, "_last_checkpoint")
+            if os.path.exists(pointer):
+                with open(pointer, "r", encoding="utf-8") as handle:
+                    version = json.load(handle)["version"]
+                with open(self._checkpoint_path(version), "r", encoding="utf-8") as handle:
+                    checkpoint = json.load(handle)
+                self._files = {item["path"]: FileEntry(**item) for item in checkpoint["files"]}
+                self._tombstones = dict(checkpoint["tombstones"])
+                self._version = checkpoint["version"]
+            self._loaded = True
+        # Only versions newer than the cached state are read.
+        while True:
+            try:
+                with open(self._log_path(self._version + 1), "r", encoding="utf-8") as handle:
+                    commit = json.load(handle)
+            except FileNotFoundError:
+                return
+            self._apply(commit)
+
+    def _apply(self, commit: Dict[str, Any]) -> None:
+        for path in commit.get("remove", []):
+            self._files.pop(path, None)
+            self._tombstones[path] = commit["timestamp"]
+        for item in commit.get("add", []):
+            entry = FileEntry(**item)
+            self._files[entry.path] = entry
+            self._tombstones.pop(entry.path, None)
+        for path in commit.get("vacuumed", []):
+            self._tombstones.pop(path, None)
+        self._version = commit["version"]
+
+    def _publish(self, commit: Dict[str, Any]) -> bool:
+        path = self._log_path(commit["version"])
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(commit, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        try:
+            os.link(tmp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+
+    def _write_checkpoint(self) -> None:
+        checkpoint = {
+            "version": self._version,
+            "files": [asdict(entry) for entry in self._files.values()],
+            "tombstones": self._tombstones,
+        }
+        write_json(self._checkpoint_path(self._version), checkpoint)
+        write_json(os.path.join(self.log_dir, "_last_checkpoint"), {"version": self._version})
+
+    def _scan_files(self) -> Dict[str, FileEntry]:
+        # Tables written before manifests: what is on disk is the table.
+        paths = [os.path.relpath(path, self.table_dir) for path in flat_files(self.table_dir)]
+        for bucket in list_buckets(self.table_dir):
+            directory = bucket_dir("", bucket)
+            for name in sorted(os.listdir(os.path.join(self.table_dir, directory))):
+                if name.endswith(".parquet"):
+                    paths.append(os.path.join(directory, name))
+        return {path: describe_file(self.table_dir, path) for path in paths}
+
+    def exists(self) -> bool:
+        with self._lock:
+            self._refresh()
+            return self._version >= 0
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            self._refresh()
+            if self._version < 0:
+                return Snapshot(self.table_dir, -1, self._scan_files())
+            return Snapshot(self.table_dir, self._version, dict(self._files))
+
+    def commit(
+        self,
+        operation: str,
+        add: Iterable[FileEntry] = (),
+        remove: Optional[Callable[[FileEntry], bool]] = None,
+        vacuumed: Iterable[str] = (),
+    ) -> int:
+        # remove is evaluated against the latest version on every attempt, so a file
+        # committed concurrently by another writer is only removed if it matches too.
+        add = list(add)
+        added = {entry.path for entry in add}
+        with self._lock:
+            os.makedirs(self.log_dir, exist_ok=True)
+            while True:
+                self._refresh()
+                if self._version < 0:
+                    existing = [entry for entry in self._scan_files().values() if entry.path not in added]
+                    if existing:
+                        self._commit_once("import", existing, [], [])
+                        continue
+                removed = [
+                    path
+                    for path, entry in self._files.items()
+                    if path not in added and remove is not None and remove(entry)
+                ]
+                vacuumed = list(vacuumed)
+                if not add and not removed and not vacuumed:
+                    return self._version
+                version = self._commit_once(operation, add, removed, vacuumed)
+                if version is not None:
+                    return version
+
+    def _commit_once(
+        self, operation: str, add: List[FileEntry], removed: List[str], vacuumed: List[str]
+    ) -> Optional[int]:
+        commit = {
+            "version": self._version + 1,
+            "timestamp": time.time(),
+            "operation": operation,
+            "add": [asdict(entry) for entry in add],
+            "remove": removed,
+            "vacuumed": vacuumed,
+        }
+        if not self._publish(commit):
+            return None
+        self._apply(commit)
+        if self._version % CHECKPOINT_INTERVAL == 0 and self._version > 0:
+            self._write_checkpoint()
+        return self._version
+
+    def vacuum(self, retention_seconds: float) -> List[str]:
+        # Deletes files removed more than retention_seconds ago, plus files no version
+        # references (interrupted writes) once they are that old.
+        with self._lock:
+            self._refresh()
+            if self._version < 0:
+                return []
+            now = time.time()
+            expired = [
+                path for path, removed_at in self._tombstones.items() if now - removed_at >= retention_seconds
+            ]
+            known = set(self._files) | set(self._tombstones)
+            orphans = []
+            for root, _, names in os.walk(self.table_dir):
+                if os.path.basename(root) == MANIFEST_DIR:
+                    continue
+                for name in names:
+                    path = os.path.relpath(os.path.join(root, name), self.table_dir)
+                    if path in known or not (name.endswith(".parquet") or name.endswith(".tmp")):
+                        continue
+                    if now - os.path.getmtime(os.path.join(root, name)) >= retention_seconds:
+                        orphans.append(path)
+            for path in expired + orphans:
+                if os.path.exists(os.path.join(self.table_dir, path)):
+                    os.remove(os.path.join(self.table_dir, path))
+            if expired:
+                self.commit("vacuum", vacuumed=expired)
+            return expired + orphans
+
+    def export_file_list(self) -> str:
+        # dbt reads the current snapshot from this list (see dbt/macros/lake.sql).
+        snapshot = self.snapshot()
+        path = os.path.join(self.log_dir, FILE_LIST)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["path", "rows", "min_block", "max_block", "version"])
+            for entry in snapshot.entries():
+                writer.writerow([entry.path, entry.rows, entry.min_block, entry.max_block, snapshot.version])
+        os.replace(tmp_path, path)
+        return path
@@ -1,13 +1,252 @@
 import os
-from typing import Any, Dict, Iterable, List, Optional
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 
 import pyarrow as pa
 import pyarrow.parquet as pq
 
+from onchain_platform.config import Config
+from onchain_platform.ingestion.writers.binary_format import is_binary_layout
+from onchain_platform.ingestion.writers.manifest import (
+    FileEntry,
+    TableManifest,
+    describe_file,
+    logical_name,
+    unique_name,
+)
+from onchain_platform.ingestion.writers.partitioning import (
+    BUCKET_SIZE,
+    bucket_dir,
+    bucket_of,
+    split_by_bucket,
+)
+from onchain_platform.ingestion.writers.schemas import (
+    BINARY_TABLE_SCHEMAS,
+    ADDRESS_COLUMNS,
+    SORT_KEYS,
+    TABLE_SCHEMAS,
+)
+
+
+def _probe_bloom_filters() -> bool:
+    # bloom_filter_options is only accepted by recent pyarrow releases; older ones raise
+    # TypeError on it, so files are then written without bloom filters.
+    try:
+        pq.write_table(
+            pa.table({"probe": ["x"]}),
+            pa.BufferOutputStream(),
+            bloom_filter_options={"probe": {"ndv": 1, "fpp": 0.01}},
+        )
+    except TypeError:
+        return False
+    return True
+
+
+BLOOM_FILTERS_SUPPORTED = _probe_bloom_filters()
+
+
+@dataclass(frozen=True)
+class ParquetOptions:
+    compression: str = "zstd"
+    compression_level: Optional[int] = None
+    row_group_size: int = 128 * 1024
+    data_page_size: int = 1024 * 1024
+    # Streams roll over to a new file once the current one reaches this size.
+    target_file_bytes: int = 256 * 1024 * 1024
+    # False-positive rate of the bloom filters on address columns (None disables them).
+    bloom_filter_fpp: Optional[float] = 0.01
+
+    @staticmethod
+    def from_config(config: Config) -> "ParquetOptions":
+        return ParquetOptions(
+            compression=config.parquet_compression,
+            compression_level=config.parquet_compression_level,
+            row_group_size=config.parquet_row_group_size,
+            data_page_size=config.parquet_data_page_size,
+            target_file_bytes=config.parquet_target_file_mb * 1024 * 1024,
+        )
+
+    def writer_kwargs(self, table_name: Optional[str], num_rows: Optional[int] = None) -> Dict[str, Any]:
+        use_dictionary: Union[bool, List[str]] = True
+        bloom_filters: Dict[str, Dict[str, Any]] = {}
+        if table_name in ADDRESS_COLUMNS:
+            use_dictionary = ADDRESS_COLUMNS[table_name]
+            if self.bloom_filter_fpp is not None and BLOOM_FILTERS_SUPPORTED:
+                # Sized for a row group of distinct values; small files get small filters.
+                ndv = max(1, min(self.row_group_size, num_rows or self.row_group_size))
+                bloom_filters = {
+                    column: {"ndv": ndv, "fpp": self.bloom_filter_fpp}
+                    for column in ADDRESS_COLUMNS[table_name]
+                }
+        kwargs: Dict[str, Any] = {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "data_page_size": self.data_page_size,
+            "use_dictionary": use_dictionary,
+        }
+        if bloom_filters:
+            kwargs["bloom_filter_options"] = bloom_filters
+        return kwargs
+
+
+def registry_schema(table_name: str, table: pa.Table) -> Optional[pa.Schema]:
+    schemas = BINARY_TABLE_SCHEMAS if is_binary_layout(table.schema) else TABLE_SCHEMAS
+    return schemas.get(table_name)
+
+
+def prepare_table(
+    table_name: Optional[str], table: pa.Table, schema: Optional[pa.Schema] = None
+) -> pa.Table:
+    # Pin every file to the registry schema (no drift from inferred or all-null columns)
+    # and apply the table's sort order.
+    if schema is None and table_name is not None:
+        schema = registry_schema(table_name, table)
+    if schema is not None:
+        table = table.select(schema.names).cast(schema)
+    keys = [key for key in SORT_KEYS.get(table_name or "", []) if key in table.column_names]
+    if keys and table.num_rows > 1:
+        table = table.sort_by([(key, "ascending") for key in keys])
+    return table
+
+
+def write_parquet(
+    table_name: Optional[str], table: pa.Table, output_path: str, options: ParquetOptions
+) -> None:
+    table = prepare_table(table_name, table)
+    tmp_path = f"{output_path}.tmp"
+    pq.write_table(
+        table,
+        tmp_path,
+        row_group_size=options.row_group_size,
+        **options.writer_kwargs(table_name, table.num_rows),
+    )
+    os.replace(tmp_path, output_path)
+
+
+# Appends tables to Parquet files as they arrive, rolling over to a new part once a file
+# reaches options.target_file_bytes. Incoming tables are buffered into full row groups
+# (decoded batches are much smaller), each sorted before it is written. Parts are written
+# as temporary files and, on a clean close, committed to the table manifest in a single
+# version that also removes the stream's previous output.
+class TableStream:
+    def __init__(
+        self,
+        manifest: TableManifest,
+        output_path: str,
+        schema: pa.Schema,
+        table_name: Optional[str] = None,
+        options: Optional[ParquetOptions] = None,
+    ) -> None:
+        self.manifest = manifest
+        self.output_path = output_path
+        self.schema = schema
+        self.table_name = table_name
+        self.options = options or ParquetOptions()
+        self.rows_written = 0
+        self.paths: List[str] = []
+        self._sink: Optional[pa.NativeFile] = None
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._buffer: List[pa.Table] = []
+        self._buffered_rows = 0
+
+    def _open_part(self) -> None:
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        stem, ext = os.path.splitext(self.output_path)
+        self.paths.append(unique_name(stem, ext))
+        self._sink = pa.OSFile(f"{self.paths[-1]}.tmp", "wb")
+        self._writer = pq.ParquetWriter(
+            self._sink, self.schema, **self.options.writer_kwargs(self.table_name)
+        )
+
+    def _close_part(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = None
+            self._sink = None
+
+    def _flush(self, final: bool = False) -> None:
+        if not self._buffer:
+            return
+        table = prepare_table(self.table_name, pa.concat_tables(self._buffer), self.schema)
+        size = self.options.row_group_size
+        while table.num_rows >= size or (final and table.num_rows):
+            if self._writer is None:
+                self._open_part()
+            self._writer.write_table(table.slice(0, size), row_group_size=size)
+            table = table.slice(size)
+            if self._sink.tell() >= self.options.target_file_bytes:
+                self._close_part()
+        self._buffer = [table] if table.num_rows else []
+        self._buffered_rows = table.num_rows
+
+    def write_table(self, table: pa.Table) -> None:
+        if table.num_rows == 0:
+            return
+        self._buffer.append(table.select(self.schema.names).cast(self.schema))
+        self._buffered_rows += table.num_rows
+        self.rows_written += table.num_rows
+        if self._buffered_rows >= self.options.row_group_size:
+            self._flush()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows_list = list(rows)
+        if rows_list:
+            self.write_table(pa.Table.from_pylist(rows_list, schema=self.schema))
+
+    def close(
+        self, operation: str = "stream", remove: Optional[Callable[[FileEntry], bool]] = None
+    ) -> None:
+        self._flush(final=True)
+        self._close_part()
+        table_dir = self.manifest.table_dir
+        added = []
+        for path in self.paths:
+            os.replace(f"{path}.tmp", path)
+            added.append(describe_file(table_dir, os.path.relpath(path, table_dir)))
+        # By default the output of an earlier run of this stream (more parts, or rows
+        # where this run wrote none) is removed in the same version.
+        stem = logical_name(os.path.relpath(self.output_path, table_dir))
+        self.manifest.commit(
+            operation, added, remove=remove or (lambda entry: logical_name(entry.path) == stem)
+        )
+
+    def abort(self) -> None:
+        self._buffer = []
+        self._buffered_rows = 0
+        self._close_part()
+        for path in self.paths:
+            if os.path.exists(f"{path}.tmp"):
+                os.remove(f"{path}.tmp")
+        self.paths = []
+
+    def __enter__(self) -> "TableStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
 
 class ParquetWriter:
-    def __init__(self, base_dir: str) -> None:
+    def __init__(self, base_dir: str, options: Optional[ParquetOptions] = None) -> None:
         self.base_dir = base_dir
+        self.options = options or ParquetOptions()
+        self._manifests: Dict[str, TableManifest] = {}
+        self._lock = threading.Lock()
+
+    def manifest(self, table_name: str) -> TableManifest:
+        # One instance per table, so commits only read the versions they have not seen.
+        with self._lock:
+            if table_name not in self._manifests:
+                self._manifests[table_name] = TableManifest(os.path.join(self.base_dir, table_name))
+            return self._manifests[table_name]
+
+    def export_file_lists(self) -> List[str]:
+        return [manifest.export_file_list() for manifest in list(self._manifests.values())]
 
     def write_rows(
         self,
@@ -15,21 +254,88 @@ class ParquetWriter:
         rows: Iterable[Dict[str, Any]],
         partition_cols: Optional[List[str]] = None,
         filename: Optional[str] = None,
+        schema: Optional[pa.Schema] = None,
     ) -> str:
         rows_list = list(rows)
         if not rows_list:
             return ""
-        table = pa.Table.from_pylist(rows_list)
+        table = pa.Table.from_pylist(rows_list, schema=schema or TABLE_SCHEMAS.get(table_name))
+        return self.write_table(table_name, table, partition_cols=partition_cols, filename=filename)
+
+    def write_table(
+        self,
+        table_name: str,
+        table: pa.Table,
+        partition_cols: Optional[List[str]] = None,
+        filename: Optional[str] = None,
+    ) -> str:
+        if table.num_rows == 0:
+            return ""
         table_dir = os.path.join(self.base_dir, table_name)
         os.makedirs(table_dir, exist_ok=True)
-
-        if filename is None:
-            filename = "part.parquet"
-        output_path = os.path.join(table_dir, filename)
+        manifest = self.manifest(table_name)
 
         if partition_cols:
-            pq.write_to_dataset(table, root_path=table_dir, partition_cols=partition_cols)
+            written: List[str] = []
+            pq.write_to_dataset(
+                prepare_table(table_name, table),
+                root_path=table_dir,
+                partition_cols=partition_cols,
+                basename_template=unique_name("part-{i}"),
+                file_visitor=lambda written_file: written.append(written_file.path),
+                row_group_size=self.options.row_group_size,
+                **self.options.writer_kwargs(table_name, table.num_rows),
+            )
+            manifest.commit(
+                "write", [describe_file(table_dir, os.path.relpath(path, table_dir)) for path in written]
+            )
             return table_dir
 
-        pq.write_table(table, output_path)
-        return output_path
+        stem, ext = os.path.splitext(filename or "part.parquet")
+        path = unique_name(stem, ext)
+        write_parquet(table_name, table, os.path.join(table_dir, path), self.options)
+        manifest.commit(
+            "write",
+            [describe_file(table_dir, path)],
+            remove=lambda entry: logical_name(entry.path) == stem,
+        )
+        return os.path.join(table_dir, path)
+
+    def write_block_range(
+        self, table_name: str, table: pa.Table, prefix: str, start_block: int, end_block: int
+    ) -> List[str]:
+        # One file per block bucket the range touches, named after the clipped range. The
+        # files replace any earlier write of the same range (including buckets where this
+        # write has no rows) in one manifest version.
+        table_dir = os.path.join(self.base_dir, table_name)
+        parts = dict(split_by_bucket(table))
+        stems = set()
+        added: List[FileEntry] = []
+        for bucket in range(bucket_of(start_block), end_block + 1, BUCKET_SIZE):
+            first = max(start_block, bucket)
+            last = min(end_block, bucket + BUCKET_SIZE - 1)
+            stem = os.path.join(bucket_dir("", bucket), f"{prefix}_{first}_{last}")
+            stems.add(stem)
+            if bucket not in parts:
+                continue
+            path = unique_name(stem)
+            os.makedirs(os.path.join(table_dir, os.path.dirname(path)), exist_ok=True)
+            write_parquet(table_name, parts[bucket], os.path.join(table_dir, path), self.options)
+            added.append(describe_file(table_dir, path))
+        self.manifest(table_name).commit(
+            "write", added, remove=lambda entry: logical_name(entry.path) in stems
+        )
+        return [os.path.join(table_dir, entry.path) for entry in added]
+
+    def open_stream(
+        self, table_name: str, filename: str, schema: pa.Schema, bucket: Optional[int] = None
+    ) -> TableStream:
+        table_dir = os.path.join(self.base_dir, table_name)
+        output_dir = table_dir if bucket is None else bucket_dir(table_dir, bucket)
+        return TableStream(
+            self.manifest(table_name),
+            os.path.join(output_dir, filename),
+            schema,
+            table_name,
+            self.options,
+        )
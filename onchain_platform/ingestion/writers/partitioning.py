@@ -0,0 +1,88 @@
+import os
+import re
+from typing import Iterator, List, Optional, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+
+# Lake tables are laid out Hive-style as <table>/block_bucket=<first block>/<file>.parquet
+# with 100k blocks per bucket, so scans bounded by block range only list and open the
+# directories they need (pyarrow prunes on the partition expression, DuckDB on the path).
+# Files written before partitioning sit directly under <table>/ and read back with a null
+# block_bucket until scripts/migrate_lake_partitions.py moves them.
+
+BUCKET_SIZE = 100_000
+PARTITION_KEY = "block_bucket"
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_KEY, pa.int64())]), flavor="hive")
+
+_BUCKET_DIR = re.compile(rf"^{PARTITION_KEY}=(-?\d+)$")
+
+
+def bucket_of(block_number: int) -> int:
+    return block_number // BUCKET_SIZE * BUCKET_SIZE
+
+
+def bucket_dir(table_dir: str, bucket: int) -> str:
+    return os.path.join(table_dir, f"{PARTITION_KEY}={bucket}")
+
+
+def path_bucket(path: str) -> Optional[int]:
+    # Bucket of a file path relative to its table directory (None for flat files).
+    match = _BUCKET_DIR.match(os.path.dirname(path))
+    return int(match.group(1)) if match else None
+
+
+def list_buckets(
+    table_dir: str, start_block: Optional[int] = None, end_block: Optional[int] = None
+) -> List[int]:
+    if not os.path.isdir(table_dir):
+        return []
+    buckets = []
+    for item in os.scandir(table_dir):
+        match = _BUCKET_DIR.match(item.name)
+        if not item.is_dir() or match is None:
+            continue
+        bucket = int(match.group(1))
+        if start_block is not None and bucket + BUCKET_SIZE <= start_block:
+            continue
+        if end_block is not None and bucket > end_block:
+            continue
+        buckets.append(bucket)
+    return sorted(buckets)
+
+
+def flat_files(table_dir: str) -> List[str]:
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(
+        item.path for item in os.scandir(table_dir) if item.is_file() and item.name.endswith(".parquet")
+    )
+
+
+def open_dataset(source: Union[str, List[str]], base_dir: Optional[str] = None) -> ds.Dataset:
+    # source is a table directory or an explicit file list planned from its manifest, in
+    # which case base_dir is the table directory the bucket names are parsed relative to.
+    return ds.dataset(source, format="parquet", partitioning=PARTITIONING, partition_base_dir=base_dir)
+
+
+def bucket_filter(start_block: Optional[int], end_block: Optional[int]) -> Optional[ds.Expression]:
+    expression: Optional[ds.Expression] = None
+    if start_block is not None:
+        expression = ds.field(PARTITION_KEY) >= bucket_of(start_block)
+    if end_block is not None:
+        upper = ds.field(PARTITION_KEY) <= bucket_of(end_block)
+        expression = upper if expression is None else expression & upper
+    if expression is None:
+        return None
+    # Unmigrated flat files carry no bucket and are kept for the row-level filter.
+    return ds.field(PARTITION_KEY).is_null() | expression
+
+
+def split_by_bucket(table: pa.Table) -> Iterator[Tuple[int, pa.Table]]:
+    if table.num_rows == 0:
+        return
+    buckets = pc.multiply(pc.divide(table.column("block_number"), BUCKET_SIZE), BUCKET_SIZE)
+    for bucket in pc.unique(buckets).to_pylist():
+        yield bucket, table.filter(pc.equal(buckets, bucket))
@@ -0,0 +1,194 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pyarrow as pa
+
+
+# Token and wei amounts are stored as DECIMAL(38, 0), which DuckDB and Arrow aggregate
+# natively. uint256 amounts (bronze quantities and decoded event amounts) that do not fit
+# are kept losslessly as 32-byte big-endian integers in a companion <column>_u256 column
+# (the decimal is then null).
+AMOUNT = pa.decimal128(38, 0)
+UINT256 = pa.binary(32)
+MAX_AMOUNT = 10**38 - 1
+
+
+def split_amount(value: Optional[int]) -> Tuple[Optional[int], Optional[bytes]]:
+    if value is None or value <= MAX_AMOUNT:
+        return value, None
+    return None, value.to_bytes(32, "big")
+
+
+def amount_arrays(values: Sequence[Optional[int]]) -> Tuple[pa.Array, pa.Array]:
+    fits, overflow = zip(*(split_amount(value) for value in values)) if values else ((), ())
+    return pa.array(list(fits), type=AMOUNT), pa.array(list(overflow), type=UINT256)
+
+
+BLOCKS_RAW = pa.schema(
+    [
+        ("chain_id", pa.int64()),
+        ("block_number", pa.int64()),
+        ("block_hash", pa.string()),
+        ("parent_hash", pa.string()),
+        ("timestamp", pa.int64()),
+        ("miner", pa.string()),
+        ("gas_used", pa.int64()),
+        ("gas_limit", pa.int64()),
+        ("base_fee_per_gas", AMOUNT),
+        ("tx_count", pa.int64()),
+        ("observed_at", pa.string()),
+        ("base_fee_per_gas_u256", UINT256),
+    ]
+)
+
+TRANSACTIONS_RAW = pa.schema(
+    [
+        ("chain_id", pa.int64()),
+        ("block_number", pa.int64()),
+        ("block_hash", pa.string()),
+        ("tx_hash", pa.string()),
+        ("tx_index", pa.int64()),
+        ("from_address", pa.string()),
+        ("to_address", pa.string()),
+        ("value", AMOUNT),
+        ("gas", AMOUNT),
+        ("gas_price", AMOUNT),
+        ("nonce", pa.int64()),
+        ("input", pa.string()),
+        ("value_u256", UINT256),
+        ("gas_u256", UINT256),
+        ("gas_price_u256", UINT256),
+    ]
+)
+
+LOGS_RAW = pa.schema(
+    [
+        ("chain_id", pa.int64()),
+        ("block_number", pa.int64()),
+        ("block_hash", pa.string()),
+        ("tx_hash", pa.string()),
+        ("tx_index", pa.int64()),
+        ("log_index", pa.int64()),
+        ("address", pa.string()),
+        ("data", pa.string()),
+        ("topics", pa.list_(pa.string())),
+        ("removed", pa.bool_()),
+    ]
+)
+
+CANONICAL_BLOCKS = pa.schema(
+    [
+        ("chain_id", pa.int64()),
+        ("block_number", pa.int64()),
+        ("block_hash", pa.string()),
+        ("parent_hash", pa.string()),
+        ("is_canonical", pa.bool_()),
+        ("observed_at", pa.string()),
+    ]
+)
+
+EVENT_ERC20_TRANSFER = pa.schema(
+    [
+        ("chain_id", pa.int64()),
+        ("block_number", pa.int64()),
+        ("tx_hash", pa.string()),
+        ("log_index", pa.int64()),
+        ("contract_address", pa.string()),
+        ("from_address", pa.string()),
+        ("to_address", pa.string()),
+        ("value_raw", AMOUNT),
+        ("value_raw_u256", UINT256),
+    ]
+)
+
+EVENT_UNISWAP_V2_SWAP = pa.schema(
+    [
+        ("chain_id", pa.int64()),
+        ("block_number", pa.int64()),
+        ("tx_hash", pa.string()),
+        ("log_index", pa.int64()),
+        ("pair_address", pa.string()),
+        ("sender", pa.string()),
+        ("to_address", pa.string()),
+        ("amount0_in", AMOUNT),
+        ("amount1_in", AMOUNT),
+        ("amount0_out", AMOUNT),
+        ("amount1_out", AMOUNT),
+        ("amount0_in_u256", UINT256),
+        ("amount1_in_u256", UINT256),
+        ("amount0_out_u256", UINT256),
+        ("amount1_out_u256", UINT256),
+    ]
+)
+
+TABLE_SCHEMAS: Dict[str, pa.Schema] = {
+    "blocks_raw": BLOCKS_RAW,
+    "transactions_raw": TRANSACTIONS_RAW,
+    "logs_raw": LOGS_RAW,
+    "canonical_blocks": CANONICAL_BLOCKS,
+    "event_erc20_transfer": EVENT_ERC20_TRANSFER,
+    "event_uniswap_v2_swap": EVENT_UNISWAP_V2_SWAP,
+}
+
+LAYERS: Dict[str, List[str]] = {
+    "bronze": ["blocks_raw", "transactions_raw", "logs_raw", "canonical_blocks"],
+    "silver": ["event_erc20_transfer", "event_uniswap_v2_swap"],
+}
+
+# Rows are sorted by these keys within each file so block_number min/max statistics stay
+# tight per row group and range filters skip most of a file.
+SORT_KEYS: Dict[str, List[str]] = {
+    "blocks_raw": ["block_number"],
+    "transactions_raw": ["block_number", "tx_index"],
+    "logs_raw": ["block_number", "log_index"],
+    "canonical_blocks": ["block_number"],
+    "event_erc20_transfer": ["block_number", "log_index"],
+    "event_uniswap_v2_swap": ["block_number", "log_index"],
+}
+
+# Address columns repeat heavily (hot contracts, routers), so they are dictionary
+# encoded; hashes are unique per row and are written plain instead. They are also the
+# point-lookup keys (wallet/token history), so each gets a Parquet bloom filter and an
+# entry in the address index.
+ADDRESS_COLUMNS: Dict[str, List[str]] = {
+    "blocks_raw": ["miner"],
+    "transactions_raw": ["from_address", "to_address"],
+    "logs_raw": ["address"],
+    "canonical_blocks": [],
+    "event_erc20_transfer": ["contract_address", "from_address", "to_address"],
+    "event_uniswap_v2_swap": ["pair_address", "sender", "to_address"],
+}
+
+
+# Optional compact bronze layout (STORAGE_FORMAT=binary): hashes and addresses become
+# fixed-width binary, calldata/log data raw bytes, and the topics list is spread over
+# fixed topic0..topic3 columns (EVM logs carry at most four topics).
+HASH = pa.binary(32)
+ADDRESS = pa.binary(20)
+MAX_TOPICS = 4
+
+BINARY_COLUMNS: Dict[str, Dict[str, pa.DataType]] = {
+    "blocks_raw": {"block_hash": HASH, "parent_hash": HASH, "miner": ADDRESS},
+    "transactions_raw": {
+        "block_hash": HASH,
+        "tx_hash": HASH,
+        "from_address": ADDRESS,
+        "to_address": ADDRESS,
+        "input": pa.binary(),
+    },
+    "logs_raw": {"block_hash": HASH, "tx_hash": HASH, "address": ADDRESS, "data": pa.binary()},
+    "canonical_blocks": {"block_hash": HASH, "parent_hash": HASH},
+}
+
+
+def binary_schema(table_name: str) -> pa.Schema:
+    columns = BINARY_COLUMNS[table_name]
+    fields = []
+    for field in TABLE_SCHEMAS[table_name]:
+        if field.name == "topics":
+            fields.extend(pa.field(f"topic{index}", HASH) for index in range(MAX_TOPICS))
+        else:
+            fields.append(pa.field(field.name, columns.get(field.name, field.type)))
+    return pa.schema(fields)
+
+
+BINARY_TABLE_SCHEMAS: Dict[str, pa.Schema] = {name: binary_schema(name) for name in BINARY_COLUMNS}
@@ -1,7 +1,10 @@
+import bisect
 import json
 import os
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from typing import Iterable, List, Optional, Tuple
+
+from onchain_platform.planner.leases import file_lock
 
 
 @dataclass
@@ -13,37 +16,142 @@ class RangeCheckpoint:
         return f"{self.start_block}-{self.end_block}"
 
 
+# Completed blocks are kept as a sorted list of disjoint, coalesced intervals, so lookups
+# are a bisect whatever chunk sizes the plans used. Every mark_done appends its ranges to
+# a JSONL journal (<path minus .json>.jsonl) and fsyncs it; a torn last line from a crash
+# is dropped. The journal is rewritten as the coalesced intervals once it holds many more
+# lines than there are intervals. Several workers can share one store: writes happen
+# under a lock file and first pick up what the others appended (refresh() does the same
+# for readers). A legacy {"start-end": true} JSON checkpoint file is imported once.
 class CheckpointStore:
+    COMPACT_SLACK = 1024
+
     def __init__(self, path: str) -> None:
-        self.path = path
-        self._data: Dict[str, bool] = {}
-        self._load()
+        stem = path[: -len(".jsonl")] if path.endswith(".jsonl") else os.path.splitext(path)[0]
+        self.path = f"{stem}.jsonl"
+        self.legacy_path = f"{stem}.json"
+        self.lock_path = f"{stem}.lock"
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._journal_lines = 0
+        self._inode = None
+        self._offset = 0
+        with file_lock(self.lock_path):
+            if not os.path.exists(self.path) and os.path.exists(self.legacy_path):
+                self._import_legacy()
+            if self.refresh():
+                self._rewrite()
 
-    def _load(self) -> None:
-        if not os.path.exists(self.path):
-            self._data = {}
-            return
-        with open(self.path, "r", encoding="utf-8") as handle:
-            self._data = json.load(handle)
+    def _import_legacy(self) -> None:
+        with open(self.legacy_path, "r", encoding="utf-8") as handle:
+            legacy = json.load(handle)
+        for key, done in legacy.items():
+            parts = key.split("-")
+            if done and len(parts) == 2:
+                self._add(int(parts[0]), int(parts[1]))
+        self._rewrite()
+
+    def refresh(self) -> bool:
+        # Reads journal lines appended since the last call (everything again if another
+        # process rewrote the file). Returns True if the journal ends in a torn line.
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._starts, self._ends = [], []
+            self._journal_lines = 0
+            self._inode = stat.st_ino
+            self._offset = 0
+        with open(self.path, "rb") as handle:
+            handle.seek(self._offset)
+            data = handle.read()
+        complete, _, tail = data.rpartition(b"\n")
+        for line in complete.split(b"\n") if complete else []:
+            try:
+                start_block, end_block = json.loads(line)
+            except ValueError:
+                continue
+            self._add(start_block, end_block)
+            self._journal_lines += 1
+        self._offset += len(data) - len(tail)
+        return bool(tail)
+
+    def _add(self, start_block: int, end_block: int) -> None:
+        # Merge with every interval that overlaps or touches [start_block, end_block].
+        lo = bisect.bisect_left(self._ends, start_block - 1)
+        hi = bisect.bisect_right(self._starts, end_block + 1)
+        if lo < hi:
+            start_block = min(start_block, self._starts[lo])
+            end_block = max(end_block, self._ends[hi - 1])
+        self._starts[lo:hi] = [start_block]
+        self._ends[lo:hi] = [end_block]
 
-    def _persist(self) -> None:
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
-        with open(self.path, "w", encoding="utf-8") as handle:
-            json.dump(self._data, handle, indent=2)
+    def _rewrite(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as handle:
+            for interval in zip(self._starts, self._ends):
+                handle.write(json.dumps(list(interval)) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(f"{self.path}.tmp", self.path)
+        stat = os.stat(self.path)
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        self._journal_lines = len(self._starts)
 
     def mark_done(self, ranges: Iterable[RangeCheckpoint]) -> None:
-        for item in ranges:
-            self._data[item.key()] = True
-        self._persist()
+        items = [(item.start_block, item.end_block) for item in ranges]
+        if not items:
+            return
+        with file_lock(self.lock_path):
+            torn = self.refresh()
+            for start_block, end_block in items:
+                self._add(start_block, end_block)
+            if torn or self._journal_lines + len(items) > 2 * len(self._starts) + self.COMPACT_SLACK:
+                # Appending after a partial line would corrupt the next record.
+                self._rewrite()
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write("".join(json.dumps(list(item)) + "\n" for item in items))
+                handle.flush()
+                os.fsync(handle.fileno())
+            stat = os.stat(self.path)
+            self._inode = stat.st_ino
+            self._offset = stat.st_size
+            self._journal_lines += len(items)
+
+    def is_range_done(self, start_block: int, end_block: int) -> bool:
+        index = bisect.bisect_right(self._starts, start_block) - 1
+        return index >= 0 and self._ends[index] >= end_block
+
+    def covered_through(self, start_block: int) -> Optional[int]:
+        # Last block of the done interval containing start_block, if there is one.
+        index = bisect.bisect_right(self._starts, start_block) - 1
+        if index >= 0 and self._ends[index] >= start_block:
+            return self._ends[index]
+        return None
 
     def is_done(self, item: RangeCheckpoint) -> bool:
-        return self._data.get(item.key(), False)
+        return self.is_range_done(item.start_block, item.end_block)
+
+    def gaps(self, start_block: int, end_block: int) -> List[Tuple[int, int]]:
+        # Uncovered block intervals within [start_block, end_block].
+        missing = []
+        cursor = start_block
+        index = max(bisect.bisect_right(self._starts, start_block) - 1, 0)
+        while cursor <= end_block and index < len(self._starts):
+            if self._ends[index] >= cursor:
+                if self._starts[index] > end_block:
+                    break
+                if self._starts[index] > cursor:
+                    missing.append((cursor, self._starts[index] - 1))
+                cursor = self._ends[index] + 1
+            index += 1
+        if cursor <= end_block:
+            missing.append((cursor, end_block))
+        return missing
 
     def list_done(self) -> List[Tuple[int, int]]:
-        done = []
-        for key in self._data.keys():
-            parts = key.split("-")
-            if len(parts) != 2:
-                continue
-            done.append((int(parts[0]), int(parts[1])))
-        return done
+        return list(zip(self._starts, self._ends))
@@ -0,0 +1,132 @@
+import fcntl
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Sequence, Set, Tuple
+
+
+Range = Tuple[int, int]
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    # Exclusive advisory lock shared by every process on the host (and by hosts sharing
+    # the warehouse over a filesystem that honours flock).
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+# Range leases in a SQLite table shared by every ingestion worker. A worker leases a few
+# ranges at a time for ttl seconds and heartbeats while it works on them; a lease that
+# is not renewed (crashed or stalled worker) expires and is handed to the next worker
+# that asks. Ranges are marked done after their checkpoint is written, so they are not
+# leased again; the checkpoint store stays the source of truth, and callers reopen done
+# ranges it does not list (e.g. after the checkpoints were reset for a re-ingest).
+SCHEMA = """
+create table if not exists leases (
+    start_block integer not null,
+    end_block integer not null,
+    owner text not null,
+    expires_at real not null,
+    done integer not null default 0,
+    primary key (start_block, end_block)
+) without rowid;
+"""
+
+
+class LeaseStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Transactions are opened explicitly with "begin immediate" below.
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.execute(SCHEMA)
+
+    def acquire(
+        self, owner: str, candidates: Sequence[Range], ttl: float, limit: int
+    ) -> Tuple[List[Range], Set[Range]]:
+        # Leases up to `limit` candidates that are free or expired, in candidate order.
+        # Also returns the candidates already done, so callers can drop them for good.
+        acquired: List[Range] = []
+        finished: Set[Range] = set()
+        now = time.time()
+        self._conn.execute("begin immediate")
+        try:
+            for start_block, end_block in candidates:
+                if len(acquired) >= limit:
+                    break
+                row = self._conn.execute(
+                    "select owner, expires_at, done from leases where start_block = ? and end_block = ?",
+                    (start_block, end_block),
+                ).fetchone()
+                if row is not None and row[2]:
+                    finished.add((start_block, end_block))
+                    continue
+                if row is not None and row[0] != owner and row[1] > now:
+                    continue
+                self._conn.execute(
+                    "insert or replace into leases values (?, ?, ?, ?, 0)",
+                    (start_block, end_block, owner, now + ttl),
+                )
+                acquired.append((start_block, end_block))
+            self._conn.execute("commit")
+        except BaseException:
+            self._conn.execute("rollback")
+            raise
+        return acquired, finished
+
+    def heartbeat(self, owner: str, ranges: Iterable[Range], ttl: float) -> List[Range]:
+        # Extends the owner's leases; returns the ranges it no longer holds.
+        lost = []
+        expires_at = time.time() + ttl
+        self._conn.execute("begin immediate")
+        try:
+            for start_block, end_block in ranges:
+                cursor = self._conn.execute(
+                    "update leases set expires_at = ? "
+                    "where start_block = ? and end_block = ? and owner = ? and done = 0",
+                    (expires_at, start_block, end_block, owner),
+                )
+                if cursor.rowcount == 0:
+                    lost.append((start_block, end_block))
+            self._conn.execute("commit")
+        except BaseException:
+            self._conn.execute("rollback")
+            raise
+        return lost
+
+    def complete(self, owner: str, start_block: int, end_block: int) -> None:
+        self._conn.execute(
+            "insert or replace into leases values (?, ?, ?, ?, 1)",
+            (start_block, end_block, owner, time.time()),
+        )
+
+    def reopen(self, ranges: Iterable[Range]) -> None:
+        # Forgets that the ranges were done, so they can be leased again.
+        self._conn.executemany(
+            "delete from leases where start_block = ? and end_block = ? and done = 1",
+            [(start_block, end_block) for start_block, end_block in ranges],
+        )
+
+    def release(self, owner: str, ranges: Iterable[Range]) -> None:
+        # Gives unfinished ranges back immediately instead of waiting for the TTL.
+        self._conn.execute("begin immediate")
+        try:
+            self._conn.executemany(
+                "delete from leases where start_block = ? and end_block = ? and owner = ? and done = 0",
+                [(start_block, end_block, owner) for start_block, end_block in ranges],
+            )
+            self._conn.execute("commit")
+        except BaseException:
+            self._conn.execute("rollback")
+            raise
+
+    def close(self) -> None:
+        self._conn.close()
@@ -3,6 +3,8 @@ import json
 import os
 from typing import List, Tuple
 
+from onchain_platform.planner.checkpoint_store import CheckpointStore
+
 
 def build_ranges(start_block: int, end_block: int, chunk_size: int) -> List[Tuple[int, int]]:
     ranges = []
@@ -22,9 +24,19 @@ def main() -> None:
     parser.add_argument("--out", default="warehouse/plans/ranges.jsonl")
     parser.add_argument("--chain-id", type=int, default=1)
     parser.add_argument("--append", action="store_true")
+    parser.add_argument(
+        "--missing-only",
+        action="store_true",
+        help="Only plan blocks the checkpoint store has not marked done (whatever chunk size it used).",
+    )
+    parser.add_argument("--checkpoints", default="warehouse/state/checkpoints.json")
     args = parser.parse_args()
 
-    ranges = build_ranges(args.start, args.end, args.chunk)
+    if args.missing_only:
+        gaps = CheckpointStore(args.checkpoints).gaps(args.start, args.end)
+        ranges = [item for start, end in gaps for item in build_ranges(start, end, args.chunk)]
+    else:
+        ranges = build_ranges(args.start, args.end, args.chunk)
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
 
     mode = "a" if args.append else "w"
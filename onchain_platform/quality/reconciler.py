@@ -1,13 +1,13 @@
 import os
 
-import pyarrow.dataset as ds
+from onchain_platform.ingestion.writers.manifest import TableManifest
 
 
 def count_rows(path: str) -> int:
     if not os.path.exists(path):
         return 0
-    dataset = ds.dataset(path, format="parquet")
-    return dataset.count_rows()
+    # Row counts are recorded per file in the manifest, so no data file is opened.
+    return TableManifest(path).snapshot().rows
 
 
 def main() -> None:
@@ -2,6 +2,8 @@ import os
 import pyarrow as pa
 import pyarrow.parquet as pq
 
+from onchain_platform.ingestion.writers.schemas import LAYERS, TABLE_SCHEMAS
+
 
 def write_empty(table_path: str, schema: pa.schema) -> None:
     os.makedirs(os.path.dirname(table_path), exist_ok=True)
@@ -12,111 +14,13 @@ def write_empty(table_path: str, schema: pa.schema) -> None:
 def main() -> None:
     base = os.path.join("warehouse", "lake")
 
-    write_empty(
-        os.path.join(base, "bronze", "blocks_raw", "part.parquet"),
-        pa.schema(
-            [
-                ("chain_id", pa.int64()),
-                ("block_number", pa.int64()),
-                ("block_hash", pa.string()),
-                ("parent_hash", pa.string()),
-                ("timestamp", pa.int64()),
-                ("miner", pa.string()),
-                ("gas_used", pa.int64()),
-                ("gas_limit", pa.int64()),
-                ("base_fee_per_gas", pa.string()),
-                ("tx_count", pa.int64()),
-                ("observed_at", pa.string()),
-            ]
-        ),
-    )
-
-    write_empty(
-        os.path.join(base, "bronze", "transactions_raw", "part.parquet"),
-        pa.schema(
-            [
-                ("chain_id", pa.int64()),
-                ("block_number", pa.int64()),
-                ("block_hash", pa.string()),
-                ("tx_hash", pa.string()),
-                ("tx_index", pa.int64()),
-                ("from_address", pa.string()),
-                ("to_address", pa.string()),
-                ("value", pa.string()),
-                ("gas", pa.string()),
-                ("gas_price", pa.string()),
-                ("nonce", pa.int64()),
-                ("input", pa.string()),
-            ]
-        ),
-    )
-
-    write_empty(
-        os.path.join(base, "bronze", "logs_raw", "part.parquet"),
-        pa.schema(
-            [
-                ("chain_id", pa.int64()),
-                ("block_number", pa.int64()),
-                ("block_hash", pa.string()),
-                ("tx_hash", pa.string()),
-                ("tx_index", pa.int64()),
-                ("log_index", pa.int64()),
-                ("address", pa.string()),
-                ("data", pa.string()),
-                ("topics", pa.list_(pa.string())),
-                ("removed", pa.bool_()),
-            ]
-        ),
-    )
-
-    write_empty(
-        os.path.join(base, "bronze", "canonical_blocks", "part.parquet"),
-        pa.schema(
-            [
-                ("chain_id", pa.int64()),
-                ("block_number", pa.int64()),
-                ("block_hash", pa.string()),
-                ("parent_hash", pa.string()),
-                ("is_canonical", pa.bool_()),
-                ("observed_at", pa.string()),
-            ]
-        ),
-    )
-
-    write_empty(
-        os.path.join(base, "silver", "event_erc20_transfer", "part.parquet"),
-        pa.schema(
-            [
-                ("chain_id", pa.int64()),
-                ("block_number", pa.int64()),
-                ("tx_hash", pa.string()),
-                ("log_index", pa.int64()),
-                ("contract_address", pa.string()),
-                ("from_address", pa.string()),
-                ("to_address", pa.string()),
-                ("value_raw", pa.string()),
-            ]
-        ),
-    )
-
-    write_empty(
-        os.path.join(base, "silver", "event_uniswap_v2_swap", "part.parquet"),
-        pa.schema(
-            [
-                ("chain_id", pa.int64()),
-                ("block_number", pa.int64()),
-                ("tx_hash", pa.string()),
-                ("log_index", pa.int64()),
-                ("pair_address", pa.string()),
-                ("sender", pa.string()),
-                ("to_address", pa.string()),
-                ("amount0_in", pa.string()),
-                ("amount1_in", pa.string()),
-                ("amount0_out", pa.string()),
-                ("amount1_out", pa.string()),
-            ]
-        ),
-    )
+    # Same schemas as the ingestion and decode writers, so dbt sees identical columns.
+    for layer, table_names in LAYERS.items():
+        for table_name in table_names:
+            write_empty(
+                os.path.join(base, layer, table_name, "block_bucket=0", "part.parquet"),
+                TABLE_SCHEMAS[table_name],
+            )
 
 
 if __name__ == "__main__":
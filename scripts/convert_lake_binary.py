@@ -0,0 +1,68 @@
+import argparse
+import os
+import shutil
+
+import pyarrow.parquet as pq
+
+from onchain_platform.ingestion.writers.binary_format import encode_table, is_binary_layout
+from onchain_platform.ingestion.writers.manifest import TableManifest
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, write_parquet
+from onchain_platform.ingestion.writers.schemas import BINARY_COLUMNS
+
+
+# Rewrites an existing hex bronze lake into the binary layout (STORAGE_FORMAT=binary),
+# one Parquet file at a time so memory stays bounded by the largest file.
+
+
+def convert_file(table_name: str, source: str, target: str) -> bool:
+    parquet = pq.ParquetFile(source)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if is_binary_layout(parquet.schema_arrow):
+        if source != target:
+            shutil.copyfile(source, target)
+        return False
+    write_parquet(table_name, encode_table(table_name, parquet.read()), target, ParquetOptions())
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert bronze tables to the compact binary layout.")
+    parser.add_argument("--warehouse", default=os.getenv("WAREHOUSE_DIR", "warehouse"))
+    parser.add_argument(
+        "--output",
+        help="Output bronze directory (default: <warehouse>/lake/bronze_binary).",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Replace each bronze file atomically instead of writing a copy.",
+    )
+    args = parser.parse_args()
+
+    bronze_dir = os.path.join(args.warehouse, "lake", "bronze")
+    output_dir = bronze_dir if args.in_place else (
+        args.output or os.path.join(args.warehouse, "lake", "bronze_binary")
+    )
+
+    for table_name in BINARY_COLUMNS:
+        table_dir = os.path.join(bronze_dir, table_name)
+        if not os.path.isdir(table_dir):
+            continue
+        converted = 0
+        skipped = 0
+        # Only files of the current snapshot are converted; replaced files awaiting
+        # vacuum are left behind. The copy has no manifest and is read as listed.
+        for source in TableManifest(table_dir).snapshot().paths():
+            target = os.path.join(output_dir, os.path.relpath(source, bronze_dir))
+            if convert_file(table_name, source, target):
+                converted += 1
+            else:
+                skipped += 1
+        print(f"{table_name}: converted {converted} files, {skipped} already binary")
+
+    if not args.in_place:
+        print(f"Binary lake written to {output_dir}; swap it in for lake/bronze and set STORAGE_FORMAT=binary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import os
+
+from onchain_platform.ingestion.writers.manifest import TableManifest
+from onchain_platform.ingestion.writers.schemas import LAYERS
+
+
+# Shows the current version of every lake table, re-exports the file lists dbt reads and
+# deletes files that were replaced more than --retention-hours ago (vacuum). Readers
+# holding an older snapshot than that may fail. The dbt views read files.csv at query
+# time, so keep the retention above the gap between a commit and the next export plus
+# the longest dbt run, view query or decode pass.
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect, export and vacuum lake table manifests.")
+    parser.add_argument("--warehouse", default=os.getenv("WAREHOUSE_DIR", "warehouse"))
+    parser.add_argument("--export", action="store_true", help="Rewrite <table>/_manifest/files.csv.")
+    parser.add_argument("--vacuum", action="store_true", help="Delete replaced and unreferenced files.")
+    parser.add_argument("--retention-hours", type=float, default=24.0)
+    args = parser.parse_args()
+
+    for layer, table_names in LAYERS.items():
+        for table_name in table_names:
+            table_dir = os.path.join(args.warehouse, "lake", layer, table_name)
+            if not os.path.isdir(table_dir):
+                continue
+            manifest = TableManifest(table_dir)
+            if args.vacuum:
+                deleted = manifest.vacuum(args.retention_hours * 3600)
+                print(f"{layer}/{table_name}: vacuumed {len(deleted)} files")
+            if args.export:
+                manifest.export_file_list()
+            snapshot = manifest.snapshot()
+            print(
+                f"{layer}/{table_name}: version {snapshot.version}, "
+                f"{len(snapshot.files)} files, {snapshot.rows} rows"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from onchain_platform.ingestion.writers.binary_format import is_binary_layout
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, write_parquet
+from onchain_platform.ingestion.writers.schemas import BINARY_TABLE_SCHEMAS, LAYERS, TABLE_SCHEMAS
+
+
+# Rewrites bronze files written before amounts became DECIMAL(38, 0) (value, gas,
+# gas_price, base_fee_per_gas were decimal strings) or before those columns got their
+# *_u256 overflow companions (added here as nulls). Silver tables are rebuilt from bronze
+# by decode_worker, so they only need a fresh decode run.
+
+
+def migrate_file(table_name: str, path: str) -> bool:
+    parquet = pq.ParquetFile(path)
+    schemas = BINARY_TABLE_SCHEMAS if is_binary_layout(parquet.schema_arrow) else TABLE_SCHEMAS
+    schema = schemas[table_name]
+    if parquet.schema_arrow.equals(schema):
+        return False
+    table = parquet.read()
+    for field in schema:
+        if field.name not in table.column_names:
+            table = table.append_column(field, pa.nulls(table.num_rows, type=field.type))
+    write_parquet(table_name, table.select(schema.names).cast(schema), path, ParquetOptions())
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate bronze amount columns to DECIMAL(38, 0).")
+    parser.add_argument("--warehouse", default=os.getenv("WAREHOUSE_DIR", "warehouse"))
+    args = parser.parse_args()
+
+    for table_name in LAYERS["bronze"]:
+        table_dir = os.path.join(args.warehouse, "lake", "bronze", table_name)
+        migrated = 0
+        for root, _, files in os.walk(table_dir):
+            for filename in sorted(files):
+                if filename.endswith(".parquet") and migrate_file(table_name, os.path.join(root, filename)):
+                    migrated += 1
+        print(f"{table_name}: migrated {migrated} files")
+    print("Re-run decode_worker to rebuild silver with the numeric amount columns.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+
+import pyarrow.parquet as pq
+
+from onchain_platform.ingestion.writers.manifest import TableManifest
+from onchain_platform.ingestion.writers.parquet_writer import ParquetOptions, write_parquet
+from onchain_platform.ingestion.writers.partitioning import bucket_dir, flat_files, split_by_bucket
+
+
+# Moves files of a flat lake (<table>/*.parquet) into the block_bucket=<n>/ layout. A
+# file spanning several buckets is split; each piece keeps the original file name, so
+# re-running the tool or re-ingesting a migrated range overwrites instead of duplicating.
+
+LAYERS = ["bronze", "silver"]
+
+
+def migrate_file(table_dir: str, path: str) -> int:
+    table_name = os.path.basename(table_dir)
+    table = pq.read_table(path)
+    filename = os.path.basename(path)
+    if table.num_rows == 0:
+        # Empty placeholders (bootstrap_empty_parquet.py) keep the table readable by dbt.
+        os.makedirs(bucket_dir(table_dir, 0), exist_ok=True)
+        os.replace(path, os.path.join(bucket_dir(table_dir, 0), filename))
+        return 1
+    pieces = 0
+    for bucket, part in split_by_bucket(table):
+        output_dir = bucket_dir(table_dir, bucket)
+        os.makedirs(output_dir, exist_ok=True)
+        write_parquet(table_name, part, os.path.join(output_dir, filename), ParquetOptions())
+        pieces += 1
+    os.remove(path)
+    return pieces
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate a flat Parquet lake to block_bucket partitions.")
+    parser.add_argument("--warehouse", default=os.getenv("WAREHOUSE_DIR", "warehouse"))
+    args = parser.parse_args()
+
+    for layer in LAYERS:
+        layer_dir = os.path.join(args.warehouse, "lake", layer)
+        if not os.path.isdir(layer_dir):
+            continue
+        for item in sorted(os.scandir(layer_dir), key=lambda entry: entry.name):
+            if not item.is_dir():
+                continue
+            files = flat_files(item.path)
+            if files and TableManifest(item.path).exists():
+                raise RuntimeError(f"{item.path} already has a manifest; its flat files cannot be moved")
+            pieces = sum(migrate_file(item.path, path) for path in files)
+            if files:
+                print(f"{layer}/{item.name}: moved {len(files)} files into {pieces} bucket files")
+
+
+if __name__ == "__main__":
+    main()
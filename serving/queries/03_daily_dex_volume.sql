@@ -5,26 +5,27 @@ with swaps as (
     dt.block_number,
     dt.amount0_out,
     dt.amount1_out,
+    dt.amount0_out_u256,
+    dt.amount1_out_u256,
     b.timestamp
   from dex_trades dt
   join blocks_raw b
     on dt.chain_id = b.chain_id
    and dt.block_number = b.block_number
-),
-
-daily as (
-  select
-    date_trunc('day', to_timestamp(timestamp)) as day,
-    count(*) as trades,
-    sum(
-      coalesce(try_cast(amount0_out as double), 0)
-      + coalesce(try_cast(amount1_out as double), 0)
-    ) as volume_raw_out
-  from swaps
-  group by 1
 )
 
-select *
-from daily
+-- Amounts are summed as HUGEINT, which stays exact (no rounding through double).
+select
+  date_trunc('day', to_timestamp(timestamp)) as day,
+  count(*) as trades,
+  sum(coalesce(amount0_out::hugeint, 0) + coalesce(amount1_out::hugeint, 0)) as volume_raw_out,
+  -- Trades with an amount too large for DECIMAL(38,0) (kept only in the _u256
+  -- columns) are not in the volume; they are counted here instead of dropped.
+  count(*) filter (
+    where (amount0_out is null and amount0_out_u256 is not null)
+       or (amount1_out is null and amount1_out_u256 is not null)
+  ) as overflow_trades
+from swaps
+group by 1
 order by day desc
 limit 30
@@ -0,0 +1,38 @@
+from onchain_platform.ingestion.concurrency import AdaptiveConcurrencyLimiter
+from onchain_platform.ingestion.rpc_client import parse_retry_after
+
+
+def test_fast_method_does_not_throttle_slow_method():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=64)
+    limiter.on_success(0.02, ("eth_blockNumber", 1))
+    for _ in range(40):
+        limiter.on_success(0.5, ("eth_getLogs", 1))
+    assert limiter.limit >= 16
+
+
+def test_slow_latency_drift_cuts_at_most_once_per_doubling():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=64)
+    latency = 0.1
+    while latency < 0.39:
+        limiter.on_success(latency, ("eth_getLogs", 1))
+        latency += 0.001
+    assert limiter.limit >= 8
+
+
+def test_one_cut_per_window_and_recovery():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, max_limit=64)
+    # Every in-flight request reports the same overload: one cut, not sixteen.
+    for _ in range(16):
+        limiter.on_overload()
+    assert limiter.limit == 8
+    for _ in range(200):
+        limiter.on_success(0.1, ("eth_getLogs", 1))
+    assert limiter.limit > 16
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("0.5") == 0.5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
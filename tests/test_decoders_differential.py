@@ -0,0 +1,101 @@
+import os
+
+import pyarrow as pa
+import pytest
+
+from benchmarks.bench_decoders import synthetic_logs
+from onchain_platform.decoding.abi_registry import ABIRegistry
+from onchain_platform.decoding.decoders.erc20 import decode_transfers, decode_transfers_batch
+from onchain_platform.decoding.decoders.uniswap_v2 import decode_swaps, decode_swaps_batch
+from onchain_platform.ingestion.writers.schemas import EVENT_ERC20_TRANSFER, EVENT_UNISWAP_V2_SWAP, LOGS_RAW
+
+
+ABI_DIR = os.path.join(os.path.dirname(__file__), "..", "onchain_platform", "decoding", "abis")
+UINT256_MAX = "f" * 64
+
+DECODERS = [
+    (decode_transfers, decode_transfers_batch, EVENT_ERC20_TRANSFER),
+    (decode_swaps, decode_swaps_batch, EVENT_UNISWAP_V2_SWAP),
+]
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return ABIRegistry(ABI_DIR)
+
+
+@pytest.fixture(scope="module")
+def topics(registry):
+    return (
+        registry.event_topic(registry.get_event("erc20", "Transfer")),
+        registry.event_topic(registry.get_event("uniswap_v2", "Swap")),
+    )
+
+
+def log(index, topics, data):
+    return {
+        "chain_id": 1,
+        "block_number": 18_000_000 + index,
+        "block_hash": "0x%064x" % index,
+        "tx_hash": "0x%064x" % (index + 1),
+        "tx_index": 0,
+        "log_index": index,
+        "address": "0x%040x" % (index + 7),
+        "data": data,
+        "topics": topics,
+        "removed": False,
+    }
+
+
+def edge_case_logs(transfer_topic, swap_topic):
+    sender = "0x" + "0" * 24 + "11" * 20
+    receiver = "0x" + "0" * 24 + "22" * 20
+    word = "%064x" % 12345
+    cases = [
+        # uint256 max in every amount slot.
+        ([transfer_topic, sender, receiver], "0x" + UINT256_MAX),
+        ([swap_topic, sender, receiver], "0x" + UINT256_MAX * 4),
+        # Largest value that still fits DECIMAL(38,0), and the first that does not.
+        ([transfer_topic, sender, receiver], "0x%064x" % (10**38 - 1)),
+        ([transfer_topic, sender, receiver], "0x%064x" % 10**38),
+        # Data too short for the event, empty, missing, or with trailing words.
+        ([transfer_topic, sender, receiver], "0x" + word[:40]),
+        ([swap_topic, sender, receiver], "0x" + word * 3),
+        ([transfer_topic, sender, receiver], "0x"),
+        ([transfer_topic, sender, receiver], None),
+        ([swap_topic, sender, receiver], "0x" + word * 5),
+        # Missing or too few topics.
+        ([], "0x" + word),
+        (None, "0x" + word),
+        ([transfer_topic, sender], "0x" + word),
+        # Mixed-case topic0 and topics without the 0x prefix.
+        ([transfer_topic.upper().replace("0X", "0x"), sender, receiver], "0x" + word),
+        ([swap_topic[:10] + swap_topic[10:].upper(), sender, receiver], "0x" + word * 4),
+        ([transfer_topic, sender[2:], receiver[2:]], "0x" + word),
+        # Another event entirely.
+        (["0x" + "ab" * 32, sender, receiver], "0x" + word),
+    ]
+    return [log(index, case_topics, data) for index, (case_topics, data) in enumerate(cases)]
+
+
+@pytest.mark.parametrize("row_decoder, batch_decoder, schema", DECODERS)
+def test_edge_cases_identical(registry, topics, row_decoder, batch_decoder, schema):
+    rows = edge_case_logs(*topics)
+    expected = row_decoder(registry, rows)
+    decoded = batch_decoder(registry, pa.Table.from_pylist(rows, schema=LOGS_RAW))
+    assert expected
+    assert decoded.to_pylist() == expected
+    assert decoded.equals(pa.Table.from_pylist(expected, schema=schema))
+
+
+@pytest.mark.parametrize("row_decoder, batch_decoder, schema", DECODERS)
+def test_synthetic_logs_identical(registry, topics, row_decoder, batch_decoder, schema):
+    rows = synthetic_logs(20_000, *topics)
+    table = pa.Table.from_pylist(rows, schema=LOGS_RAW)
+    expected = row_decoder(registry, rows)
+    # Record batches are what decode_worker feeds the batch decoders.
+    decoded = pa.concat_tables(
+        batch_decoder(registry, batch) for batch in table.to_batches(max_chunksize=4096)
+    )
+    assert decoded.to_pylist() == expected
+    assert decoded.equals(pa.Table.from_pylist(expected, schema=schema))
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+import pyarrow.parquet as pq
+import pytest
+
+from benchmarks.mock_node import MockNode, NodeOptions
+from onchain_platform.ingestion import tailer
+from onchain_platform.ingestion.writers.manifest import TableManifest
+
+
+HEAD = 18_000_100
+FINALITY_DEPTH = 10
+
+
+class NodeThread:
+    # A MockNode serving from its own event loop, so the tailer can run against it from
+    # another thread while the test reorgs it or moves its head.
+    def __init__(self, options: NodeOptions) -> None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.node = MockNode(options)
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def serve() -> None:
+            asyncio.set_event_loop(self.loop)
+            self.runner = self.loop.run_until_complete(self.node.start(port=self.port))
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=serve, daemon=True)
+        self.thread.start()
+        started.wait(10)
+
+    def run(self, fn, *args):
+        async def call():
+            return fn(*args)
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result(10)
+
+    def stop(self) -> None:
+        async def shutdown():
+            if self.node._advance is not None:
+                self.node._advance.cancel()
+            await self.runner.cleanup()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+
+
+def start_tailer(monkeypatch, tmp_path, port, end_block):
+    warehouse = str(tmp_path / "warehouse")
+    monkeypatch.setenv("RPC_URL", f"http://127.0.0.1:{port}/")
+    monkeypatch.delenv("RPC_URLS", raising=False)
+    monkeypatch.setenv("WAREHOUSE_DIR", warehouse)
+    monkeypatch.setenv("FINALITY_DEPTH", str(FINALITY_DEPTH))
+    monkeypatch.setenv("STORAGE_FORMAT", "hex")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "tailer.py",
+            "--follow",
+            "--start", str(HEAD - 30),
+            "--end", str(end_block),
+            "--poll-interval", "0.05",
+            "--promote-blocks", "5",
+            "--state", os.path.join(warehouse, "state", "canonical_state.json"),
+            "--chain-index", os.path.join(warehouse, "state", "chain_index"),
+        ],
+    )
+    errors = []
+
+    def run() -> None:
+        try:
+            tailer.main()
+        except BaseException as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return warehouse, thread, errors
+
+
+def read_rows(warehouse, layer, table, columns):
+    paths = TableManifest(os.path.join(warehouse, "lake", layer, table)).snapshot().paths()
+    return [row for path in paths for row in pq.read_table(path, columns=columns).to_pylist()]
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def assert_matches_node(node_thread, warehouse, layer, first, last):
+    # Every block in [first, last] exactly once, all on the node's current chain, with
+    # every log (and nothing else) from those blocks.
+    options = node_thread.node.options
+    expected = {number: node_thread.run(node_thread.node.block_hash, number) for number in range(first, last + 1)}
+    blocks = read_rows(warehouse, layer, "blocks_raw", ["block_number", "block_hash"])
+    counts = Counter(row["block_number"] for row in blocks)
+    assert sorted(counts) == list(range(first, last + 1))
+    assert set(counts.values()) == {1}
+    assert {row["block_number"]: row["block_hash"] for row in blocks} == expected
+
+    logs = read_rows(warehouse, layer, "logs_raw", ["block_number", "block_hash", "log_index"])
+    assert all(expected.get(row["block_number"]) == row["block_hash"] for row in logs)
+    keys = Counter((row["block_number"], row["log_index"]) for row in logs)
+    assert set(keys.values()) == {1}
+    assert len(keys) == len(expected) * options.txs_per_block * options.logs_per_tx
+
+    canonical = read_rows(warehouse, layer, "canonical_blocks", ["block_number", "is_canonical"])
+    assert sorted(row["block_number"] for row in canonical) == list(range(first, last + 1))
+    assert all(row["is_canonical"] for row in canonical)
+
+
+@pytest.fixture
+def node_factory():
+    nodes = []
+
+    def make(**kwargs):
+        node_thread = NodeThread(NodeOptions(head=HEAD, txs_per_block=4, logs_per_tx=2, **kwargs))
+        nodes.append(node_thread)
+        return node_thread
+
+    yield make
+    for node_thread in nodes:
+        node_thread.stop()
+
+
+def test_reorg_at_same_height_is_rolled_back(monkeypatch, tmp_path, node_factory):
+    node_thread = node_factory()
+    end_block = HEAD + 5
+    warehouse, thread, errors = start_tailer(monkeypatch, tmp_path, node_thread.port, end_block)
+
+    def hot_tip():
+        blocks = read_rows(warehouse, "unfinalized", "blocks_raw", ["block_number"])
+        return max((row["block_number"] for row in blocks), default=None)
+
+    assert wait_for(lambda: hot_tip() == HEAD)
+    # Replace the newest blocks without moving the head: only the tip hash check sees it.
+    node_thread.run(node_thread.node.reorg, 3)
+
+    def hot_matches_node():
+        try:
+            assert_matches_node(node_thread, warehouse, "unfinalized", HEAD - FINALITY_DEPTH + 1, HEAD)
+            return True
+        except (AssertionError, OSError):
+            return False
+
+    assert wait_for(hot_matches_node, timeout=10)
+
+    # Let the remaining blocks finalize so the tailer promotes them and stops at --end.
+    node_thread.run(setattr, node_thread.node, "head", end_block + FINALITY_DEPTH)
+    thread.join(60)
+    assert not thread.is_alive() and not errors
+    assert_matches_node(node_thread, warehouse, "bronze", HEAD - 30, end_block)
+    assert read_rows(warehouse, "unfinalized", "blocks_raw", ["block_number"]) == []
+
+
+def test_follow_through_repeated_reorgs(monkeypatch, tmp_path, node_factory):
+    node_thread = node_factory(block_time=0.02, reorg_every=7, reorg_depth=3)
+    end_block = HEAD + 60
+    warehouse, thread, errors = start_tailer(monkeypatch, tmp_path, node_thread.port, end_block)
+    thread.join(90)
+    assert not thread.is_alive() and not errors
+    assert node_thread.node.stats["reorgs"] > 0
+    assert_matches_node(node_thread, warehouse, "bronze", HEAD - 30, end_block)
+    assert read_rows(warehouse, "unfinalized", "blocks_raw", ["block_number"]) == []